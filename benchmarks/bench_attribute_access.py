@@ -0,0 +1,107 @@
+"""Compares attribute access on subentities against the implementation that
+probed the underlying entity with `hasattr` on every lookup.
+
+Run with: python benchmarks/bench_attribute_access.py
+"""
+from __future__ import annotations
+from typing import Any, Callable, List, Tuple
+
+import timeit
+
+from google.cloud.datastore import Entity, Key
+
+from gcdmc.core import Subentity
+from gcdmc.model import IEntity, TypedEntity
+from gcdmc.model.properties import IntegerProperty, StringProperty
+
+NUMBER: int = 200_000
+
+
+def _legacy_subentity_getattribute(self: Subentity, name: str) -> Any:
+    is_delegated: bool = name not in type(self).__undelegated_attrs__
+    if name.startswith('__') and name.endswith('__'):
+        return object.__getattribute__(self, name)
+    if name == '_entity':
+        return object.__getattribute__(self, name)
+    if is_delegated and hasattr(self._entity, name):
+        return getattr(self._entity, name)
+    return object.__getattribute__(self, name)
+
+
+def _legacy_typed_entity_getattribute(self: TypedEntity, name: str) -> Any:
+    if name in ('properties', 'unindexed_properties'):
+        return object.__getattribute__(self, name)
+    if name in self.properties:
+        return self[name]
+    return _legacy_subentity_getattribute(self, name)
+
+
+class User(TypedEntity):
+    __kind__ = 'User'
+    name = StringProperty()
+    age = IntegerProperty()
+
+
+class IUser(IEntity):
+    __type__ = User
+
+
+class LegacySubentity(Subentity):
+    __getattribute__ = _legacy_subentity_getattribute
+
+
+class LegacyUser(User):
+    __getattribute__ = _legacy_typed_entity_getattribute
+
+
+class LegacyIUser(IUser):
+    __getattribute__ = _legacy_subentity_getattribute
+
+
+def _entity() -> Entity:
+    entity: Entity = Entity(key=Key('User', 1, project='bench'))
+    entity.update(name='Ada', age=36)
+    return entity
+
+
+def _time(func: Callable[[], Any]) -> float:
+    """Returns the best time per call, in nanoseconds.
+    """
+    return min(timeit.repeat(func, number=NUMBER, repeat=5)) / NUMBER * 1e9
+
+
+def main() -> None:
+    subentity: Subentity = Subentity.wrap(_entity())
+    legacy_subentity: Subentity = LegacySubentity._attach(_entity())
+
+    user: User = User.wrap(_entity())
+    legacy_user: User = LegacyUser._attach(user._entity)
+
+    iuser: IUser = IUser(user)
+    legacy_iuser: IUser = LegacyIUser(legacy_user)
+
+    cases: List[Tuple[str, Callable, Callable]] = [
+        ('Subentity.key', lambda: legacy_subentity.key,
+         lambda: subentity.key),
+        ('Subentity.get', lambda: legacy_subentity.get,
+         lambda: subentity.get),
+        ('Subentity.wrap', lambda: legacy_subentity.wrap,
+         lambda: subentity.wrap),
+        ('TypedEntity.<property>', lambda: legacy_user.name,
+         lambda: user.name),
+        ('TypedEntity.key', lambda: legacy_user.key, lambda: user.key),
+        ('IEntity.<property>', lambda: legacy_iuser.name,
+         lambda: iuser.name),
+    ]
+
+    print(f'{"case":<24} {"legacy (ns)":>12} {"current (ns)":>13} '
+          f'{"speedup":>8}')
+    for name, legacy, current in cases:
+        legacy_ns: float = _time(legacy)
+        current_ns: float = _time(current)
+        print(f'{name:<24} {legacy_ns:>12.1f} {current_ns:>13.1f} '
+              f'{legacy_ns / current_ns:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Measures the wall time of a large `Subclient.get_multi` call against a
+stand-in Datastore API with a fixed round-trip latency, with the chunks of
+the lookup sent one at a time and concurrently.
+
+Converting entities to and from protobufs holds the GIL, so with the pure
+Python protobuf runtime the conversion, rather than the latency, dominates
+the concurrent case.
+
+Run with: python benchmarks/bench_chunked_lookup.py
+"""
+from __future__ import annotations
+from typing import Any, Dict, List
+
+import time
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.datastore import Key
+from google.cloud.datastore_v1.types import datastore as datastore_pb2
+from google.cloud.datastore_v1.types import entity as entity_pb2
+from google.cloud.datastore_v1.types import query as query_pb2
+
+from gcdmc.core import Subclient
+
+KEYS: int = 20_000
+
+#: The simulated round-trip time of a single lookup, in seconds.
+LATENCY: float = 0.1
+
+
+class SlowDatastoreAPI:
+    """Answers every lookup after a fixed delay, finding every key.
+    """
+    def lookup(self, request: Dict[str, Any],
+               **kwargs: Any) -> datastore_pb2.LookupResponse:
+        time.sleep(LATENCY)
+        return datastore_pb2.LookupResponse(found=[
+            query_pb2.EntityResult(entity=entity_pb2.Entity(key=key_pb))
+            for key_pb in request['keys']
+        ])
+
+
+def _client(max_workers: int) -> Subclient:
+    client: Subclient = Subclient(project='bench',
+                                  credentials=AnonymousCredentials(),
+                                  max_workers=max_workers)
+    client._datastore_api_internal = SlowDatastoreAPI()
+    return client
+
+
+def main() -> None:
+    keys: List[Key] = [Key('Item', i + 1, project='bench')
+                       for i in range(KEYS)]
+    print(f'{KEYS} keys, {LATENCY * 1000:.0f} ms per lookup')
+    print(f'{"max_workers":<12} {"wall time (s)":>14}')
+    for max_workers in (1, 8, 20):
+        client: Subclient = _client(max_workers)
+        start: float = time.perf_counter()
+        client.get_multi(keys)
+        print(f'{max_workers:<12} {time.perf_counter() - start:>14.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Compares creating typed entities one at a time with `create` against
+creating them in bulk with `create_many`.
+
+Run with: python benchmarks/bench_create_many.py
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, List
+
+import timeit
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.datastore import Client
+
+from gcdmc.model import TypedEntity
+from gcdmc.model.properties import (
+    BooleanProperty,
+    EmailProperty,
+    FloatListProperty,
+    IntegerProperty,
+    StringProperty,
+)
+
+ROWS: int = 10_000
+
+
+class Account(TypedEntity):
+    __kind__ = 'Account'
+    name = StringProperty(nullable=False)
+    email = EmailProperty()
+    active = BooleanProperty(choices=(True, False))
+    logins = IntegerProperty(default=0)
+    readings = FloatListProperty(indexed=False, default=list)
+
+
+def _rows() -> List[Dict[str, Any]]:
+    return [{
+        'name': f'user-{i}',
+        'email': f'user-{i}@example.com',
+        'active': i % 2 == 0,
+        'logins': i,
+    } for i in range(ROWS)]
+
+
+def _time(func: Callable[[], Any]) -> float:
+    """Returns the best time per row, in microseconds.
+    """
+    return min(timeit.repeat(func, number=1, repeat=3)) / ROWS * 1e6
+
+
+def main() -> None:
+    client: Client = Client(project='bench',
+                            credentials=AnonymousCredentials())
+    rows: List[Dict[str, Any]] = _rows()
+    columns: Dict[str, List[Any]] = {
+        name: [row[name] for row in rows]
+        for name in rows[0]
+    }
+
+    cases: List[tuple] = [
+        ('create', lambda: [Account.create(client, **row) for row in rows]),
+        ('create_many(rows)', lambda: Account.create_many(client, rows=rows)),
+        ('create_many(columns)',
+         lambda: Account.create_many(client, columns=columns)),
+    ]
+    print(f'{"case":<22} {"per row (us)":>13}')
+    for name, func in cases:
+        print(f'{name:<22} {_time(func):>13.2f}')
+
+
+if __name__ == '__main__':
+    main()
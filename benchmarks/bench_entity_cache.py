@@ -0,0 +1,65 @@
+"""Compares reading a hot entity with `Subclient.get` with and without an
+entity cache, against a stand-in Datastore API with a fixed round-trip
+latency.
+
+Run with: python benchmarks/bench_entity_cache.py
+"""
+from __future__ import annotations
+from typing import Any, Dict, Optional
+
+import time
+import timeit
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.datastore import Key
+from google.cloud.datastore_v1.types import datastore as datastore_pb2
+from google.cloud.datastore_v1.types import entity as entity_pb2
+from google.cloud.datastore_v1.types import query as query_pb2
+
+from gcdmc.core import EntityCache, Subclient
+
+READS: int = 200
+
+#: The simulated round-trip time of a single lookup, in seconds.
+LATENCY: float = 0.002
+
+
+class SlowDatastoreAPI:
+    """Answers every lookup after a fixed delay, finding every key with a few
+    properties.
+    """
+    def lookup(self, request: Dict[str, Any],
+               **kwargs: Any) -> datastore_pb2.LookupResponse:
+        time.sleep(LATENCY)
+        return datastore_pb2.LookupResponse(found=[
+            query_pb2.EntityResult(entity=entity_pb2.Entity(
+                key=key_pb,
+                properties={
+                    'name': entity_pb2.Value(string_value='plan'),
+                    'seats': entity_pb2.Value(integer_value=10),
+                    'active': entity_pb2.Value(boolean_value=True),
+                })) for key_pb in request['keys']
+        ])
+
+
+def _client(cache: Optional[EntityCache]) -> Subclient:
+    client: Subclient = Subclient(project='bench',
+                                  credentials=AnonymousCredentials(),
+                                  cache=cache)
+    client._datastore_api_internal = SlowDatastoreAPI()
+    return client
+
+
+def main() -> None:
+    key: Key = Key('Plan', 1, project='bench')
+    print(f'{LATENCY * 1000:.0f} ms per lookup')
+    print(f'{"case":<10} {"per read (us)":>14}')
+    for name, cache in (('uncached', None), ('cached', EntityCache())):
+        client: Subclient = _client(cache)
+        seconds: float = min(
+            timeit.repeat(lambda: client.get(key), number=READS, repeat=3))
+        print(f'{name:<10} {seconds / READS * 1e6:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Measures the throughput and the peak memory of exporting a query to
+NDJSON, with and without compression, for kinds of increasing size, against
+a stand-in Datastore API that holds its pages in memory.
+
+Run with: python benchmarks/bench_export.py
+"""
+from __future__ import annotations
+from typing import Any, Dict, List
+
+import os
+import tempfile
+import time
+import tracemalloc
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.datastore_v1.types import datastore as datastore_pb2
+from google.cloud.datastore_v1.types import entity as entity_pb2
+from google.cloud.datastore_v1.types import query as query_pb2
+
+from gcdmc.core import ExportStats, Subclient
+
+PAGE_SIZE: int = 500
+
+
+class GeneratedDatastoreAPI:
+    """Answers queries with pages of entities generated up front, using the
+    page number as the cursor.
+    """
+    def __init__(self, pages: int) -> None:
+        self.responses: List[datastore_pb2.RunQueryResponse] = [
+            _response(page, pages) for page in range(pages)
+        ]
+
+    def run_query(self, request: Dict[str, Any],
+                  **kwargs: Any) -> datastore_pb2.RunQueryResponse:
+        query: query_pb2.Query = request['query']
+        return self.responses[int(query.start_cursor or b'0')]
+
+
+def _response(page: int, pages: int) -> datastore_pb2.RunQueryResponse:
+    return datastore_pb2.RunQueryResponse(batch=query_pb2.QueryResultBatch(
+        entity_results=[
+            query_pb2.EntityResult(entity=entity_pb2.Entity(
+                key=entity_pb2.Key(
+                    partition_id=entity_pb2.PartitionId(project_id='bench'),
+                    path=[
+                        entity_pb2.Key.PathElement(
+                            kind='Item', id=page * PAGE_SIZE + i + 1)
+                    ]),
+                properties={
+                    'n': entity_pb2.Value(integer_value=i),
+                    'name': entity_pb2.Value(string_value=f'item {i}'),
+                })) for i in range(PAGE_SIZE)
+        ],
+        end_cursor=str(page + 1).encode(),
+        more_results=(
+            query_pb2.QueryResultBatch.MoreResultsType.NOT_FINISHED
+            if page + 1 < pages else
+            query_pb2.QueryResultBatch.MoreResultsType.NO_MORE_RESULTS),
+    ))
+
+
+def main() -> None:
+    client: Subclient = Subclient(project='bench',
+                                  credentials=AnonymousCredentials())
+    print(f'{"rows":>8} {"file":<14} {"rows/s":>10} {"peak (MiB)":>11}')
+    with tempfile.TemporaryDirectory() as directory:
+        for pages in (2, 20):
+            client._datastore_api_internal = GeneratedDatastoreAPI(pages)
+            for name in ('items.ndjson', 'items.ndjson.gz'):
+                path: str = os.path.join(directory, name)
+                tracemalloc.start()
+                start: float = time.perf_counter()
+                stats: ExportStats = client.query(kind='Item').export(path)
+                seconds: float = time.perf_counter() - start
+                peak: int = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f'{stats.rows:>8} {name:<14} '
+                      f'{stats.rows / seconds:>10.0f} {peak / 2**20:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Compares importing an NDJSON file serially, with one commit at a time and
+validation on the calling thread, against importing it with worker
+processes and several commits in flight, against a stand-in Datastore API
+with a fixed commit latency.
+
+Run with: python benchmarks/bench_import.py
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Tuple
+
+import json
+import os
+import tempfile
+import time
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.datastore_v1.types import datastore as datastore_pb2
+
+from gcdmc.core import Registry, Subclient
+from gcdmc.model import ImportStats, Importer, TypedEntity
+from gcdmc.model.properties import (
+    DatetimeProperty,
+    EmailProperty,
+    FloatListProperty,
+    IntegerProperty,
+    StringProperty,
+)
+
+ROWS: int = 5_000
+
+#: The simulated round-trip time of a single commit, in seconds.
+LATENCY: float = 0.25
+
+
+class Account(TypedEntity):
+    __kind__ = 'Account'
+    name = StringProperty(nullable=False)
+    email = EmailProperty()
+    logins = IntegerProperty()
+    created_at = DatetimeProperty()
+    readings = FloatListProperty(indexed=False)
+
+
+class SlowDatastoreAPI:
+    """Accepts every commit after a fixed delay.
+    """
+    def commit(self, request: Dict[str, Any],
+               **kwargs: Any) -> datastore_pb2.CommitResponse:
+        time.sleep(LATENCY)
+        return datastore_pb2.CommitResponse()
+
+
+def _write(path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(ROWS):
+            f.write(
+                json.dumps({
+                    '__key__': ['Account', i + 1],
+                    'name': f'account {i}',
+                    'email': f'account{i}@example.com',
+                    'logins': i,
+                    'created_at': '2021-02-03T04:05:06+00:00',
+                    'readings': [float(j) for j in range(20)],
+                }) + '\n')
+
+
+def main() -> None:
+    registry: Registry = Registry()
+    registry.register_subentity_type('Account', Account)
+    client: Subclient = Subclient(project='bench',
+                                  credentials=AnonymousCredentials(),
+                                  registry=registry)
+    client._datastore_api_internal = SlowDatastoreAPI()
+    processes: int = os.cpu_count() or 1
+    runs: List[Tuple[str, int, int]] = [
+        ('serial', 1, 1),
+        ('parallel', processes, 8),
+    ]
+    print(f'{ROWS} rows, {LATENCY * 1000:.0f} ms per commit')
+    print(f'{"pipeline":<10} {"processes":>9} {"in flight":>9} '
+          f'{"rows/s":>10}')
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, 'accounts.ndjson')
+        _write(path)
+        for name, workers, in_flight in runs:
+            stats: ImportStats = Importer(Account,
+                                          client,
+                                          processes=workers,
+                                          max_in_flight=in_flight).run(path)
+            print(f'{name:<10} {workers:>9} {in_flight:>9} '
+                  f'{stats.rows_per_second:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Measures the time taken to import gcdmc and its subpackages in a fresh
+interpreter, as reported by `python -X importtime`. The imports made by the
+interpreter itself at startup are subtracted.
+
+Run with: python benchmarks/bench_import_time.py
+"""
+from __future__ import annotations
+from typing import List
+
+import subprocess
+import sys
+
+REPEAT: int = 5
+
+STATEMENTS: List[str] = [
+    'import gcdmc',
+    'import gcdmc.model.errors',
+    'from gcdmc.model import TypedEntity',
+    'from gcdmc.model.properties import PhoneProperty',
+    'from gcdmc.core import Subclient',
+]
+
+
+def _import_time(statement: str) -> float:
+    """Returns the total import time of a statement in a fresh interpreter,
+    in milliseconds.
+    """
+    result: subprocess.CompletedProcess = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True,
+        text=True,
+        check=True)
+    total: int = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # Only top level imports are counted, since their cumulative time
+        # includes the imports they trigger.
+        if not name.startswith('  '):
+            total += int(cumulative)
+    return total / 1000
+
+
+def _best_import_time(statement: str) -> float:
+    return min(_import_time(statement) for _ in range(REPEAT))
+
+
+def main() -> None:
+    baseline: float = _best_import_time('pass')
+    print(f'{"statement":<50} {"import (ms)":>12}')
+    for statement in STATEMENTS:
+        elapsed: float = _best_import_time(statement) - baseline
+        print(f'{statement:<50} {max(elapsed, 0.0):>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Measures the cost of hashing plain and interned keys, of looking them up
+in a dictionary, and of decoding URL safe keys with and without the
+cache of decoded strings.
+
+Run with: python benchmarks/bench_keys.py
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, List
+
+import timeit
+
+from google.cloud.datastore import Key
+
+from gcdmc.core.keys import intern_key, key_from_urlsafe
+
+NUMBER: int = 20
+
+#: The number of distinct keys used by each measurement.
+KEYS: int = 1000
+
+
+def _keys() -> List[Key]:
+    return [
+        Key('Parent', 'p', 'Item', i + 1, project='bench') for i in range(KEYS)
+    ]
+
+
+def _time(func: Callable[[], Any]) -> float:
+    """Returns the best time per key, in microseconds.
+    """
+    return min(timeit.repeat(func, number=NUMBER, repeat=5)) / (NUMBER *
+                                                               KEYS) * 1e6
+
+
+def _lookup(keys: List[Key]) -> None:
+    """Builds a dictionary keyed by the keys, then looks each key up in it,
+    as a reduction does for a batch of puts.
+    """
+    keyed: Dict[Key, int] = {key: i for i, key in enumerate(keys)}
+    for key in keys:
+        keyed[key]
+
+
+def main() -> None:
+    plain: List[Key] = _keys()
+    interned: List[Key] = [intern_key(key) for key in plain]
+    urlsafe: List[str] = [key.to_legacy_urlsafe().decode() for key in plain]
+
+    print(f'{"operation":<16} {"plain (us)":>11} {"interned (us)":>14}')
+    rows: List[tuple] = [
+        ('hash', lambda: [hash(key) for key in plain],
+         lambda: [hash(key) for key in interned]),
+        ('dict lookup', lambda: _lookup(plain), lambda: _lookup(interned)),
+        ('decode urlsafe',
+         lambda: [Key.from_legacy_urlsafe(s) for s in urlsafe],
+         lambda: [key_from_urlsafe(s) for s in urlsafe]),
+    ]
+    for name, before, after in rows:
+        print(f'{name:<16} {_time(before):>11.2f} {_time(after):>14.2f}')
+
+
+if __name__ == '__main__':
+    main()
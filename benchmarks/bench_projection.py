@@ -0,0 +1,83 @@
+"""Compares iterating over query results as typed entities, as projection
+records and as keys, for an entity type with 40 properties of which the
+projection reads 3.
+
+Run with: python benchmarks/bench_projection.py
+"""
+from __future__ import annotations
+from typing import Any, Dict, List
+
+import timeit
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.datastore_v1.types import datastore as datastore_pb2
+from google.cloud.datastore_v1.types import entity as entity_pb2
+from google.cloud.datastore_v1.types import query as query_pb2
+
+from gcdmc.core import Registry, Subclient
+from gcdmc.model import TypedEntity
+from gcdmc.model.properties import IntegerProperty
+
+RESULTS: int = 500
+FIELDS: int = 40
+PROJECTED: List[str] = ['f0', 'f1', 'f2']
+
+Wide: type = type(
+    'Wide', (TypedEntity, ), {
+        '__kind__': 'Wide',
+        **{f'f{i}': IntegerProperty(nullable=False)
+           for i in range(FIELDS)},
+    })
+
+
+class StaticDatastoreAPI:
+    """Answers every query with the same page of entities, keeping only the
+    projected properties.
+    """
+    def run_query(self, request: Dict[str, Any],
+                  **kwargs: Any) -> datastore_pb2.RunQueryResponse:
+        names: List[str] = [
+            p.property.name for p in request['query'].projection
+        ] or [f'f{i}' for i in range(FIELDS)]
+        return datastore_pb2.RunQueryResponse(batch=query_pb2.QueryResultBatch(
+            entity_results=[
+                query_pb2.EntityResult(entity=entity_pb2.Entity(
+                    key=entity_pb2.Key(
+                        partition_id=entity_pb2.PartitionId(
+                            project_id='bench'),
+                        path=[
+                            entity_pb2.Key.PathElement(kind='Wide', id=n + 1)
+                        ]),
+                    properties={
+                        name: entity_pb2.Value(integer_value=n)
+                        for name in names if name != '__key__'
+                    })) for n in range(RESULTS)
+            ],
+            more_results=(
+                query_pb2.QueryResultBatch.MoreResultsType.NO_MORE_RESULTS),
+        ))
+
+
+def main() -> None:
+    registry: Registry = Registry()
+    registry.register_subentity_type('Wide', Wide)
+    client: Subclient = Subclient(project='bench',
+                                  credentials=AnonymousCredentials(),
+                                  registry=registry)
+    client._datastore_api_internal = StaticDatastoreAPI()
+    cases: Dict[str, Any] = {
+        'entities': lambda: list(client.query(kind='Wide').fetch()),
+        'records': lambda: list(
+            client.query(kind='Wide', projection=PROJECTED).fetch_records()),
+        'keys': lambda: list(client.query(kind='Wide').fetch_keys()),
+    }
+    print(f'{RESULTS} results, {FIELDS} properties, '
+          f'{len(PROJECTED)} projected')
+    print(f'{"case":<10} {"per result (us)":>16}')
+    for name, case in cases.items():
+        seconds: float = min(timeit.repeat(case, number=3, repeat=3)) / 3
+        print(f'{name:<10} {seconds / RESULTS * 1e6:>16.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Compares scanning a query with and without page prefetching, against a
+stand-in Datastore API with a fixed round-trip latency, while the consumer
+spends a fixed amount of time on every page.
+
+Run with: python benchmarks/bench_query_prefetch.py
+"""
+from __future__ import annotations
+from typing import Any, Dict
+
+import time
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.datastore_v1.types import datastore as datastore_pb2
+from google.cloud.datastore_v1.types import entity as entity_pb2
+from google.cloud.datastore_v1.types import query as query_pb2
+
+from gcdmc.core import Subclient
+
+PAGES: int = 20
+PAGE_SIZE: int = 50
+
+#: The simulated round-trip time of a single query, in seconds.
+LATENCY: float = 0.01
+
+#: The time the consumer spends on every page, in seconds.
+WORK: float = 0.01
+
+
+class SlowDatastoreAPI:
+    """Answers every query after a fixed delay with a page of entities, using
+    the page number as the cursor.
+    """
+    def run_query(self, request: Dict[str, Any],
+                  **kwargs: Any) -> datastore_pb2.RunQueryResponse:
+        time.sleep(LATENCY)
+        query: query_pb2.Query = request['query']
+        page: int = int(query.start_cursor or b'0')
+        return datastore_pb2.RunQueryResponse(batch=query_pb2.QueryResultBatch(
+            entity_results=[
+                query_pb2.EntityResult(entity=entity_pb2.Entity(
+                    key=entity_pb2.Key(
+                        partition_id=entity_pb2.PartitionId(
+                            project_id='bench'),
+                        path=[
+                            entity_pb2.Key.PathElement(
+                                kind='Item', id=page * PAGE_SIZE + i + 1)
+                        ]),
+                    properties={'n': entity_pb2.Value(integer_value=i)}))
+                for i in range(PAGE_SIZE)
+            ],
+            end_cursor=str(page + 1).encode(),
+            more_results=(
+                query_pb2.QueryResultBatch.MoreResultsType.NOT_FINISHED
+                if page + 1 < PAGES else
+                query_pb2.QueryResultBatch.MoreResultsType.NO_MORE_RESULTS),
+        ))
+
+
+def main() -> None:
+    client: Subclient = Subclient(project='bench',
+                                  credentials=AnonymousCredentials())
+    client._datastore_api_internal = SlowDatastoreAPI()
+    print(f'{PAGES} pages, {LATENCY * 1000:.0f} ms per query, '
+          f'{WORK * 1000:.0f} ms of work per page')
+    print(f'{"prefetch":<10} {"scan (ms)":>10}')
+    for prefetch in (0, 1, 2):
+        start: float = time.perf_counter()
+        for page in client.query(kind='Item').fetch(prefetch=prefetch).pages:
+            list(page)
+            time.sleep(WORK)
+        seconds: float = time.perf_counter() - start
+        print(f'{prefetch:<10} {seconds * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
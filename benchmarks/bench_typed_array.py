@@ -0,0 +1,47 @@
+"""Compares typed lists with typed arrays for long numeric series, in memory
+per element and in the time taken to validate a series.
+
+Run with: python benchmarks/bench_typed_array.py
+"""
+from __future__ import annotations
+from typing import Any, Callable, List
+
+import sys
+import timeit
+
+from gcdmc.model.types import FloatArray, FloatList, IntegerArray, IntegerList
+
+SIZE: int = 10_000
+NUMBER: int = 20
+
+
+def _list_bytes(values: list) -> int:
+    return sys.getsizeof(values) + sum(sys.getsizeof(v) for v in values)
+
+
+def _time(func: Callable[[], Any]) -> float:
+    """Returns the best time per call, in microseconds.
+    """
+    return min(timeit.repeat(func, number=NUMBER, repeat=5)) / NUMBER * 1e6
+
+
+def main() -> None:
+    floats: List[float] = [i * 0.5 for i in range(SIZE)]
+    ints: List[int] = [i * 1_000_003 for i in range(SIZE)]
+
+    print(f'{"type":<14} {"bytes/value":>12} {"validate (us)":>14}')
+    for name, type_, values in [
+        ('FloatList', FloatList, floats),
+        ('FloatArray', FloatArray, floats),
+        ('IntegerList', IntegerList, ints),
+        ('IntegerArray', IntegerArray, ints),
+    ]:
+        instance: Any = type_(values)
+        size: int = (_list_bytes(instance) if isinstance(instance, list) else
+                     sys.getsizeof(instance))
+        elapsed: float = _time(lambda: type_(values))
+        print(f'{name:<14} {size / SIZE:>12.1f} {elapsed:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
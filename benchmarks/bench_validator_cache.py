@@ -0,0 +1,67 @@
+"""Measures strict wrapping of a phone-heavy kind with and without the
+validator caches on `is_parseable_phone` and `is_valid_email`.
+
+Run with: python benchmarks/bench_validator_cache.py
+"""
+from __future__ import annotations
+from typing import Any, Callable, List
+
+import timeit
+
+from google.cloud.datastore import Entity, Key
+
+from gcdmc.core import ReadMode
+from gcdmc.model import TypedEntity
+from gcdmc.model.properties import (
+    EmailProperty,
+    PhoneListProperty,
+    PhoneProperty,
+)
+from gcdmc.model.types.utils import is_parseable_phone, is_valid_email
+
+NUMBER: int = 20
+
+
+class Contact(TypedEntity):
+    __kind__ = 'Contact'
+    email = EmailProperty()
+    phone = PhoneProperty()
+    others = PhoneListProperty()
+
+
+def _entities() -> List[Entity]:
+    entities: List[Entity] = []
+    for i in range(100):
+        entity: Entity = Entity(key=Key('Contact', i + 1, project='bench'))
+        entity.update(email=f'user-{i % 10}@example.com',
+                      phone=f'+1415555{i % 10:04d}',
+                      others=[f'+1212555{j:04d}' for j in range(5)])
+        entities.append(entity)
+    return entities
+
+
+def _time(func: Callable[[], Any]) -> float:
+    """Returns the best time per call, in microseconds.
+    """
+    return min(timeit.repeat(func, number=NUMBER, repeat=3)) / NUMBER * 1e6
+
+
+def main() -> None:
+    entities: List[Entity] = _entities()
+
+    def wrap_all() -> None:
+        for entity in entities:
+            Contact.wrap(entity, read_mode=ReadMode.STRICT)
+
+    print(f'{"cache":<10} {"wrap (us)":>10} {"hit rate":>9}')
+    for maxsize in (0, 4096):
+        is_parseable_phone.maxsize = maxsize
+        is_valid_email.maxsize = maxsize
+        is_parseable_phone.clear()
+        elapsed: float = _time(wrap_all) / len(entities)
+        print(f'{maxsize:<10} {elapsed:>10.2f} '
+              f'{is_parseable_phone.hit_rate:>9.2%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Measures the cost of wrapping a fetched entity as a typed entity in each
+read mode, alone and as part of a page of entities wrapped together.
+
+Run with: python benchmarks/bench_wrap.py
+"""
+from __future__ import annotations
+from typing import Any, Callable, List
+
+import datetime
+import timeit
+
+from google.cloud.datastore import Entity, Key
+
+from gcdmc.core import ReadMode
+from gcdmc.model import TypedEntity
+from gcdmc.model.properties import (
+    BooleanProperty,
+    DatetimeProperty,
+    EmailProperty,
+    FloatListProperty,
+    IntegerProperty,
+    PhoneProperty,
+    StringListProperty,
+    StringProperty,
+)
+
+NUMBER: int = 5_000
+
+#: The number of entities wrapped together by `wrap_many`.
+PAGE_SIZE: int = 1000
+
+
+class Account(TypedEntity):
+    __kind__ = 'Account'
+    name = StringProperty(nullable=False)
+    email = EmailProperty()
+    phone = PhoneProperty()
+    active = BooleanProperty(choices=(True, False))
+    logins = IntegerProperty()
+    created_at = DatetimeProperty()
+    tags = StringListProperty()
+    readings = FloatListProperty(indexed=False)
+
+
+def _entity() -> Entity:
+    entity: Entity = Entity(key=Key('Account', 1, project='bench'),
+                            exclude_from_indexes=('readings', ))
+    entity.update(
+        name='Ada',
+        email='ada@example.com',
+        phone='+14155550100',
+        active=True,
+        logins=12,
+        created_at=datetime.datetime.now(datetime.timezone.utc),
+        tags=['a', 'b', 'c'],
+        readings=[float(i) for i in range(100)],
+    )
+    return entity
+
+
+def _time(func: Callable[[], Any]) -> float:
+    """Returns the best time per call, in microseconds.
+    """
+    return min(timeit.repeat(func, number=NUMBER, repeat=5)) / NUMBER * 1e6
+
+
+def main() -> None:
+    entity: Entity = _entity()
+    page: List[Entity] = [entity] * PAGE_SIZE
+    print(f'{"read mode":<10} {"wrap (us)":>10} {"wrap_many (us)":>15}')
+    for mode in ReadMode:
+        elapsed: float = _time(lambda: Account.wrap(entity, read_mode=mode))
+        per_entity: float = min(
+            timeit.repeat(lambda: Account.wrap_many(page, read_mode=mode),
+                          number=NUMBER // PAGE_SIZE,
+                          repeat=5)) / NUMBER * 1e6
+        print(f'{mode.value:<10} {elapsed:>10.2f} {per_entity:>15.2f}')
+
+
+if __name__ == '__main__':
+    main()
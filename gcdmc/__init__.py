@@ -1,3 +1,24 @@
-import gcdmc.control
-import gcdmc.core
-import gcdmc.model
+"""The `control`, `core` and `model` subpackages are imported the first time
+they are accessed as attributes, so that importing `gcdmc` does not load the
+Datastore client.
+"""
+from __future__ import annotations
+from typing import Any, List, TYPE_CHECKING
+if TYPE_CHECKING:
+    from gcdmc import control, core, model
+
+import importlib
+
+_SUBPACKAGES: List[str] = ['control', 'core', 'model']
+
+__all__ = _SUBPACKAGES
+
+
+def __getattr__(name: str) -> Any:
+    if name in _SUBPACKAGES:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__() -> List[str]:
+    return sorted({*globals(), *_SUBPACKAGES})
@@ -1,17 +1,72 @@
-from gcdmc.core.reduction import ReducedBatch, ReducedTransaction
-from gcdmc.core.registry import Registry, RegistryError
-from gcdmc.core.subclient import Subclient
-from gcdmc.core.subentity import Subentity, undelegated
-from gcdmc.core.subquery import Subiterator, Subquery
+from __future__ import annotations
+from typing import Any, Dict, List, TYPE_CHECKING
+if TYPE_CHECKING:
+    from gcdmc.core.aio import (
+        AsyncReducedBatch,
+        AsyncReducedTransaction,
+        AsyncSubclient,
+        AsyncSubiterator,
+        AsyncSubquery,
+    )
+    from gcdmc.core.cache import EntityCache, QueryCache
+    from gcdmc.core.chunks import ChunkError, ChunkFailure
+    from gcdmc.core.export import ExportStats
+    from gcdmc.core.keys import HashedKey, KeyTable
+    from gcdmc.core.reduction import (
+        ReducedBatch,
+        ReducedTransaction,
+        WriteStats,
+    )
+    from gcdmc.core.registry import Registry, RegistryError
+    from gcdmc.core.sharding import QueryShard, ShardedIterator
+    from gcdmc.core.subclient import Subclient
+    from gcdmc.core.subentity import ReadMode, Subentity, undelegated
+    from gcdmc.core.subquery import Subiterator, Subquery
 
-__all__ = [
-    'ReducedBatch',
-    'ReducedTransaction',
-    'Registry',
-    'RegistryError',
-    'Subclient',
-    'Subentity',
-    'undelegated',
-    'Subiterator',
-    'Subquery',
-]
+import importlib
+
+# The names exported by this package, and the modules that define them. The
+# modules are imported when one of their names is first accessed, since they
+# load the Datastore client.
+_EXPORTS: Dict[str, str] = {
+    'AsyncReducedBatch': 'gcdmc.core.aio',
+    'AsyncReducedTransaction': 'gcdmc.core.aio',
+    'AsyncSubclient': 'gcdmc.core.aio',
+    'AsyncSubiterator': 'gcdmc.core.aio',
+    'AsyncSubquery': 'gcdmc.core.aio',
+    'EntityCache': 'gcdmc.core.cache',
+    'QueryCache': 'gcdmc.core.cache',
+    'ChunkError': 'gcdmc.core.chunks',
+    'ChunkFailure': 'gcdmc.core.chunks',
+    'ExportStats': 'gcdmc.core.export',
+    'HashedKey': 'gcdmc.core.keys',
+    'KeyTable': 'gcdmc.core.keys',
+    'ReducedBatch': 'gcdmc.core.reduction',
+    'ReducedTransaction': 'gcdmc.core.reduction',
+    'WriteStats': 'gcdmc.core.reduction',
+    'Registry': 'gcdmc.core.registry',
+    'RegistryError': 'gcdmc.core.registry',
+    'QueryShard': 'gcdmc.core.sharding',
+    'ShardedIterator': 'gcdmc.core.sharding',
+    'Subclient': 'gcdmc.core.subclient',
+    'ReadMode': 'gcdmc.core.subentity',
+    'Subentity': 'gcdmc.core.subentity',
+    'undelegated': 'gcdmc.core.subentity',
+    'Subiterator': 'gcdmc.core.subquery',
+    'Subquery': 'gcdmc.core.subquery',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module: str = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value: Any = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted({*globals(), *_EXPORTS})
@@ -0,0 +1,615 @@
+from __future__ import annotations
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import asyncio
+import contextvars
+import os
+
+from google.api_core.retry import Retry
+from google.api_core.retry_async import AsyncRetry
+from google.cloud.datastore import Batch, Client, Entity, Key, helpers
+from google.cloud.datastore.batch import _parse_commit_response
+from google.cloud.datastore.query import Query
+from google.cloud.datastore.transaction import Transaction
+from google.cloud.datastore_v1.types import datastore as datastore_pb2
+from google.cloud.datastore_v1.types import entity as entity_pb2
+from google.cloud.datastore_v1.types import query as query_pb2
+
+from gcdmc.core.chunks import (
+    MAX_LOOKUP_KEYS,
+    MAX_MUTATIONS,
+    chunked,
+    run_chunks_async,
+)
+from gcdmc.core.reduction import (
+    ReducedBatch,
+    ReducedTransaction,
+    Reduction,
+    _Staged,
+)
+from gcdmc.core.subclient import (
+    Subclient,
+    _Lookup,
+    _check_deferred_loops,
+    _retry_timeout_kwargs,
+)
+from gcdmc.core.subentity import Subentity
+from gcdmc.core.subquery import (
+    Subiterator,
+    Subpage,
+    Subquery,
+    _copy_query,
+)
+
+
+class AsyncReducedBatch(ReducedBatch):
+    """A reduced batch for use with an `AsyncSubclient`, which is committed
+    without blocking the event loop.
+
+    Use the batch with `async with`. While the block runs, puts and deletes
+    made through the subclient in the same task are added to the batch.
+    """
+    def __enter__(self) -> AsyncReducedBatch:
+        raise TypeError(f'{type(self).__name__} must be used with '
+                        '`async with`')
+
+    async def __aenter__(self) -> AsyncReducedBatch:
+        await self.begin()
+        self._token: contextvars.Token = self._client._current_batch.set(self)
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc_val: Any,
+                        exc_tb: Any) -> None:
+        try:
+            if exc_type is None:
+                await self.commit()
+            else:
+                await self.rollback()
+        finally:
+            self._client._current_batch.reset(self._token)
+
+    async def begin(self) -> None:
+        """Begins the batch.
+        """
+        Batch.begin(self)
+
+    async def rollback(self) -> None:
+        """Marks the batch as aborted, so that it cannot be used again.
+        """
+        Batch.rollback(self)
+
+    async def commit(self,
+                     retry: Optional[Retry] = None,
+                     timeout: Optional[float] = None) -> None:
+        """Commits the batch. See `ReducedBatch.commit`.
+        """
+        staged: Optional[_Staged] = self._stage()
+        if staged is None:
+            return
+        try:
+            await self._send_commit(retry, timeout)
+        finally:
+            self._settle(staged)
+        for entity in staged.written:
+            entity.mark_clean()
+
+    async def _send_commit(self, retry: Optional[Retry],
+                           timeout: Optional[float]) -> None:
+        """Sends the mutations of the batch, in as many requests as needed,
+        and completes the keys of the entities that were put with partial
+        keys. See `ReducedBatch.commit`.
+        """
+        if self._status != self._IN_PROGRESS:
+            raise ValueError('Batch must be in progress to commit()')
+        mode: Any = (datastore_pb2.CommitRequest.Mode.NON_TRANSACTIONAL
+                     if self._id is None else
+                     datastore_pb2.CommitRequest.Mode.TRANSACTIONAL)
+        try:
+            for mutations, partial in self._chunks():
+                response: datastore_pb2.CommitResponse = (
+                    await self._client._async_datastore_api.commit(
+                        request={
+                            'project_id': self.project,
+                            'mode': mode,
+                            'transaction': self._id,
+                            'mutations': mutations,
+                        },
+                        **_async_retry_timeout_kwargs(retry, timeout)))
+                updated_keys: List[Any] = _parse_commit_response(response)[1]
+                for key_pb, entity in zip(updated_keys, partial):
+                    entity.key = entity.key.completed_key(
+                        key_pb.path[-1].id)
+        finally:
+            self._status = self._FINISHED
+
+
+class AsyncReducedTransaction(ReducedTransaction, AsyncReducedBatch):
+    """A reduced transaction for use with an `AsyncSubclient`, which begins,
+    commits and rolls back without blocking the event loop.
+
+    Use the transaction with `async with`. While the block runs, lookups,
+    queries, puts and deletes made through the subclient in the same task
+    are part of the transaction.
+    """
+    async def begin(self,
+                    retry: Optional[Retry] = None,
+                    timeout: Optional[float] = None) -> None:
+        """Begins the transaction.
+        """
+        Batch.begin(self)
+        try:
+            response: datastore_pb2.BeginTransactionResponse = (
+                await self._client._async_datastore_api.begin_transaction(
+                    request={
+                        'project_id': self.project,
+                        'transaction_options': self._options,
+                    },
+                    **_async_retry_timeout_kwargs(retry, timeout)))
+            self._id = response.transaction
+        except BaseException:
+            self._status = self._ABORTED
+            raise
+
+    async def commit(self,
+                     retry: Optional[Retry] = None,
+                     timeout: Optional[float] = None) -> None:
+        """Commits the transaction.
+        """
+        try:
+            await AsyncReducedBatch.commit(self, retry=retry, timeout=timeout)
+        finally:
+            self._id = None
+
+    async def rollback(self,
+                       retry: Optional[Retry] = None,
+                       timeout: Optional[float] = None) -> None:
+        """Rolls back the transaction.
+        """
+        try:
+            await self._client._async_datastore_api.rollback(
+                request={
+                    'project_id': self.project,
+                    'transaction': self._id,
+                }, **_async_retry_timeout_kwargs(retry, timeout))
+        finally:
+            Batch.rollback(self)
+            self._id = None
+
+
+class AsyncSubiterator(Subiterator):
+    """An iterator over the results of a query for use with `async for`.
+
+    Each page is requested as soon as the previous page has arrived, so the
+    next page is already on its way while the current one is consumed. This
+    can be disabled with `prefetch`.
+    """
+    def __iter__(self) -> Any:
+        raise TypeError(f'{type(self).__name__} must be used with '
+                        '`async for`')
+
+    def __aiter__(self) -> AsyncIterator[Subentity]:
+        return self._aiter_items()
+
+    @property
+    def pages(self) -> AsyncIterator[Subpage]:
+        """Returns an async iterator over the pages of results.
+        """
+        return self._aiter_pages()
+
+    async def _aiter_items(self) -> AsyncIterator[Subentity]:
+        async for page in self._aiter_pages():
+            for item in page:
+                self.num_results += 1
+                yield item
+
+    async def _aiter_pages(self) -> AsyncIterator[Subpage]:
+        if self._started:
+            raise ValueError('Iterator has already started', self)
+        self._started = True
+        self._fetched: int = 0
+        pending: Optional[asyncio.Future] = None
+        if self._more_results:
+            pending = asyncio.ensure_future(self._fetch_page())
+        try:
+            while pending is not None:
+                page: Subpage = await pending
+                pending = None
+                if self._more_results and self.prefetch:
+                    pending = asyncio.ensure_future(self._fetch_page())
+                self.page_number += 1
+                yield page
+                if pending is None and self._more_results:
+                    pending = asyncio.ensure_future(self._fetch_page())
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def _fetch_page(self) -> Subpage:
+        """Requests the next page of results, or replays it from the query
+        cache of the client if the results are cached.
+        """
+        if self.cached and not self._cache_opened:
+            self._open_cache()
+        response: datastore_pb2.RunQueryResponse
+        if self._replay is not None:
+            response = self._replay.popleft()
+        else:
+            response = await self._run_query_async()
+        entity_pbs: List[Any] = self._process_query_results(response)
+        self._fetched += len(entity_pbs)
+        self._record_page(response)
+        return Subpage(self,
+                       entity_pbs,
+                       self.item_to_value,
+                       raw_page=response,
+                       registry=self._registry)
+
+    async def _run_query_async(self) -> datastore_pb2.RunQueryResponse:
+        """Sends the query for the next page of results.
+        """
+        query_pb: query_pb2.Query = self._build_protobuf()
+        if self.max_results is not None:
+            # Pages that were fetched ahead have not been consumed yet, so
+            # the limit is based on the number of results fetched.
+            query_pb.limit = self.max_results - self._fetched
+        transaction: Optional[Transaction] = self.client.current_transaction
+        request: Dict[str, Any] = {
+            'project_id': self._query.project,
+            'partition_id': entity_pb2.PartitionId(
+                project_id=self._query.project,
+                namespace_id=self._query.namespace),
+            'read_options': helpers.get_read_options(
+                self._eventual, transaction and transaction.id),
+            'query': query_pb,
+        }
+        kwargs: Dict[str, Any] = _async_retry_timeout_kwargs(
+            self._retry, self._timeout)
+        api: Any = self.client._async_datastore_api
+        response: datastore_pb2.RunQueryResponse = await api.run_query(
+            request=request, **kwargs)
+        while (response.batch.more_results
+               == query_pb2.QueryResultBatch.MoreResultsType.NOT_FINISHED
+               and response.batch.skipped_results < query_pb.offset):
+            # The Datastore skips at most 1000 results per request, so the
+            # query is sent again from where the skipping stopped.
+            query_pb = _copy_query(query_pb)
+            query_pb.start_cursor = response.batch.skipped_cursor
+            query_pb.offset -= response.batch.skipped_results
+            request['query'] = query_pb
+            response = await api.run_query(request=request, **kwargs)
+        return response
+
+
+class AsyncSubquery(Subquery):
+    """A subquery whose results are iterated with `async for`.
+    """
+    def fetch(self,
+              limit: Optional[int] = None,
+              offset: int = 0,
+              start_cursor: Optional[bytes] = None,
+              end_cursor: Optional[bytes] = None,
+              client: Optional[Client] = None,
+              eventual: bool = False,
+              retry: Optional[Retry] = None,
+              timeout: Optional[float] = None,
+              prefetch: bool = True,
+              cached: bool = False) -> AsyncSubiterator:
+        """Returns an async iterator over the results of the query.
+
+        :type prefetch: bool, optional
+        :param prefetch: Whether or not each page is requested before the
+            previous page has been consumed. Defaults to `true`.
+
+        :type cached: bool, optional
+        :param cached: Whether or not the results may be read from, and are
+            added to, the query cache of the client. Defaults to `false`.
+        """
+        iterator: AsyncSubiterator = AsyncSubiterator.derive(
+            Query.fetch(self,
+                        limit=limit,
+                        offset=offset,
+                        start_cursor=start_cursor,
+                        end_cursor=end_cursor,
+                        client=client,
+                        eventual=eventual,
+                        retry=retry,
+                        timeout=timeout),
+            registry=self._registry,
+            prefetch=prefetch,
+            cached=cached)
+        return iterator
+
+    def shard(self, *args: Any, **kwargs: Any) -> Any:
+        """Sharded scans read their shards on threads, so they are not
+        supported for async queries.
+
+        :raises: :class:`NotImplementedError`
+        """
+        raise NotImplementedError('Async queries cannot be sharded')
+
+    def fetch_sharded(self, *args: Any, **kwargs: Any) -> Any:
+        """Sharded scans read their shards on threads, so they are not
+        supported for async queries.
+
+        :raises: :class:`NotImplementedError`
+        """
+        raise NotImplementedError('Async queries cannot be sharded')
+
+    def export(self, *args: Any, **kwargs: Any) -> Any:
+        """Exports write their file synchronously, so they are not supported
+        for async queries. The file is not opened.
+
+        :raises: :class:`NotImplementedError`
+        """
+        raise NotImplementedError('Async queries cannot be exported')
+
+
+class AsyncSubclient(Subclient):
+    """A subclient whose reads and writes are coroutines, for use with
+    asyncio.
+
+    Requests are sent with the asyncio Datastore API client, or with the
+    emulator given by the `DATASTORE_EMULATOR_HOST` environment variable, so
+    no threads are used. Entities are wrapped with the registry exactly as
+    they are by `Subclient`, and calls larger than a single request accepts
+    are split into chunks that are awaited concurrently.
+
+    The current batch or transaction is tracked per task, so concurrent
+    tasks can each use their own transaction.
+
+    Methods that take a `retry` accept a
+    :class:`google.api_core.retry_async.AsyncRetry`, or a
+    :class:`google.api_core.retry.Retry`, which is converted to an
+    `AsyncRetry` with the same settings.
+
+    Accepts the same arguments as `Subclient`.
+    """
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._current_batch: contextvars.ContextVar = contextvars.ContextVar(
+            f'gcdmc_current_batch_{id(self)}', default=None)
+        self._async_datastore_api_internal: Optional[Any] = None
+
+    @property
+    def _async_datastore_api(self) -> Any:
+        """Returns the asyncio Datastore API client, creating it on first
+        use.
+        """
+        if self._async_datastore_api_internal is None:
+            from google.cloud.datastore_v1.services.datastore import (
+                DatastoreAsyncClient,
+            )
+            emulator_host: Optional[str] = os.environ.get(
+                'DATASTORE_EMULATOR_HOST')
+            if emulator_host:
+                import grpc
+                from google.cloud.datastore_v1.services.datastore.transports \
+                    import DatastoreGrpcAsyncIOTransport
+                self._async_datastore_api_internal = DatastoreAsyncClient(
+                    transport=DatastoreGrpcAsyncIOTransport(
+                        channel=grpc.aio.insecure_channel(emulator_host)))
+            else:
+                self._async_datastore_api_internal = DatastoreAsyncClient(
+                    credentials=self._credentials,
+                    client_options=self._client_options)
+        return self._async_datastore_api_internal
+
+    @property
+    def current_batch(self) -> Optional[ReducedBatch]:
+        """Returns the batch or transaction of the current task, if any.
+        """
+        return self._current_batch.get()
+
+    async def get(self,
+                  key: Union[Key, str],
+                  missing: Optional[List] = None,
+                  deferred: Optional[List] = None,
+                  transaction: Optional[Transaction] = None,
+                  eventual: bool = False,
+                  retry: Optional[Retry] = None,
+                  timeout: Optional[float] = None) -> Optional[Subentity]:
+        """Retrieves a single entity, or `None` if it is missing.
+        """
+        entities: List[Subentity] = await self.get_multi(
+            [key],
+            missing=missing,
+            deferred=deferred,
+            transaction=transaction,
+            eventual=eventual,
+            retry=retry,
+            timeout=timeout)
+        return entities[0] if entities else None
+
+    async def get_multi(self,
+                        keys: List[Key | str],
+                        missing: Optional[List] = None,
+                        deferred: Optional[List] = None,
+                        transaction: Optional[Transaction] = None,
+                        eventual: bool = False,
+                        retry: Optional[Retry] = None,
+                        timeout: Optional[float] = None,
+                        aligned: bool = False) -> List[Optional[Subentity]]:
+        """Retrieves entities and wraps them as subentities. See
+        `Subclient.get_multi`.
+        """
+        retry = _async_retry(retry)
+        lookup: _Lookup = _Lookup(self,
+                                  keys,
+                                  missing=missing,
+                                  deferred=deferred,
+                                  transaction=transaction,
+                                  eventual=eventual)
+        results: List[Tuple[List[Subentity], List, List]] = (
+            await run_chunks_async(
+                lambda chunk: self._lookup_async(lookup, chunk, retry,
+                                                 timeout),
+                chunked(lookup.uncached, MAX_LOOKUP_KEYS),
+                max_workers=(1 if lookup.transaction is not None else
+                             self._max_workers)))
+        return lookup.merge(results, aligned=aligned)
+
+    async def put(self,
+                  entity: Entity,
+                  retry: Optional[Retry] = None,
+                  timeout: Optional[float] = None) -> None:
+        """Saves an entity. See `put_multi`.
+        """
+        await self.put_multi([entity], retry=retry, timeout=timeout)
+
+    async def put_multi(self,
+                        entities: List[Entity],
+                        retry: Optional[Retry] = None,
+                        timeout: Optional[float] = None) -> None:
+        """Saves entities in the Datastore.
+
+        Inside a batch or transaction, the entities are added to it.
+        Otherwise they are committed in chunks, each in its own batch.
+        """
+        if isinstance(entities, Entity):
+            raise ValueError('Pass a sequence of entities')
+        current: Optional[ReducedBatch] = self.current_batch
+        if current is not None:
+            for entity in entities:
+                current.put(entity)
+            return
+        reduction: Reduction = Reduction()
+        reduction.put_multi(entities)
+        await self._commit_chunks_async(reduction.entities, ReducedBatch.put,
+                                        retry, timeout)
+
+    async def delete(self,
+                     key: Union[Key, Entity],
+                     retry: Optional[Retry] = None,
+                     timeout: Optional[float] = None) -> None:
+        """Deletes a key. See `delete_multi`.
+        """
+        await self.delete_multi([key], retry=retry, timeout=timeout)
+
+    async def delete_multi(self,
+                           keys: List[Union[Key, Entity]],
+                           retry: Optional[Retry] = None,
+                           timeout: Optional[float] = None) -> None:
+        """Deletes keys from the Datastore.
+
+        Inside a batch or transaction, the deletes are added to it. Otherwise
+        they are committed in chunks, each in its own batch.
+        """
+        db_keys: List[Key] = [
+            k.key if isinstance(k, Entity) else k for k in keys
+        ]
+        current: Optional[ReducedBatch] = self.current_batch
+        if current is not None:
+            for key in db_keys:
+                current.delete(key)
+            return
+        await self._commit_chunks_async(list(dict.fromkeys(db_keys)),
+                                        ReducedBatch.delete, retry, timeout)
+
+    def batch(self,
+              autoupdate: bool = True,
+              force: bool = False) -> AsyncReducedBatch:
+        """Proxy to the `AsyncReducedBatch` constructor.
+        """
+        return AsyncReducedBatch(self, autoupdate=autoupdate, force=force)
+
+    def transaction(self, **kwargs: Any) -> AsyncReducedTransaction:
+        """Proxy to the `AsyncReducedTransaction` constructor.
+        """
+        return AsyncReducedTransaction(self, **kwargs)
+
+    def query(self, **kwargs: Any) -> AsyncSubquery:
+        """Returns an async subquery derived from a plain Datastore query.
+        """
+        return AsyncSubquery.derive(Client.query(self, **kwargs),
+                                    registry=self._registry)
+
+    async def _lookup_async(
+        self,
+        lookup: _Lookup,
+        keys: List[Key],
+        retry: Optional[Retry] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[List[Subentity], List[Entity], List[Key]]:
+        """Looks up a single chunk of keys. Follow-up lookups of deferred keys
+        are sent before the entities that were already found are wrapped.
+        See `Subclient._lookup`.
+        """
+        api: Any = self._async_datastore_api
+        kwargs: Dict[str, Any] = _async_retry_timeout_kwargs(retry, timeout)
+        found: List[Subentity] = []
+        missing: List[Entity] = []
+        response: datastore_pb2.LookupResponse = await api.lookup(
+            request=lookup.request([key.to_protobuf() for key in keys]),
+            **kwargs)
+        loops: int = 0
+        while True:
+            pending: Optional[asyncio.Future] = None
+            if response.deferred and lookup.resolve_deferred:
+                loops = _check_deferred_loops(loops)
+                pending = asyncio.ensure_future(
+                    api.lookup(request=lookup.request(list(response.deferred)),
+                               **kwargs))
+            try:
+                lookup.absorb(response, found, missing)
+            except BaseException:
+                if pending is not None:
+                    pending.cancel()
+                raise
+            if pending is None:
+                return found, missing, [
+                    helpers.key_from_protobuf(key_pb)
+                    for key_pb in response.deferred
+                ]
+            response = await pending
+
+    async def _commit_chunks_async(self, items: List[Any], add: Any,
+                                   retry: Optional[Retry],
+                                   timeout: Optional[float]) -> None:
+        """Commits items in chunks of the largest size a single commit
+        accepts, with one batch per chunk. See `Subclient._commit_chunks`.
+        """
+        async def commit(chunk: List[Any]) -> None:
+            batch: AsyncReducedBatch = self.batch()
+            await batch.begin()
+            for item in chunk:
+                add(batch, item)
+            await batch.commit(retry=retry, timeout=timeout)
+
+        await run_chunks_async(commit,
+                               chunked(items, MAX_MUTATIONS),
+                               max_workers=self._max_workers)
+
+
+def _async_retry(
+        retry: Optional[Union[Retry, AsyncRetry]]) -> Optional[AsyncRetry]:
+    """Returns the asyncio counterpart of a retry object, since the asyncio
+    Datastore API client only accepts `AsyncRetry` objects. A `Retry` is
+    converted to an `AsyncRetry` with the same settings.
+    """
+    if retry is None or isinstance(retry, AsyncRetry):
+        return retry
+    if not isinstance(retry, Retry):
+        raise TypeError(f'retry must be a Retry or an AsyncRetry, got '
+                        f'{type(retry).__name__}')
+    return AsyncRetry(predicate=retry._predicate,
+                      initial=retry._initial,
+                      maximum=retry._maximum,
+                      multiplier=retry._multiplier,
+                      timeout=retry.timeout,
+                      on_error=retry._on_error)
+
+
+def _async_retry_timeout_kwargs(retry: Optional[Union[Retry, AsyncRetry]],
+                                timeout: Optional[float]) -> Dict[str, Any]:
+    """Returns the keyword arguments that pass a retry and timeout to an
+    asyncio Datastore API method. See `_async_retry`.
+    """
+    return _retry_timeout_kwargs(_async_retry(retry), timeout)
@@ -0,0 +1,392 @@
+from __future__ import annotations
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import collections
+import threading
+import time
+
+from google.cloud.datastore import Key
+
+from gcdmc.core.keys import intern_key
+
+#: The size, in bytes, counted for an entry recording that a key is missing.
+NEGATIVE_ENTRY_SIZE: int = 64
+
+#: A cached lookup result: whether the entity was found, the entity protobuf
+#  if it was, the time at which the entry expires and the size of the entry.
+_Entry = Tuple[bool, Optional[Any], float, int]
+
+
+class EntityCache:
+    """A read-through cache of entities, used by a subclient to answer lookups
+    without a round trip to the Datastore.
+
+    Entities are cached as the protobufs returned by the Datastore, and are
+    converted and wrapped again on every read, so callers never share a
+    subentity. Keys that were looked up and found to be missing are cached as
+    well. Once the cache holds more than `max_entries` entries or
+    `max_bytes` bytes of protobufs, the least recently used entries are
+    evicted.
+
+    Batches and transactions committed through the subclient invalidate the
+    keys they write or delete. Lookups made in a transaction bypass the cache.
+
+    :type max_entries: int, optional
+    :param max_entries: The maximum number of keys to cache.
+
+    :type max_bytes: int, optional
+    :param max_bytes: The maximum total size of the cached protobufs. If not
+        given, only the number of entries is bounded.
+
+    :type ttl: float, optional
+    :param ttl: The number of seconds an entry stays valid. If not given,
+        entries stay valid until they are invalidated or evicted.
+
+    :type ttls: dict, optional
+    :param ttls: Number of seconds entries stay valid, keyed by kind. These
+        override `ttl`. A TTL of zero disables caching for a kind.
+
+    :type clock: callable, optional
+    :param clock: Returns the current time in seconds. Defaults to
+        `time.monotonic`.
+    """
+    def __init__(self,
+                 max_entries: int = 10_000,
+                 max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None,
+                 ttls: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        if max_entries < 0:
+            raise ValueError(
+                f'max_entries must not be negative, got {max_entries}')
+        self.max_entries: int = max_entries
+        self.max_bytes: Optional[int] = max_bytes
+        self.ttl: Optional[float] = ttl
+        self.ttls: Dict[str, float] = dict(ttls or {})
+        self._clock: Callable[[], float] = clock
+        self._entries: collections.OrderedDict[Key, _Entry] = (
+            collections.OrderedDict())
+        self._bytes: int = 0
+        self._generations: Dict[str, int] = {}
+        self._cleared: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+        #: The number of lookups answered from the cache.
+        self.hits: int = 0
+
+        #: The number of lookups that were not cached, or had expired.
+        self.misses: int = 0
+
+        #: The number of entries removed to stay within the bounds.
+        self.evictions: int = 0
+
+    def __repr__(self) -> str:
+        return (f'EntityCache(size={self.size}, hits={self.hits}, '
+                f'misses={self.misses}, evictions={self.evictions})')
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Returns the number of cached entries.
+        """
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """Returns the total size of the cached entries.
+        """
+        return self._bytes
+
+    @property
+    def hit_rate(self) -> float:
+        """Returns the fraction of lookups that were answered from the cache,
+        or `0.0` if the cache has not been used.
+        """
+        calls: int = self.hits + self.misses
+        return self.hits / calls if calls > 0 else 0.0
+
+    def generation(self, kind: str) -> int:
+        """Returns a number that changes whenever keys of a kind are
+        invalidated. A lookup passes the generation of the kind of each key
+        at which it started to `put`, so that results read before a
+        concurrent commit are not cached. Commits of other kinds do not
+        affect the lookup.
+        """
+        # Both counts only grow, so their sum changes whenever either does.
+        return self._cleared + self._generations.get(kind, 0)
+
+    def get(self, key: Key) -> Optional[Tuple[bool, Optional[Any]]]:
+        """Returns the cached lookup result for a key.
+
+        :type key: :class:`google.cloud.datastore.key.Key`
+        :param key: The key to look up.
+
+        :rtype: tuple
+        :returns: `None` if the key is not cached, or otherwise whether the
+            entity was found and its protobuf, which is `None` if it was not.
+        """
+        with self._lock:
+            entry: Optional[_Entry] = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[2] <= self._clock():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self,
+            key: Key,
+            entity_pb: Optional[Any],
+            generation: Optional[int] = None) -> None:
+        """Caches the lookup result for a key.
+
+        :type key: :class:`google.cloud.datastore.key.Key`
+        :param key: The key that was looked up.
+
+        :type entity_pb: :class:`google.cloud.datastore_v1.types.Entity`
+        :param entity_pb: The raw protobuf of the entity that was found, or
+            `None` if the key is missing.
+
+        :type generation: int, optional
+        :param generation: The generation of the kind of the key at which the
+            lookup started. The result is not cached if keys of the kind were
+            invalidated since.
+        """
+        ttl: Optional[float] = self.ttls.get(key.kind, self.ttl)
+        if ttl is not None and ttl <= 0:
+            return
+        expires: float = float('inf') if ttl is None else self._clock() + ttl
+        size: int = NEGATIVE_ENTRY_SIZE
+        if entity_pb is not None:
+            # The protobuf is copied, since a message nested in a response
+            # keeps the whole response alive.
+            stored: Any = type(entity_pb)()
+            stored.CopyFrom(entity_pb)
+            entity_pb = stored
+            size = entity_pb.ByteSize()
+        key = intern_key(key)
+        with self._lock:
+            if (generation is not None
+                    and generation != self.generation(key.kind)):
+                return
+            self._remove(key)
+            self._entries[key] = (entity_pb is not None, entity_pb, expires,
+                                  size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or
+                                     (self.max_bytes is not None
+                                      and self._bytes > self.max_bytes)):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, keys: Iterable[Key]) -> None:
+        """Removes keys from the cache.
+
+        :type keys: iterable
+        :param keys: The keys to remove.
+        """
+        with self._lock:
+            for key in keys:
+                self._generations[key.kind] = (
+                    self._generations.get(key.kind, 0) + 1)
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Removes every entry and resets the counters.
+        """
+        with self._lock:
+            self._cleared += 1
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def _remove(self, key: Key) -> None:
+        entry: Optional[_Entry] = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[3]
+
+
+class QueryCache:
+    """A cache of query results, used by a subclient to answer repeated
+    queries without a round trip to the Datastore.
+
+    Queries opt in with `Subquery.fetch(cached=True)`, including async
+    queries. Results are cached under a fingerprint of the query and the
+    arguments of the fetch, once every page of the query has been read. The
+    pages are cached as the responses returned by the Datastore, and are
+    converted and wrapped again on every read, so callers never share a
+    subentity. Once the cache holds more than `max_entries` queries, the
+    least recently used are evicted.
+
+    Batches and transactions committed through the subclient invalidate the
+    queries of every kind they write or delete. Queries run in a transaction
+    bypass the cache.
+
+    :type max_entries: int, optional
+    :param max_entries: The maximum number of queries to cache.
+
+    :type ttl: float, optional
+    :param ttl: The number of seconds an entry stays valid. If not given,
+        entries stay valid until they are invalidated or evicted.
+
+    :type ttls: dict, optional
+    :param ttls: Number of seconds entries stay valid, keyed by kind. These
+        override `ttl`. A TTL of zero disables caching for a kind.
+
+    :type clock: callable, optional
+    :param clock: Returns the current time in seconds. Defaults to
+        `time.monotonic`.
+    """
+    def __init__(self,
+                 max_entries: int = 1000,
+                 ttl: Optional[float] = None,
+                 ttls: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        if max_entries < 0:
+            raise ValueError(
+                f'max_entries must not be negative, got {max_entries}')
+        self.max_entries: int = max_entries
+        self.ttl: Optional[float] = ttl
+        self.ttls: Dict[str, float] = dict(ttls or {})
+        self._clock: Callable[[], float] = clock
+        self._entries: collections.OrderedDict[Hashable, Tuple[
+            Optional[str], Tuple[Any, ...], float]] = collections.OrderedDict()
+        self._by_kind: Dict[Optional[str], Set[Hashable]] = {}
+        self._generations: Dict[Optional[str], int] = {}
+        self._cleared: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+        #: The number of queries answered from the cache.
+        self.hits: int = 0
+
+        #: The number of queries that were not cached, or had expired.
+        self.misses: int = 0
+
+        #: The number of entries removed to stay within the bounds.
+        self.evictions: int = 0
+
+    def __repr__(self) -> str:
+        return (f'QueryCache(size={self.size}, hits={self.hits}, '
+                f'misses={self.misses}, evictions={self.evictions})')
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Returns the number of cached queries.
+        """
+        return len(self._entries)
+
+    def generation(self, kind: Optional[str]) -> int:
+        """Returns a number that changes whenever the queries of a kind are
+        invalidated. A query passes the generation it started at to `put`, so
+        that results read before a concurrent commit are not cached.
+        """
+        # Both counts only grow, so their sum changes whenever either does.
+        return self._cleared + self._generations.get(kind, 0)
+
+    def get(self, fingerprint: Hashable) -> Optional[Tuple[Any, ...]]:
+        """Returns the cached pages of a query, or `None` if the query is not
+        cached.
+
+        :type fingerprint: hashable
+        :param fingerprint: The fingerprint of the query.
+        """
+        with self._lock:
+            entry: Optional[Tuple[Optional[str], Tuple[Any, ...],
+                                  float]] = self._entries.get(fingerprint)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[2] <= self._clock():
+                self._remove(fingerprint)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(fingerprint)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, fingerprint: Hashable, kind: Optional[str],
+            pages: Sequence[Any], generation: int) -> None:
+        """Caches the pages of a query.
+
+        :type fingerprint: hashable
+        :param fingerprint: The fingerprint of the query.
+
+        :type kind: str
+        :param kind: The kind that was queried.
+
+        :type pages: list
+        :param pages: The responses of every page of the query.
+
+        :type generation: int
+        :param generation: The generation of the kind at which the query
+            started. The pages are not cached if the kind was invalidated
+            since.
+        """
+        ttl: Optional[float] = self.ttls.get(kind, self.ttl)
+        if ttl is not None and ttl <= 0:
+            return
+        expires: float = float('inf') if ttl is None else self._clock() + ttl
+        with self._lock:
+            if generation != self.generation(kind):
+                return
+            self._remove(fingerprint)
+            self._entries[fingerprint] = (kind, tuple(pages), expires)
+            self._by_kind.setdefault(kind, set()).add(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_kinds(self, kinds: Iterable[Optional[str]]) -> None:
+        """Removes the queries of the given kinds from the cache. Kindless
+        queries are removed as well, since they can return entities of any
+        kind.
+
+        :type kinds: iterable
+        :param kinds: The kinds whose queries to remove.
+        """
+        with self._lock:
+            for kind in {*kinds, None}:
+                self._generations[kind] = self._generations.get(kind, 0) + 1
+                for fingerprint in list(self._by_kind.get(kind, ())):
+                    self._remove(fingerprint)
+
+    def clear(self) -> None:
+        """Removes every entry and resets the counters.
+        """
+        with self._lock:
+            self._cleared += 1
+            self._entries.clear()
+            self._by_kind.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def _remove(self, fingerprint: Hashable) -> None:
+        entry: Optional[Tuple[Optional[str], Tuple[Any, ...],
+                              float]] = self._entries.pop(fingerprint, None)
+        if entry is not None:
+            fingerprints: Set[Hashable] = self._by_kind[entry[0]]
+            fingerprints.discard(fingerprint)
+            if not fingerprints:
+                del self._by_kind[entry[0]]
@@ -0,0 +1,157 @@
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+
+import asyncio
+
+from concurrent.futures import Future, ThreadPoolExecutor
+
+#: The maximum number of keys the Datastore accepts in a single lookup.
+MAX_LOOKUP_KEYS: int = 1000
+
+#: The maximum number of mutations the Datastore accepts in a single commit.
+MAX_MUTATIONS: int = 500
+
+#: The maximum number of follow-up lookups made for the keys that the
+#  Datastore defers in a single lookup. This is the same bound as the one
+#  used by the Datastore client.
+MAX_DEFERRED_LOOKUPS: int = 128
+
+#: The number of chunks that are sent to the Datastore at the same time
+#  unless another number is given.
+DEFAULT_MAX_WORKERS: int = 8
+
+
+class ChunkFailure:
+    """Describes a chunk of a chunked call that failed.
+
+    :type index: int
+    :param index: The position of the chunk among the chunks of the call.
+
+    :type items: list
+    :param items: The keys or entities in the chunk.
+
+    :type error: Exception
+    :param error: The error raised by the chunk.
+    """
+    def __init__(self, index: int, items: List[Any],
+                 error: Exception) -> None:
+        self.index: int = index
+        self.items: List[Any] = items
+        self.error: Exception = error
+
+    def __repr__(self) -> str:
+        return (f'ChunkFailure(index={self.index}, items={len(self.items)}, '
+                f'error={self.error!r})')
+
+
+class ChunkError(Exception):
+    """Raised when one or more chunks of a chunked call fail. The chunks that
+    did not fail were still sent, so only the failed items need to be retried.
+
+    :type failures: list
+    :param failures: The failed chunks, in chunk order.
+
+    :type results: list
+    :param results: The result of each chunk, in chunk order, or `None` for
+        the chunks that failed.
+    """
+    def __init__(self, failures: List[ChunkFailure],
+                 results: List[Optional[Any]]) -> None:
+        super().__init__(f'{len(failures)} of {len(results)} chunks failed: '
+                         f'{failures[0].error!r}')
+        self.failures: List[ChunkFailure] = failures
+        self.results: List[Optional[Any]] = results
+
+    @property
+    def failed_items(self) -> List[Any]:
+        """Returns the keys or entities of every failed chunk, in input
+        order.
+        """
+        return [item for failure in self.failures for item in failure.items]
+
+
+def chunked(items: Sequence[Any], size: int) -> List[List[Any]]:
+    """Splits items into consecutive chunks of at most `size` items.
+    """
+    return [list(items[i:i + size]) for i in range(0, len(items), size)]
+
+
+def run_chunks(func: Callable[[List[Any]], Any],
+               chunks: List[List[Any]],
+               max_workers: int = DEFAULT_MAX_WORKERS) -> List[Any]:
+    """Calls a function on every chunk and returns the results in chunk order.
+
+    Chunks are run on a pool of at most `max_workers` threads, so the calls
+    are made concurrently. A single chunk, or a `max_workers` of one, is run
+    on the calling thread.
+
+    :type func: callable
+    :param func: The function to call with each chunk.
+
+    :type chunks: list
+    :param chunks: The chunks to call the function with.
+
+    :type max_workers: int, optional
+    :param max_workers: The maximum number of chunks to run at the same time.
+
+    :rtype: list
+    :returns: The result of each chunk.
+    :raises: :class:`core.chunks.ChunkError` if any chunk raised an error,
+        after every chunk has finished.
+    """
+    results: List[Optional[Any]] = [None] * len(chunks)
+    failures: List[ChunkFailure] = []
+    i: int
+    if len(chunks) <= 1 or max_workers <= 1:
+        for i, chunk in enumerate(chunks):
+            try:
+                results[i] = func(chunk)
+            except Exception as e:
+                failures.append(ChunkFailure(i, chunk, e))
+    else:
+        with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(chunks))) as executor:
+            futures: List[Future] = [
+                executor.submit(func, chunk) for chunk in chunks
+            ]
+            for i, future in enumerate(futures):
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    failures.append(ChunkFailure(i, chunks[i], e))
+    if failures:
+        raise ChunkError(failures, results)
+    return results
+
+
+async def run_chunks_async(
+        func: Callable[[List[Any]], Awaitable[Any]],
+        chunks: List[List[Any]],
+        max_workers: int = DEFAULT_MAX_WORKERS) -> List[Any]:
+    """Awaits a coroutine function on every chunk and returns the results in
+    chunk order. At most `max_workers` chunks are awaited at the same time.
+
+    This is the asyncio counterpart of `run_chunks`, and raises a
+    :class:`core.chunks.ChunkError` in the same way.
+    """
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(max(max_workers, 1))
+
+    async def run(chunk: List[Any]) -> Any:
+        async with semaphore:
+            return await func(chunk)
+
+    outcomes: List[Any] = await asyncio.gather(*(run(c) for c in chunks),
+                                               return_exceptions=True)
+    results: List[Optional[Any]] = []
+    failures: List[ChunkFailure] = []
+    for i, outcome in enumerate(outcomes):
+        if isinstance(outcome, Exception):
+            failures.append(ChunkFailure(i, chunks[i], outcome))
+            results.append(None)
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        else:
+            results.append(outcome)
+    if failures:
+        raise ChunkError(failures, results)
+    return results
@@ -0,0 +1,332 @@
+from __future__ import annotations
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TYPE_CHECKING,
+)
+if TYPE_CHECKING:
+    from gcdmc.core.subquery import Subiterator, Subquery
+
+import array
+import base64
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+from google.api_core.retry import Retry
+from google.cloud.datastore import Entity, Key
+from google.cloud.datastore.helpers import GeoPoint
+
+from gcdmc.core.subentity import Subentity
+
+#: The number of bytes of encoded rows held before they are written out.
+DEFAULT_BUFFER_SIZE: int = 1 << 20
+
+#: The number of pages written between two checkpoints.
+DEFAULT_CHECKPOINT_PAGES: int = 10
+
+#: The suffix of the checkpoint file kept next to an export.
+CHECKPOINT_SUFFIX: str = '.checkpoint'
+
+#: The functions that turn the values of an entity type into rows, keyed by
+#  the type. See `_row_builder`.
+_row_builders: Dict[type, Callable[[Subentity], Dict[str, Any]]] = {}
+_row_builders_lock: threading.Lock = threading.Lock()
+
+
+class ExportStats:
+    """Describes an export of the results of a query.
+
+    :type rows: int
+    :param rows: The number of rows in the export, including those written
+        before it was resumed.
+
+    :type pages: int
+    :param pages: The number of pages read by this run of the export.
+
+    :type resumed: bool
+    :param resumed: Whether or not the export was resumed from a checkpoint.
+    """
+    def __init__(self, rows: int = 0, pages: int = 0,
+                 resumed: bool = False) -> None:
+        self.rows: int = rows
+        self.pages: int = pages
+        self.resumed: bool = resumed
+
+    def __repr__(self) -> str:
+        return (f'ExportStats(rows={self.rows}, pages={self.pages}, '
+                f'resumed={self.resumed})')
+
+
+def key_to_json(key: Key) -> List[Any]:
+    """Returns the path of a key, as it is written to an export.
+    """
+    return list(key.flat_path)
+
+
+def _json_default(value: Any) -> Any:
+    """Converts the values that JSON cannot encode. Times and dates are
+    written in ISO 8601 format, keys as their paths and blobs in base 64.
+    """
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, Key):
+        return key_to_json(value)
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    if isinstance(value, array.array):
+        return value.tolist()
+    if isinstance(value, GeoPoint):
+        return {'latitude': value.latitude, 'longitude': value.longitude}
+    raise TypeError(f'cannot export a value of type {type(value).__name__}')
+
+
+_encoder: json.JSONEncoder = json.JSONEncoder(ensure_ascii=False,
+                                              separators=(',', ':'),
+                                              default=_json_default)
+
+
+def _row_builder(
+        entity_type: Type[Subentity]) -> Callable[[Subentity], Dict[str, Any]]:
+    """Returns a function that turns an entity of a type into a row.
+
+    Entities with a schema are written through it: only the serialized
+    properties are written, in definition order, as returned by
+    `serialize_value`. Other entities are written with all of their values.
+    """
+    builder: Optional[Callable[[Subentity], Dict[str, Any]]]
+    builder = _row_builders.get(entity_type)
+    if builder is not None:
+        return builder
+
+    schema: Any = getattr(entity_type, '__schema__', None)
+    if schema is None:
+
+        def builder(entity: Subentity) -> Dict[str, Any]:
+            row: Dict[str, Any] = {'__key__': key_to_json(entity.key)}
+            row.update(entity.items())
+            return row
+    else:
+        fields: Tuple[Tuple[str, Callable[[Any], Any]], ...] = tuple(
+            (name, schema.properties[name].serialize_value)
+            for name in schema.fields
+            if schema.properties[name].is_serialized)
+
+        def builder(entity: Subentity) -> Dict[str, Any]:
+            row: Dict[str, Any] = {'__key__': key_to_json(entity.key)}
+            for name, serialize in fields:
+                if name in entity:
+                    value: Any = entity[name]
+                    row[name] = None if value is None else serialize(value)
+            return row
+
+    with _row_builders_lock:
+        return _row_builders.setdefault(entity_type, builder)
+
+
+def entity_to_json(entity: Entity) -> str:
+    """Encodes an entity as a single line of JSON, without the line break.
+    See `_row_builder`.
+    """
+    if not isinstance(entity, Subentity):
+        entity = Subentity.wrap(entity)
+    return _encoder.encode(_row_builder(type(entity))(entity))
+
+
+def checkpoint_path(path: str) -> str:
+    """Returns the path of the checkpoint file kept next to an export.
+    """
+    return path + CHECKPOINT_SUFFIX
+
+
+def _export_fingerprint(query: Subquery, compress: bool) -> str:
+    """Returns a digest identifying the rows an export writes and the format
+    of its file: the query, apart from its cursors and limit, and whether or
+    not the file is compressed. Filters are combined with AND, so their
+    order is ignored.
+    """
+    filters: List[str] = sorted(
+        _encoder.encode(list(f)) for f in query.filters)
+    description: str = _encoder.encode([
+        query.project,
+        query.namespace,
+        query.kind,
+        query.ancestor,
+        filters,
+        list(query.projection),
+        list(query.order),
+        list(query.distinct_on),
+        compress,
+    ])
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+
+def _read_checkpoint(path: str, query: Subquery,
+                     compress: bool) -> Optional[Dict[str, Any]]:
+    """Reads the checkpoint of an export, if there is one, and checks that it
+    was written for the same query and format.
+    """
+    try:
+        with open(checkpoint_path(path), 'r', encoding='utf-8') as f:
+            checkpoint: Dict[str, Any] = json.load(f)
+    except FileNotFoundError:
+        return None
+    if (checkpoint['kind'], checkpoint['namespace']) != (query.kind,
+                                                          query.namespace):
+        raise ValueError(f'{checkpoint_path(path)} is the checkpoint of an '
+                         f'export of kind {checkpoint["kind"]!r} in namespace '
+                         f'{checkpoint["namespace"]!r}')
+    if checkpoint.get('query') != _export_fingerprint(query, compress):
+        raise ValueError(f'{checkpoint_path(path)} is the checkpoint of an '
+                         'export of another query, or of a file that is '
+                         f'{"not " if compress else ""}compressed')
+    if (not os.path.exists(path)
+            or os.path.getsize(path) < checkpoint['offset']):
+        raise ValueError(f'{path} is shorter than its checkpoint')
+    return checkpoint
+
+
+def _write_checkpoint(path: str, query: Subquery, compress: bool,
+                      cursor: bytes, rows: int, offset: int) -> None:
+    """Replaces the checkpoint of an export. The checkpoint is written to a
+    temporary file first, so an interruption never leaves it incomplete.
+    """
+    temporary: str = checkpoint_path(path) + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(
+            {
+                'kind': query.kind,
+                'namespace': query.namespace,
+                'query': _export_fingerprint(query, compress),
+                'cursor': base64.b64encode(cursor).decode('ascii'),
+                'rows': rows,
+                'offset': offset,
+            }, f)
+    os.replace(temporary, checkpoint_path(path))
+
+
+class _Writer:
+    """Writes encoded rows to an export file through a buffer of bounded
+    size. Compressed exports are written as a series of gzip members, one
+    per checkpoint, so that a resumed export can be appended after the last
+    complete member.
+    """
+    def __init__(self, raw: BinaryIO, compress: bool,
+                 buffer_size: int) -> None:
+        self.raw: BinaryIO = raw
+        self.compress: bool = compress
+        self.buffer_size: int = buffer_size
+        self._chunks: List[bytes] = []
+        self._buffered: int = 0
+        self._sink: BinaryIO = self._open_member()
+
+    def _open_member(self) -> BinaryIO:
+        if self.compress:
+            return gzip.GzipFile(fileobj=self.raw, mode='wb', mtime=0)
+        return self.raw
+
+    def write(self, line: str) -> None:
+        data: bytes = line.encode('utf-8')
+        self._chunks.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._chunks:
+            self._sink.write(b''.join(self._chunks))
+            self._chunks.clear()
+            self._buffered = 0
+
+    def sync(self) -> int:
+        """Writes out every buffered row and ends the current gzip member,
+        then returns the size of the file.
+        """
+        self.flush()
+        if self.compress:
+            self._sink.close()
+        self.raw.flush()
+        offset: int = self.raw.tell()
+        if self.compress:
+            self._sink = self._open_member()
+        return offset
+
+    def close(self) -> None:
+        self.flush()
+        if self.compress:
+            self._sink.close()
+        self.raw.close()
+
+
+def export_query(query: Subquery,
+                 path: str,
+                 compress: Optional[bool] = None,
+                 checkpoint_pages: int = DEFAULT_CHECKPOINT_PAGES,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 limit: Optional[int] = None,
+                 prefetch: int = 0,
+                 eventual: bool = False,
+                 retry: Optional[Retry] = None,
+                 timeout: Optional[float] = None) -> ExportStats:
+    """Exports the results of a query to a file. See `Subquery.export`.
+    """
+    if checkpoint_pages < 1:
+        raise ValueError('checkpoint_pages must be at least 1')
+    if compress is None:
+        compress = path.endswith('.gz')
+
+    checkpoint: Optional[Dict[str, Any]] = _read_checkpoint(
+        path, query, compress)
+    stats: ExportStats = ExportStats(resumed=checkpoint is not None)
+    cursor: Optional[bytes] = None
+    raw: BinaryIO
+    if checkpoint is None:
+        raw = open(path, 'wb')
+    else:
+        cursor = base64.b64decode(checkpoint['cursor'])
+        stats.rows = checkpoint['rows']
+        # Rows written after the checkpoint are written again.
+        raw = open(path, 'r+b')
+        raw.truncate(checkpoint['offset'])
+        raw.seek(checkpoint['offset'])
+
+    writer: _Writer = _Writer(raw, compress, buffer_size)
+    try:
+        if limit is not None:
+            limit = max(limit - stats.rows, 0)
+        if limit != 0:
+            iterator: Subiterator = query.fetch(limit=limit,
+                                                start_cursor=cursor,
+                                                prefetch=prefetch,
+                                                eventual=eventual,
+                                                retry=retry,
+                                                timeout=timeout)
+            unsaved: int = 0
+            for page in iterator.pages:
+                for entity in page:
+                    writer.write(entity_to_json(entity) + '\n')
+                    stats.rows += 1
+                stats.pages += 1
+                unsaved += 1
+                if (unsaved >= checkpoint_pages
+                        and iterator.next_page_token is not None):
+                    _write_checkpoint(path, query, compress,
+                                      iterator.next_page_token, stats.rows,
+                                      writer.sync())
+                    unsaved = 0
+    finally:
+        writer.close()
+    try:
+        os.remove(checkpoint_path(path))
+    except FileNotFoundError:
+        pass
+    return stats
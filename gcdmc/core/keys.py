@@ -0,0 +1,123 @@
+from __future__ import annotations
+from typing import Any, Dict, Optional
+
+import functools
+
+from google.cloud.datastore import Key
+
+#: The number of keys an intern table holds before it is emptied.
+MAX_INTERNED_KEYS: int = 100_000
+
+#: The number of decoded URL safe strings that are cached.
+URLSAFE_CACHE_SIZE: int = 10_000
+
+
+class HashedKey(Key):
+    """A Datastore key that computes its hash once, and compares equal to
+    itself without comparing its path.
+
+    Hashing a plain key hashes its path, project and namespace on every call,
+    which adds up when the same keys are used in many dictionary lookups.
+    Keys are immutable, so the hash can be kept. Hashed keys compare and hash
+    equal to plain keys with the same path, project and namespace.
+    """
+    def __hash__(self) -> int:
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash: int = Key.__hash__(self)
+            return self._hash
+
+    def __eq__(self, other: Any) -> bool:
+        if other is self:
+            return not self.is_partial
+        return Key.__eq__(self, other)
+
+    def __ne__(self, other: Any) -> bool:
+        return not self == other
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # String hashes differ between processes, so the hash is not kept.
+        state: Dict[str, Any] = dict(self.__dict__)
+        state.pop('_hash', None)
+        return state
+
+    @classmethod
+    def of(cls, key: Key) -> HashedKey:
+        """Returns a hashed copy of a key, or the key itself if it is already
+        a hashed key. No copy of the path is made.
+        """
+        if isinstance(key, HashedKey):
+            return key
+        hashed: HashedKey = cls.__new__(cls)
+        hashed.__dict__.update(key.__dict__)
+        return hashed
+
+
+class KeyTable:
+    """An intern table of keys, which returns the same hashed key for all
+    keys with the same path, project and namespace.
+
+    Keys are interned when they are first seen by a reduction or a lookup, so
+    that later dictionary lookups use the kept hash, and comparisons between
+    interned keys only compare identity. Partial keys are never interned. The
+    table is emptied once it holds `max_entries` keys, which bounds its size
+    without the bookkeeping of an LRU.
+
+    :type max_entries: int, optional
+    :param max_entries: The number of keys held before the table is emptied.
+    """
+    def __init__(self, max_entries: int = MAX_INTERNED_KEYS) -> None:
+        self.max_entries: int = max_entries
+        self._keys: Dict[Key, HashedKey] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def intern(self, key: Key) -> Key:
+        """Returns the interned key equal to a key.
+
+        :type key: :class:`google.cloud.datastore.key.Key`
+        :param key: The key to intern.
+
+        :rtype: :class:`google.cloud.datastore.key.Key`
+        :returns: The interned key, or the key itself if it is partial.
+        """
+        if key.is_partial:
+            return key
+        interned: Optional[HashedKey] = self._keys.get(key)
+        if interned is None:
+            if len(self._keys) >= self.max_entries:
+                self._keys.clear()
+            interned = self._keys.setdefault(key, HashedKey.of(key))
+        return interned
+
+    def clear(self) -> None:
+        """Removes every key from the table.
+        """
+        self._keys.clear()
+
+
+#: The intern table shared by reductions, lookups and caches.
+key_table: KeyTable = KeyTable()
+
+
+def intern_key(key: Key) -> Key:
+    """Interns a key in the shared intern table. See `KeyTable.intern`.
+    """
+    return key_table.intern(key)
+
+
+@functools.lru_cache(maxsize=URLSAFE_CACHE_SIZE)
+def key_from_urlsafe(urlsafe: str) -> Key:
+    """Decodes a URL safe string into an interned key. The most recently used
+    strings are cached, so decoding the same string again is a dictionary
+    lookup.
+
+    :type urlsafe: str
+    :param urlsafe: The URL safe representation of the key.
+
+    :rtype: :class:`google.cloud.datastore.key.Key`
+    :returns: The decoded key.
+    """
+    return intern_key(Key.from_legacy_urlsafe(urlsafe))
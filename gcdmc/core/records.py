@@ -0,0 +1,95 @@
+from __future__ import annotations
+from typing import Any, Dict, Optional, Sequence, Tuple, Type
+
+import collections
+import re
+import threading
+
+from google.cloud.datastore import Key, helpers
+from google.cloud.datastore_v1.types import entity as entity_pb2
+
+from gcdmc.core.subentity import Subentity
+
+#: Record types that were already generated, keyed by the kind and the names
+#  of the projected properties.
+_record_types: Dict[Tuple[Optional[str], Tuple[str, ...]], Type[tuple]] = {}
+_record_types_lock: threading.Lock = threading.Lock()
+
+
+def record_type(kind: Optional[str],
+                fields: Sequence[str],
+                entity_type: Optional[Type[Subentity]] = None) -> Type[tuple]:
+    """Returns a named tuple type for the results of a projection query. The
+    first field of a record is the key of the entity, followed by the
+    projected properties in the order of the projection.
+
+    Record types are generated once per kind and projection. If the entity
+    type registered for the kind has a schema, the projected properties must
+    be defined by it. Property names that are not valid identifiers are
+    renamed to their position, as with `collections.namedtuple`.
+
+    :type kind: str
+    :param kind: The kind that was queried.
+
+    :type fields: list
+    :param fields: The names of the projected properties.
+
+    :type entity_type: type, optional
+    :param entity_type: The entity type registered for the kind, if any.
+
+    :rtype: type
+    :returns: The record type.
+    :raises: :class:`ValueError` if a projected property is not defined by
+        the schema of the entity type.
+    """
+    fields = tuple(fields)
+    cache_key: Tuple[Optional[str], Tuple[str, ...]] = (kind, fields)
+    cached: Optional[Type[tuple]] = _record_types.get(cache_key)
+    if cached is not None:
+        return cached
+
+    schema: Any = getattr(entity_type, '__schema__', None)
+    if schema is not None:
+        undefined: list = [f for f in fields if f not in schema.properties]
+        if undefined:
+            raise ValueError(f'{entity_type.__name__} does not define the '
+                             f'projected properties {undefined}')
+    name: str = re.sub(r'\W', '_', kind or '') + 'Record'
+    if not name.isidentifier():
+        name = 'Record'
+    with _record_types_lock:
+        record: Type[tuple] = _record_types.setdefault(
+            cache_key,
+            collections.namedtuple(name, ('key', *fields), rename=True))
+    return record
+
+
+def key_from_result(iterator: Any, entity_pb: Any) -> Key:
+    """Converts the protobuf of a keys-only query result into its key.
+    """
+    return helpers.key_from_protobuf(entity_pb2.Entity.pb(entity_pb).key)
+
+
+class RecordConverter:
+    """Converts the protobufs of projection query results into records,
+    without building an entity for each result.
+
+    :type record: type
+    :param record: The record type, from `record_type`.
+
+    :type fields: list
+    :param fields: The names of the projected properties.
+    """
+    def __init__(self, record: Type[tuple], fields: Sequence[str]) -> None:
+        self.record: Type[tuple] = record
+        self.fields: Tuple[str, ...] = tuple(fields)
+
+    def __call__(self, iterator: Any, entity_pb: Any) -> tuple:
+        # The raw protobuf is read, since the proto-plus wrapper converts
+        # every value it returns.
+        raw: Any = entity_pb2.Entity.pb(entity_pb)
+        properties: Any = raw.properties
+        return self.record(
+            helpers.key_from_protobuf(raw.key),
+            *(helpers._get_value_from_value_pb(properties[name])
+              if name in properties else None for name in self.fields))
@@ -1,21 +1,48 @@
 from __future__ import annotations
-from typing import Dict, List, Optional, TYPE_CHECKING
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TYPE_CHECKING,
+)
 if TYPE_CHECKING:
+    from gcdmc.core.cache import EntityCache, QueryCache
+    from gcdmc.core.registry import Registry
     from gcdmc.core.subclient import Subclient
 
+import array
+import itertools
+import threading
+
 from google.api_core.retry import Retry
-from google.cloud.datastore import Key, Batch, Transaction
+from google.cloud.datastore import Entity, Key, Batch, Transaction
 
+from gcdmc.core.chunks import MAX_MUTATIONS, chunked
+from gcdmc.core.keys import intern_key
 from gcdmc.core.subentity import Subentity
 
 
 class Reduction:
-    """A data structure that groups together multiple puts of the same entity
-    in order to reduce the number of writes to the Datastore in a single batch.
+    """A data structure that groups together multiple puts and deletes of the
+    same entity in order to reduce the number of writes to the Datastore in a
+    single batch.
+
+    Keys are interned as they are added, so that repeated mutations of the
+    same key reuse its hash. See `core.keys.KeyTable`.
+
+    The reduction holds a single mutation for each key, which is either a put
+    or a delete. The last mutation of a key wins, so a put followed by a
+    delete of the same key only deletes the entity, a delete followed by a put
+    only puts it, and repeated deletes are collapsed into one.
     """
     def __init__(self) -> None:
         self._keyed: Dict[Key, Subentity] = {}
         self._unkeyed: Dict[int, Subentity] = {}
+        self._deleted: Dict[Key, Key] = {}
 
     @property
     def entities(self) -> List[Subentity]:
@@ -25,18 +52,43 @@ class Reduction:
         entities.extend(self._unkeyed.values())
         return entities
 
+    @property
+    def deleted(self) -> List[Key]:
+        """Returns the unique keys that have been deleted as a list.
+        """
+        return list(self._deleted.values())
+
     def put(self, entity: Subentity) -> None:
         """Adds an entity to the reduction. This method is called when a `put`
         call is made on an entity.
 
+        If the key of the entity was deleted earlier, the delete is dropped.
+        Since the entity then no longer matches what is stored, a subentity is
+        marked dirty so that it is written even if it has not changed.
+
         :type entity: class:`core.subentity.Subentity`
         :param entity: The entity to add to the reduction.
         """
         if not entity.key.is_partial:
-            self._keyed[entity.key] = entity
+            key: Key = intern_key(entity.key)
+            self._keyed[key] = entity
+            if self._deleted.pop(key, None) is not None and isinstance(
+                    entity, Subentity):
+                entity.mark_dirty()
         else:
             self._unkeyed[id(entity)] = entity
 
+    def delete(self, key: Key) -> None:
+        """Adds a delete to the reduction, replacing any earlier put of the
+        same key. This method is called when a `delete` call is made on a key.
+
+        :type key: :class:`google.cloud.datastore.key.Key`
+        :param key: The key of the entity to delete.
+        """
+        key = intern_key(key)
+        self._keyed.pop(key, None)
+        self._deleted[key] = key
+
     def put_multi(self, entities: List[Subentity]) -> None:
         """Adds multiple entities to the reduction. This method is called when
         a `put_multi` call is made on a list of entities.
@@ -53,6 +105,41 @@ class Reduction:
         """
         self._keyed.clear()
         self._unkeyed.clear()
+        self._deleted.clear()
+
+
+class WriteStats:
+    """Counts the entities written by the batches and transactions of a
+    subclient, and the writes that were skipped because the entities had not
+    changed. The counters can be updated by batches committed on several
+    threads at once.
+    """
+    def __init__(self) -> None:
+        #: The number of entities that were written.
+        self.writes: int = 0
+
+        #: The number of entities that were not written because they were
+        #  clean.
+        self.elided: int = 0
+
+        self._lock: threading.Lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f'WriteStats(writes={self.writes}, elided={self.elided})'
+
+    def record(self, writes: int, elided: int) -> None:
+        """Adds the counts of a single commit to the counters.
+        """
+        with self._lock:
+            self.writes += writes
+            self.elided += elided
+
+    def reset(self) -> None:
+        """Sets the counters back to zero.
+        """
+        with self._lock:
+            self.writes = 0
+            self.elided = 0
 
 
 class ReducedBatch(Batch):
@@ -61,10 +148,28 @@ class ReducedBatch(Batch):
 
     :type client: :class:`core.subclient.Subclient`
     :param client: The subclient used to connect to the Datastore.
+
+    :type autoupdate: bool, optional
+    :param autoupdate: Whether or not autoupdated values, such as timestamps,
+        are updated when the entities are committed. Defaults to `true`. This
+        can be disabled e.g. for backfills that should keep existing values.
+
+    :type force: bool, optional
+    :param force: Whether or not subentities are written even if they have not
+        changed since they were read or last committed. Defaults to `false`.
     """
-    def __init__(self, client: Subclient) -> None:
+    def __init__(self,
+                 client: Subclient,
+                 autoupdate: bool = True,
+                 force: bool = False) -> None:
         super(ReducedBatch, self).__init__(client)
         self._reduction: Reduction = Reduction()
+        self._autoupdate: bool = autoupdate
+        self._force: bool = force
+
+        #: The number of entities that were not written by the last commit
+        #  because they were clean.
+        self.elided_writes: int = 0
 
     def put(self, entity: Subentity) -> None:
         """Remembers an entity to be saved.
@@ -77,14 +182,64 @@ class ReducedBatch(Batch):
         """
         self._reduction.put(entity)
 
+    def delete(self, key: Key) -> None:
+        """Remembers a key to be deleted.
+
+        This adds the delete to the batch's reduction, where it replaces any
+        earlier put of the same key, but does not call the base batch's
+        `delete` method. The key is checked in the same way as by that
+        method, so invalid keys are rejected here rather than at commit.
+
+        :type key: :class:`google.cloud.datastore.key.Key`
+        :param key: The key to be deleted.
+
+        :raises: :class:`ValueError` if the batch is not in progress, if the
+            key is not complete, or if the project of the key does not match
+            that of the batch.
+        """
+        if self._status != self._IN_PROGRESS:
+            raise ValueError('Batch must be in progress to delete()')
+        if key.is_partial:
+            raise ValueError('Key must be complete')
+        if self.project != key.project:
+            raise ValueError('Key must be from same project as batch')
+        self._reduction.delete(key)
+
     def commit(self,
                retry: Optional[Retry] = None,
                timeout: float = None) -> None:
         """Commits the batch.
 
         This method will iterate through all the entities in the batch's
-        reduction and call the base batch's `put` method on each entity.
-        Afterwards, the entites are committed.
+        reduction and call the base batch's `put` method on each entity, and
+        its `delete` method on each deleted key. Afterwards, the entites are
+        committed.
+
+        Subentities that are clean, i.e. that have not changed since they were
+        read or last committed, are left out unless the batch was created with
+        `force` set. If nothing is left to write, a batch does not make a
+        request at all, while a transaction is still committed. Committed
+        subentities are marked clean.
+
+        If the client has an entity cache, the keys that were written or
+        deleted are invalidated in it once the commit has been attempted.
+
+        Before they are put, autoupdated values of the entities are updated,
+        unless autoupdates were disabled for the batch. Values that are shared
+        across a commit, such as timestamps, are generated once, so every
+        entity in the commit gets the same value.
+
+        Entities holding array values, such as typed arrays, are put as
+        shallow copies in which the arrays are converted to lists, since the
+        Datastore only accepts lists as array values. Keys that are completed
+        by the commit are copied back to the original entities.
+
+        A single commit holds at most `MAX_MUTATIONS` puts and deletes. A
+        batch with more is committed as several requests of at most that
+        many mutations, sent one after the other, so if one of them fails the
+        mutations of the earlier requests are still applied. A transaction
+        must be committed in a single request, so the Datastore rejects
+        transactions with more mutations.
 
         :type retry: :class:`google.api_core.retry.Retry`, optional
         :param retry: A retry object used to retry requests. If ``None`` is
@@ -95,10 +250,148 @@ class ReducedBatch(Batch):
             Note that if ``retry`` is specified, the timeout applies to each
             individual attempt.
         """
+        staged: Optional[_Staged] = self._stage()
+        if staged is None:
+            return
+        try:
+            super().commit(retry=retry, timeout=timeout)
+        finally:
+            self._settle(staged)
+        for entity in staged.written:
+            entity.mark_clean()
+
+    def _commit(self, retry: Optional[Retry],
+                timeout: Optional[float]) -> None:
+        """Sends the mutations of the batch, in as many requests as needed.
+        This is called by the base batch's `commit` method.
+        """
+        mutations: List[Any] = self._mutations
+        partial: List[Entity] = self._partial_key_entities
+        try:
+            for self._mutations, self._partial_key_entities in self._chunks():
+                super()._commit(retry, timeout)
+        finally:
+            self._mutations = mutations
+            self._partial_key_entities = partial
+
+    def _chunks(self) -> List[Tuple[List[Any], List[Entity]]]:
+        """Splits the mutations of a batch into chunks of at most
+        `MAX_MUTATIONS`, each paired with the entities whose partial keys it
+        completes. Transactions are never split.
+        """
+        if self._id is not None or len(self._mutations) <= MAX_MUTATIONS:
+            return [(self._mutations, self._partial_key_entities)]
+        partial: Iterator[Entity] = iter(self._partial_key_entities)
+        return [(mutations,
+                 list(itertools.islice(partial,
+                                       sum('insert' in m for m in mutations))))
+                for mutations in chunked(self._mutations, MAX_MUTATIONS)]
+
+    def _stage(self) -> Optional[_Staged]:
+        """Adds the mutations in the reduction to the base batch, and returns
+        what is needed to settle the commit afterwards. Returns `None` if
+        there is nothing to commit, in which case the batch is finished.
+        """
+        updates: Dict[Callable, Any] = {}
+        staged: _Staged = _Staged()
+        self.elided_writes = 0
         entity: Subentity
         for entity in self._reduction.entities:
-            super().put(entity)
-        super().commit(retry=retry, timeout=timeout)
+            if isinstance(entity, Subentity):
+                if not self._force and not entity.is_dirty:
+                    self.elided_writes += 1
+                    continue
+                if self._autoupdate:
+                    entity._autoupdate(updates)
+                staged.written.append(entity)
+            # Subentities are put through their underlying entity, since
+            # property names such as `values` may hide the entity methods
+            # used by the Datastore client.
+            raw: Entity = (entity._entity
+                           if isinstance(entity, Subentity) else entity)
+            serializable: Entity = _serializable(raw)
+            super().put(serializable)
+            staged.put.append(entity)
+            if serializable is not raw:
+                staged.converted.append((entity, serializable))
+
+        key: Key
+        for key in self._reduction.deleted:
+            super().delete(key)
+
+        stats: Optional[WriteStats] = getattr(self._client, 'write_stats',
+                                              None)
+        if stats is not None:
+            stats.record(len(staged.put), self.elided_writes)
+
+        if (not self.mutations and self._id is None
+                and self._status == self._IN_PROGRESS):
+            # Every entity was clean, so there is nothing to send. Only plain
+            # batches are skipped, since a transaction must still be
+            # committed to release it.
+            self._status = self._FINISHED
+            return None
+        return staged
+
+    def _settle(self, staged: _Staged) -> None:
+        """Copies keys completed by a commit back to the original entities,
+        and invalidates the written keys in the entity cache of the client
+        and the queries of their kinds in its query cache. This is called
+        whether or not the commit succeeded.
+        """
+        for entity, serializable in staged.converted:
+            if entity.key is not serializable.key:
+                entity.key = serializable.key
+        cache: Optional[EntityCache] = getattr(self._client, 'cache', None)
+        if cache is not None:
+            # Whether or not a failed commit was applied is unknown, so the
+            # keys are invalidated either way. Keys that are still partial
+            # cannot have been cached.
+            cache.invalidate([
+                *(e.key for e in staged.put if not e.key.is_partial),
+                *self._reduction.deleted,
+            ])
+        query_cache: Optional[QueryCache] = getattr(self._client,
+                                                    'query_cache', None)
+        if query_cache is not None and (staged.put or self._reduction.deleted):
+            query_cache.invalidate_kinds({
+                *(e.key.kind for e in staged.put),
+                *(key.kind for key in self._reduction.deleted),
+            })
+
+
+class _Staged:
+    """The entities of a commit that need to be updated once it completes.
+    """
+    def __init__(self) -> None:
+        #: The subentities that are written, which are marked clean once the
+        #  commit succeeds.
+        self.written: List[Subentity] = []
+
+        #: Every entity that is put.
+        self.put: List[Entity] = []
+
+        #: Entities that were put as converted copies, paired with the copy.
+        self.converted: List[Tuple[Subentity, Entity]] = []
+
+
+def _serializable(entity: Entity) -> Entity:
+    """Returns the entity itself if all of its values can be serialized by the
+    Datastore client, or otherwise a shallow copy of the entity in which array
+    values are converted to lists.
+    """
+    if not any(isinstance(v, array.array) for v in entity.values()):
+        return entity
+
+    copy: Entity = Entity(key=entity.key)
+    copy.exclude_from_indexes = entity.exclude_from_indexes
+    copy._meanings = entity._meanings
+    name: str
+    value: Any
+    for name, value in entity.items():
+        copy[name] = (value.tolist()
+                      if isinstance(value, array.array) else value)
+    return copy
 
 
 class ReducedTransaction(Transaction, ReducedBatch):
@@ -116,5 +409,75 @@ class ReducedTransaction(Transaction, ReducedBatch):
 
     See https://rhettinger.wordpress.com/2011/05/26/super-considered-super/ for
     a more detailed explanation of the method resolution order and `super`.
+
+    Each transaction keeps an identity map of the keys read, put or deleted
+    in it. Lookups made through the subclient in the transaction are answered
+    from the map when possible, so every lookup of a key returns the same
+    subentity and only the first one makes a request. Puts and deletes
+    update the map, so later lookups in the transaction see the pending
+    writes.
+
+    :type client: :class:`core.subclient.Subclient`
+    :param client: The subclient used to connect to the Datastore.
+
+    :type autoupdate: bool, optional
+    :param autoupdate: Whether or not autoupdated values are updated when the
+        entities are committed. See `ReducedBatch`.
+
+    :type force: bool, optional
+    :param force: Whether or not clean subentities are written. See
+        `ReducedBatch`.
+    """
+    def __init__(self,
+                 client: Subclient,
+                 autoupdate: bool = True,
+                 force: bool = False,
+                 **kwargs: Any) -> None:
+        super().__init__(client, **kwargs)
+        self._autoupdate = autoupdate
+        self._force = force
+        self.elided_writes = 0
+
+        #: The subentity of each key read or put in the transaction, or `None`
+        #  for keys that are missing or were deleted.
+        self.identity_map: Dict[Key, Optional[Subentity]] = {}
+
+    def put(self, entity: Subentity) -> None:
+        """Remembers an entity to be saved, and makes it the entity returned
+        by later lookups of its key in the transaction.
+
+        Entities that are not subentities are returned by lookups as a copy,
+        wrapped with the type registered for their kind in the registry of
+        the client, as if they had been read back.
+
+        :type entity: class:`core.subentity.Subentity`
+        :param entity: The entity to be saved.
+        """
+        super().put(entity)
+        if not entity.key.is_partial:
+            if not isinstance(entity, Subentity):
+                entity = _wrap_copy(entity, self._client._registry)
+            self.identity_map[entity.key] = entity
+
+    def delete(self, key: Key) -> None:
+        """Remembers a key to be deleted, so that later lookups of the key in
+        the transaction find nothing.
+
+        :type key: :class:`google.cloud.datastore.key.Key`
+        :param key: The key to be deleted.
+        """
+        super().delete(key)
+        self.identity_map[key] = None
+
+
+def _wrap_copy(entity: Entity, registry: Optional[Registry]) -> Subentity:
+    """Wraps a copy of an entity, so that wrapping does not change the entity
+    that is written.
     """
-    pass
+    copied: Entity = Entity(key=entity.key,
+                            exclude_from_indexes=tuple(
+                                entity.exclude_from_indexes))
+    copied.update(entity)
+    if registry is None:
+        return Subentity.wrap(copied)
+    return registry.wrap_many([copied])[0]
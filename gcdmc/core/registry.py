@@ -1,7 +1,14 @@
 from __future__ import annotations
-from typing import Dict, Optional, Type
+from typing import Dict, Iterable, List, Optional, Tuple, Type
 
-from gcdmc.core.subentity import Subentity
+from google.cloud.datastore import Entity
+
+from gcdmc.core.subentity import (
+    ReadMode,
+    Snapshot,
+    Subentity,
+    entity_snapshot,
+)
 
 
 class RegistryError(Exception):
@@ -13,15 +20,39 @@ class RegistryError(Exception):
 
 
 class Registry:
-    def __init__(self, default: Optional[Type[Subentity]] = None) -> None:
+    """Maps entity kinds to the subentity types used to wrap them.
+
+    :type default: type, optional
+    :param default: The subentity type used for kinds that have not been
+        registered.
+
+    :type read_mode: :class:`core.subentity.ReadMode`, optional
+    :param read_mode: The read mode used when wrapping entities of any kind.
+        If not provided, each subentity type uses its own read mode.
+    """
+    def __init__(self,
+                 default: Optional[Type[Subentity]] = None,
+                 read_mode: Optional[ReadMode] = None) -> None:
         self._default: Optional[Type[Subentity]] = default
+        self._read_mode: Optional[ReadMode] = (None if read_mode is None else
+                                               ReadMode(read_mode))
         self._types: Dict[str, Type[Subentity]] = {}
+        self._read_modes: Dict[str, ReadMode] = {}
 
-    def register_subentity_type(self, kind: str,
-                                entity_type: Type[Subentity]) -> None:
+    def register_subentity_type(self,
+                                kind: str,
+                                entity_type: Type[Subentity],
+                                read_mode: Optional[ReadMode] = None) -> None:
         """Registers a subentity type associated with a given string kind.
+
+        If a read mode is provided, it takes precedence over the registry's
+        read mode for entities of this kind.
         """
         self._types[kind] = entity_type
+        if read_mode is not None:
+            self._read_modes[kind] = ReadMode(read_mode)
+        else:
+            self._read_modes.pop(kind, None)
 
     def get_subentity_type(self, kind: str) -> Type[Subentity]:
         """Gets the subentity type associated with a given string kind.
@@ -42,3 +73,72 @@ class Registry:
         a subentity type.
         """
         return kind in self._types
+
+    def get_read_mode(self, kind: str) -> Optional[ReadMode]:
+        """Gets the read mode used to wrap entities of a given string kind.
+
+        Returns `None` if neither the kind nor the registry specify a read
+        mode, in which case the subentity type's own read mode applies.
+        """
+        return self._read_modes.get(kind, self._read_mode)
+
+    def resolve(self,
+                kind: str) -> Tuple[Type[Subentity], Optional[ReadMode]]:
+        """Returns the subentity type and read mode used to wrap entities of a
+        given string kind.
+
+        Unlike `get_subentity_type`, this never raises. Kinds that have not
+        been registered use the default type if one was supplied, and
+        `Subentity` otherwise.
+        """
+        entity_type: Optional[Type[Subentity]] = self._types.get(
+            kind, self._default)
+        return (Subentity if entity_type is None else entity_type,
+                self._read_modes.get(kind, self._read_mode))
+
+    def wrap_many(self, entities: Iterable[Entity]) -> List[Subentity]:
+        """Wraps entities with the subentity types registered for their kinds,
+        and returns the subentities in input order.
+
+        The entities are grouped by kind, so each kind is resolved once and
+        each group is wrapped with a single call to `wrap_many` of its type.
+        """
+        entities = list(entities)
+        groups: Dict[str, List[int]] = {}
+        i: int
+        for i, entity in enumerate(entities):
+            groups.setdefault(entity.key.kind, []).append(i)
+        if len(groups) == 1:
+            entity_type, read_mode = self.resolve(next(iter(groups)))
+            return entity_type.wrap_many(entities, read_mode=read_mode)
+
+        wrapped: List[Optional[Subentity]] = [None] * len(entities)
+        for kind, positions in groups.items():
+            entity_type, read_mode = self.resolve(kind)
+            for i, subentity in zip(
+                    positions,
+                    entity_type.wrap_many([entities[j] for j in positions],
+                                          read_mode=read_mode)):
+                wrapped[i] = subentity
+        return wrapped
+
+
+def wrap_entities(entities: Iterable[Entity],
+                  registry: Optional[Registry] = None) -> List[Subentity]:
+    """Wraps fetched entities with the types of a registry, or as plain
+    subentities if there is no registry, and marks them clean.
+
+    This is the single path by which query results and lookups are wrapped.
+    The entities are recorded as they were fetched, so defaults filled in by
+    wrapping make the subentities dirty.
+    """
+    entities = list(entities)
+    stored: List[Snapshot] = [entity_snapshot(e) for e in entities]
+    subentities: List[Subentity] = (Subentity.wrap_many(entities)
+                                     if registry is None else
+                                     registry.wrap_many(entities))
+    for subentity, state in zip(subentities, stored):
+        # Nothing else references the values of fetched entities, so they
+        # are only copied once they are read.
+        subentity.mark_clean(lazy=True, stored=state)
+    return subentities
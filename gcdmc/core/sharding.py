@@ -0,0 +1,264 @@
+from __future__ import annotations
+from typing import (
+    Any,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TYPE_CHECKING,
+)
+if TYPE_CHECKING:
+    from gcdmc.core.subquery import Subquery
+
+import queue
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from google.api_core.retry import Retry
+from google.cloud.datastore import Key
+
+from gcdmc.core.chunks import DEFAULT_MAX_WORKERS
+from gcdmc.core.subentity import Subentity
+
+#: The number of keys sampled per shard when split points are chosen from the
+#  `__scatter__` property.
+DEFAULT_OVERSAMPLING: int = 32
+
+#: The number of pages each shard may hold before it waits for the consumer.
+_PAGES_PER_SHARD: int = 2
+
+#: The number of seconds a worker waits for room before checking whether the
+#  scan was stopped.
+_POLL_INTERVAL: float = 0.1
+
+
+def key_order(key: Key) -> Tuple:
+    """Returns a value that sorts keys in the order used by the Datastore.
+    Within a kind, keys with numeric IDs sort before keys with names.
+    """
+    return tuple((kind, 0, id_or_name, '') if isinstance(id_or_name, int) else
+                 (kind, 1, 0, id_or_name)
+                 for kind, id_or_name in zip(key.flat_path[::2],
+                                             key.flat_path[1::2]))
+
+
+class QueryShard:
+    """A key range of a sharded query, and how far it has been read.
+
+    Shards are returned by `Subquery.shard` and can be passed back to
+    `Subquery.fetch_sharded` to resume a scan, since their cursors are kept
+    up to date as their results are consumed.
+
+    :type index: int
+    :param index: The position of the shard. Shards are ordered by key range.
+
+    :type start: :class:`google.cloud.datastore.key.Key`, optional
+    :param start: The smallest key in the shard. If not given, the shard
+        starts at the first key.
+
+    :type end: :class:`google.cloud.datastore.key.Key`, optional
+    :param end: The key after the largest key in the shard. If not given, the
+        shard ends at the last key.
+
+    :type cursor: bytes, optional
+    :param cursor: The cursor after the last result that was consumed, if
+        any.
+
+    :type done: bool, optional
+    :param done: Whether or not every result of the shard was consumed.
+    """
+    def __init__(self,
+                 index: int,
+                 start: Optional[Key] = None,
+                 end: Optional[Key] = None,
+                 cursor: Optional[bytes] = None,
+                 done: bool = False) -> None:
+        self.index: int = index
+        self.start: Optional[Key] = start
+        self.end: Optional[Key] = end
+        self.cursor: Optional[bytes] = cursor
+        self.done: bool = done
+
+    def __repr__(self) -> str:
+        return (f'QueryShard(index={self.index}, start={self.start!r}, '
+                f'end={self.end!r}, cursor={self.cursor!r}, '
+                f'done={self.done})')
+
+    def restrict(self, query: Subquery) -> Subquery:
+        """Returns a copy of a query restricted to the key range of the shard.
+        """
+        restricted: Subquery = type(query).derive(query,
+                                                  registry=query._registry)
+        if self.start is not None:
+            restricted.add_filter('__key__', '>=', self.start)
+        if self.end is not None:
+            restricted.add_filter('__key__', '<', self.end)
+        return restricted
+
+
+def check_shardable(query: Subquery) -> None:
+    """Raises a `ValueError` if a query cannot be split by key range.
+    """
+    if not query.kind:
+        raise ValueError('Only queries with a kind can be sharded')
+    if any(order not in ('__key__', '') for order in query.order):
+        raise ValueError('Only queries without a sort order, or ordered by '
+                         f'ascending key, can be sharded: {query.order}')
+    inequalities: List[str] = [
+        name for name, operator, _ in query.filters
+        if operator != '=' and name != '__key__'
+    ]
+    if inequalities:
+        raise ValueError('Queries with inequality filters cannot be sharded: '
+                         f'{inequalities}')
+
+
+def split_points(query: Subquery, shards: int,
+                 oversampling: int = DEFAULT_OVERSAMPLING) -> List[Key]:
+    """Samples the keys of the kind of a query through the `__scatter__`
+    property, and returns up to `shards - 1` keys that split it into ranges
+    of roughly equal size.
+    """
+    if shards <= 1:
+        return []
+    sample_query: Subquery = type(query)(query._client,
+                                         kind=query.kind,
+                                         project=query.project,
+                                         namespace=query.namespace,
+                                         ancestor=query.ancestor,
+                                         order=['__scatter__'],
+                                         registry=None)
+    # The sample is read as keys, so no entity of a registered type is built
+    # from results that only hold a key.
+    keys: List[Key] = sorted(
+        sample_query.fetch_keys(limit=shards * oversampling), key=key_order)
+    points: List[Key] = []
+    i: int
+    for i in range(1, shards):
+        if not keys:
+            break
+        point: Key = keys[len(keys) * i // shards]
+        if not points or key_order(points[-1]) < key_order(point):
+            points.append(point)
+    return points
+
+
+def shards_between(points: Sequence[Key]) -> List[QueryShard]:
+    """Returns the shards between consecutive split points.
+    """
+    bounds: List[Optional[Key]] = [None, *points, None]
+    return [
+        QueryShard(i, start=bounds[i], end=bounds[i + 1])
+        for i in range(len(bounds) - 1)
+    ]
+
+
+class ShardedIterator:
+    """Runs the shards of a query on a pool of threads and iterates over
+    their results.
+
+    By default, results are returned as soon as any shard delivers them. If
+    `ordered` is set, the results of each shard are returned after those of
+    the previous shard, so they are in key order, while the later shards are
+    read ahead. Each shard buffers at most a couple of pages, so a slow
+    consumer holds back the workers.
+
+    The cursor of a shard is advanced once every result of a page has been
+    returned, so stopping a scan and passing its shards to
+    `Subquery.fetch_sharded` resumes it without skipping results. Results of
+    a page that was only partly consumed are returned again.
+    """
+    def __init__(self,
+                 query: Subquery,
+                 shards: List[QueryShard],
+                 ordered: bool = False,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 eventual: bool = False,
+                 retry: Optional[Retry] = None,
+                 timeout: Optional[float] = None) -> None:
+        if query._client.current_transaction is not None:
+            raise ValueError('Sharded queries cannot run in a transaction')
+        self.shards: List[QueryShard] = shards
+        self.ordered: bool = ordered
+        self.max_workers: int = max_workers
+        self.num_results: int = 0
+        self._query: Subquery = query
+        self._eventual: bool = eventual
+        self._retry: Optional[Retry] = retry
+        self._timeout: Optional[float] = timeout
+        self._started: bool = False
+
+    def __iter__(self) -> Iterator[Subentity]:
+        if self._started:
+            raise ValueError('Iterator has already started', self)
+        self._started = True
+        pending: List[QueryShard] = [s for s in self.shards if not s.done]
+        if not pending:
+            return
+        stopped: threading.Event = threading.Event()
+        queues: List[queue.Queue]
+        if self.ordered:
+            queues = [
+                queue.Queue(maxsize=_PAGES_PER_SHARD) for _ in pending
+            ]
+        else:
+            queues = [queue.Queue(maxsize=_PAGES_PER_SHARD * len(pending))
+                      ] * len(pending)
+        executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=max(1, min(self.max_workers, len(pending))),
+            thread_name_prefix='gcdmc-shard')
+        try:
+            for shard, out in zip(pending, queues):
+                executor.submit(self._scan, shard, out, stopped)
+            remaining: int = len(pending)
+            position: int = 0
+            while remaining:
+                shard: QueryShard
+                items: Optional[Any]
+                cursor: Optional[bytes]
+                shard, items, cursor = queues[position].get()
+                if isinstance(items, BaseException):
+                    raise items
+                if items is None:
+                    shard.done = True
+                    remaining -= 1
+                    if self.ordered:
+                        position += 1
+                    continue
+                for item in items:
+                    self.num_results += 1
+                    yield item
+                if cursor is not None:
+                    shard.cursor = cursor
+        finally:
+            stopped.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _scan(self, shard: QueryShard, out: queue.Queue,
+              stopped: threading.Event) -> None:
+        """Reads the pages of a shard and hands them to the consumer, followed
+        by an end marker, or by the error that stopped the shard.
+        """
+        def put(entry: Tuple) -> bool:
+            while not stopped.is_set():
+                try:
+                    out.put(entry, timeout=_POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            iterator: Any = shard.restrict(self._query).fetch(
+                start_cursor=shard.cursor,
+                eventual=self._eventual,
+                retry=self._retry,
+                timeout=self._timeout)
+            for page in iterator.pages:
+                if not put((shard, list(page), iterator.next_page_token)):
+                    return
+        except Exception as e:
+            put((shard, e, None))
+            return
+        put((shard, None, None))
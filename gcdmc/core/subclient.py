@@ -1,10 +1,14 @@
 from __future__ import annotations
-from typing import Any, Callable, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 
+from concurrent.futures import Future, ThreadPoolExecutor
 from functools import update_wrapper
+from google.cloud.datastore import helpers
 from google.cloud.datastore.entity import Entity
 from google.cloud.datastore.key import Key
 from google.cloud.datastore.transaction import Transaction
+from google.cloud.datastore_v1.types import datastore as datastore_pb2
+from google.cloud.datastore_v1.types import entity as entity_pb2
 from requests import Session
 
 from google.api_core.client_options import ClientOptions
@@ -12,22 +16,83 @@ from google.api_core.retry import Retry
 from google.auth.credentials import Credentials
 from google.cloud.datastore import Client
 
-from gcdmc.core.reduction import ReducedBatch, ReducedTransaction
-from gcdmc.core.registry import Registry
+from gcdmc.core.cache import EntityCache, QueryCache
+from gcdmc.core.chunks import (
+    DEFAULT_MAX_WORKERS,
+    MAX_DEFERRED_LOOKUPS,
+    MAX_LOOKUP_KEYS,
+    MAX_MUTATIONS,
+    chunked,
+    run_chunks,
+)
+from gcdmc.core.reduction import (
+    ReducedBatch,
+    ReducedTransaction,
+    Reduction,
+    WriteStats,
+)
+from gcdmc.core.keys import intern_key, key_from_urlsafe
+from gcdmc.core.registry import Registry, wrap_entities
 from gcdmc.core.subentity import Subentity
 from gcdmc.core.subquery import Subquery
 
 
 class Subclient(Client):
+    """A Datastore client that wraps the entities it reads as subentities and
+    writes through reduced batches.
+
+    Calls with more keys or entities than the Datastore accepts in a single
+    request are split into chunks, which are sent concurrently on a pool of
+    threads. If any chunk fails, a :class:`core.chunks.ChunkError` is raised
+    once the other chunks have finished, listing the failed chunks so that
+    only those need to be retried.
+
+    :type registry: :class:`core.registry.Registry`, optional
+    :param registry: The registry used to find the subentity type of each
+        kind that is read.
+
+    :type max_workers: int, optional
+    :param max_workers: The maximum number of chunks of a single call that are
+        sent at the same time.
+
+    :type cache: :class:`core.cache.EntityCache`, optional
+    :param cache: A cache used to answer lookups made outside of
+        transactions. Writes made through the subclient invalidate it.
+
+    :type query_cache: :class:`core.cache.QueryCache`, optional
+    :param query_cache: A cache used to answer queries fetched with `cached`
+        set, outside of transactions. Writes made through the subclient
+        invalidate the queries of the kinds they touch.
+    """
     def __init__(self,
                  project: Optional[str] = None,
                  namespace: Optional[str] = None,
                  credentials: Optional[Credentials] = None,
                  client_options: Optional[ClientOptions] = None,
                  registry: Optional[Registry] = None,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 cache: Optional[EntityCache] = None,
+                 query_cache: Optional[QueryCache] = None,
                  _http: Optional[Session] = None,
                  _use_grpc: Optional[bool] = None):
         self._registry: Optional[Registry] = registry
+        self._max_workers: int = max_workers
+
+        # Runs the follow-up lookups of deferred keys for every chunk. Only
+        # lookups run on it, so its threads never wait for each other.
+        self._lookup_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=max(max_workers, 1),
+            thread_name_prefix='gcdmc-lookup')
+
+        #: The entity cache used by lookups, if any.
+        self.cache: Optional[EntityCache] = cache
+
+        #: The query cache used by queries that opt in, if any.
+        self.query_cache: Optional[QueryCache] = query_cache
+
+        #: Counts the entities written by the batches and transactions of this
+        #  subclient, and the writes that were skipped.
+        self.write_stats: WriteStats = WriteStats()
         super().__init__(project=project,
                          namespace=namespace,
                          credentials=credentials,
@@ -42,27 +107,165 @@ class Subclient(Client):
                   transaction: Transaction = None,
                   eventual: bool = False,
                   retry: Optional[Retry] = None,
-                  timeout: Optional[float] = None):
+                  timeout: Optional[float] = None,
+                  aligned: bool = False) -> List[Optional[Subentity]]:
         """Retrieve entities and wrap them as subentities.
 
         Unlike the base client `get_multi` method, the subclient implementation
         also accpets a list of URL safe string representations of the keys. The
         input list of keys can be a mix of datastore keys and strings.
+
+        The entities that were found are returned in the order of their keys
+        in the input. More keys than a single lookup accepts are looked up in
+        chunks, concurrently unless the lookup is part of a transaction.
+
+        Keys that the Datastore defers are looked up again until every key has
+        been found or reported missing, unless a `deferred` list is passed to
+        receive them instead. Each follow-up lookup is sent before the entities
+        that were already returned are wrapped, so that wrapping overlaps with
+        the round trip. A chunk whose keys are still deferred after
+        `MAX_DEFERRED_LOOKUPS` follow-up lookups fails with a `RuntimeError`.
+
+        If the subclient has an entity cache, keys are looked up in the cache
+        first, and the results of the remaining lookups are added to it.
+        Lookups made in a transaction bypass the cache, and use the identity
+        map of the transaction instead, so a key is only looked up once per
+        transaction and always returns the same subentity.
+
+        :type aligned: bool, optional
+        :param aligned: If true, one item is returned per input key, in input
+            order: the entity, or `None` if the key is missing. Keys that are
+            returned in `deferred` are `None` as well.
+
+        :rtype: list
+        :returns: The entities that were found, as subentities.
         """
-        db_keys: List[Key] = [self._to_key(key) for key in keys]
-        entities: List[Entity] = super().get_multi(db_keys,
-                                                   missing=missing,
-                                                   deferred=deferred,
-                                                   transaction=transaction,
-                                                   eventual=eventual,
-                                                   retry=retry,
-                                                   timeout=timeout)
-        return [self._wrap(e) for e in entities]
-
-    def batch(self) -> ReducedBatch:
+        lookup: _Lookup = _Lookup(self,
+                                  keys,
+                                  missing=missing,
+                                  deferred=deferred,
+                                  transaction=transaction,
+                                  eventual=eventual)
+        results: List[Tuple[List[Subentity], List, List]] = run_chunks(
+            lambda chunk: self._lookup(lookup, chunk, retry, timeout),
+            chunked(lookup.uncached, MAX_LOOKUP_KEYS),
+            max_workers=(1 if lookup.transaction is not None else
+                         self._max_workers))
+        return lookup.merge(results, aligned=aligned)
+
+    def put_multi(self,
+                  entities: List[Entity],
+                  retry: Optional[Retry] = None,
+                  timeout: Optional[float] = None) -> None:
+        """Save entities in the Datastore.
+
+        Outside of a batch or transaction, more entities than a single commit
+        accepts are written in chunks, each committed concurrently in its own
+        batch. Inside a batch or transaction, the entities are added to it.
+        """
+        if (self.current_batch is not None or isinstance(entities, Entity)
+                or len(entities) <= MAX_MUTATIONS):
+            super().put_multi(entities, retry=retry, timeout=timeout)
+            return
+        reduction: Reduction = Reduction()
+        reduction.put_multi(entities)
+        self._commit_chunks(reduction.entities, ReducedBatch.put, retry,
+                            timeout)
+
+    def delete_multi(self,
+                     keys: List[Union[Key, Entity]],
+                     retry: Optional[Retry] = None,
+                     timeout: Optional[float] = None) -> None:
+        """Delete keys from the Datastore.
+
+        Outside of a batch or transaction, more keys than a single commit
+        accepts are deleted in chunks, each committed concurrently in its own
+        batch. Inside a batch or transaction, the deletes are added to it.
+        """
+        if self.current_batch is not None or len(keys) <= MAX_MUTATIONS:
+            super().delete_multi(keys, retry=retry, timeout=timeout)
+            return
+        unique: List[Key] = list(
+            dict.fromkeys(k.key if isinstance(k, Entity) else k for k in keys))
+        self._commit_chunks(unique, ReducedBatch.delete, retry, timeout)
+
+    def _lookup(
+        self,
+        lookup: _Lookup,
+        keys: List[Key],
+        retry: Optional[Retry] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[List[Subentity], List[Entity], List[Key]]:
+        """Looks up a single chunk of keys.
+
+        Unless the caller asked for deferred keys to be returned, deferred
+        keys are looked up again on the lookup executor of the subclient
+        while the entities that were already found are wrapped, until no keys
+        are deferred or `MAX_DEFERRED_LOOKUPS` follow-up lookups were made.
+
+        :rtype: tuple
+        :returns: The entities that were found, wrapped as subentities, the
+            missing entities and the keys that were deferred.
+        """
+        api: Any = self._datastore_api
+        kwargs: Dict[str, Any] = _retry_timeout_kwargs(retry, timeout)
+        found: List[Subentity] = []
+        missing: List[Entity] = []
+        response: datastore_pb2.LookupResponse = api.lookup(
+            request=lookup.request([key.to_protobuf() for key in keys]),
+            **kwargs)
+        loops: int = 0
+        while True:
+            pending: Optional[Future] = None
+            if response.deferred and lookup.resolve_deferred:
+                loops = _check_deferred_loops(loops)
+                pending = self._lookup_executor.submit(
+                    api.lookup,
+                    request=lookup.request(list(response.deferred)),
+                    **kwargs)
+            try:
+                lookup.absorb(response, found, missing)
+            except BaseException:
+                if pending is not None:
+                    pending.cancel()
+                raise
+            if pending is None:
+                return found, missing, [
+                    helpers.key_from_protobuf(key_pb)
+                    for key_pb in response.deferred
+                ]
+            response = pending.result()
+
+    def _commit_chunks(self, items: List[Any],
+                       add: Callable[[ReducedBatch, Any], None],
+                       retry: Optional[Retry],
+                       timeout: Optional[float]) -> None:
+        """Commits items in chunks of the largest size a single commit
+        accepts, with one batch per chunk.
+
+        :type items: list
+        :param items: The entities to put or keys to delete.
+
+        :type add: callable
+        :param add: The batch method that adds an item to a batch.
+        """
+        def commit(chunk: List[Any]) -> None:
+            batch: ReducedBatch = self.batch()
+            batch.begin()
+            for item in chunk:
+                add(batch, item)
+            batch.commit(retry=retry, timeout=timeout)
+
+        run_chunks(commit,
+                   chunked(items, MAX_MUTATIONS),
+                   max_workers=self._max_workers)
+
+    def batch(self,
+              autoupdate: bool = True,
+              force: bool = False) -> ReducedBatch:
         """Proxy to the `ReducedBatch` constructor.
         """
-        return ReducedBatch(self)
+        return ReducedBatch(self, autoupdate=autoupdate, force=force)
 
     def transaction(self, **kwargs: Any) -> ReducedTransaction:
         """Proxy to the `ReducedTransaction` constructor.
@@ -101,27 +304,176 @@ class Subclient(Client):
 
         :type key: :class:`google.cloud.datastore.key.Key` | str
         :param key: The key to convert. If the key is a Datastore key, then it
-            is simply returned unchanged.
+            is simply returned unchanged. Strings are decoded through a cache
+            of recently decoded strings. See `core.keys.key_from_urlsafe`.
 
         :rtype: :class:`google.cloud.datastore.key.Key`
         :returns: The converted key.
         """
         if isinstance(key, Key):
             return key
-        return Key.from_legacy_urlsafe(key)
+        return key_from_urlsafe(key)
+
+
+def _retry_timeout_kwargs(retry: Optional[Retry],
+                          timeout: Optional[float]) -> Dict[str, Any]:
+    """Returns the keyword arguments that pass a retry and timeout to a
+    Datastore API method, leaving out the ones that are not set.
+    """
+    kwargs: Dict[str, Any] = {}
+    if retry is not None:
+        kwargs['retry'] = retry
+    if timeout is not None:
+        kwargs['timeout'] = timeout
+    return kwargs
 
-    def _wrap(self, entity: Entity) -> Subentity:
-        """Wraps an entity in a subentity and returns the subentity.
 
-        :type entity: :class:`google.cloud.datastore.entity.Entity`
-        :param entity: The entity to wrap.
+def _check_deferred_loops(loops: int) -> int:
+    """Counts a follow-up lookup of deferred keys and returns the new count,
+    or raises a `RuntimeError` once `MAX_DEFERRED_LOOKUPS` were made.
+    """
+    if loops >= MAX_DEFERRED_LOOKUPS:
+        raise RuntimeError(f'keys were still deferred after '
+                           f'{MAX_DEFERRED_LOOKUPS} follow-up lookups')
+    return loops + 1
 
-        :rtype: :class:`core.subentity.Subentity`
-        :returns: The entity wrapped as a subentity.
+
+class _Lookup:
+    """The state of a single `get_multi` call, shared by the lookups of its
+    chunks.
+
+    Creating a lookup checks the keys and resolves the ones that can be
+    answered without a request, from the entity cache or the identity map of
+    the transaction. The remaining keys are listed in `uncached`.
+    """
+    def __init__(self,
+                 client: Subclient,
+                 keys: List[Key | str],
+                 missing: Optional[List] = None,
+                 deferred: Optional[List] = None,
+                 transaction: Optional[Transaction] = None,
+                 eventual: bool = False) -> None:
+        for name, out in (('missing', missing), ('deferred', deferred)):
+            if out is not None and out != []:
+                raise ValueError(f'{name} must be None or an empty list')
+        self.client: Subclient = client
+        self.keys: List[Key] = [
+            intern_key(client._to_key(key)) for key in keys
+        ]
+        if any(key.project != client.project for key in self.keys):
+            raise ValueError('Keys do not match project')
+        if transaction is None:
+            transaction = client.current_transaction
+        self.transaction: Optional[Transaction] = transaction
+        self.read_options: datastore_pb2.ReadOptions = (
+            helpers.get_read_options(eventual, transaction
+                                     and transaction.id))
+        self.missing: Optional[List] = missing
+        self.deferred: Optional[List] = deferred
+        self.resolve_deferred: bool = deferred is None
+
+        self.found: List[Subentity] = []
+        self.uncached: List[Key] = self.keys
+        self.cache: Optional[EntityCache] = (client.cache
+                                             if transaction is None else None)
+        self.generations: Dict[str, int] = {}
+        self.identity_map: Optional[Dict[Key, Optional[Subentity]]] = getattr(
+            transaction, 'identity_map', None)
+        if self.cache is not None:
+            self.generations = {
+                kind: self.cache.generation(kind)
+                for kind in {key.kind for key in self.keys}
+            }
+            self.uncached = []
+            hits: List[Entity] = []
+            for key in self.keys:
+                cached: Optional[Tuple[bool, Any]] = self.cache.get(key)
+                if cached is None:
+                    self.uncached.append(key)
+                elif cached[0]:
+                    hits.append(helpers.entity_from_protobuf(cached[1]))
+                elif missing is not None:
+                    missing.append(Entity(key=key))
+            self.found = wrap_entities(hits, client._registry)
+        elif self.identity_map is not None:
+            self.uncached = []
+            for key in self.keys:
+                if key not in self.identity_map:
+                    self.uncached.append(key)
+                elif self.identity_map[key] is not None:
+                    self.found.append(self.identity_map[key])
+                elif missing is not None:
+                    missing.append(Entity(key=key))
+
+    def request(self, key_pbs: List[Any]) -> Dict[str, Any]:
+        """Returns the request that looks up the given key protobufs.
         """
-        if (self._registry is None
-                or not self._registry.has_subentity_type(entity.key.kind)):
-            return Subentity.wrap(entity)
-        subtype: type[Subentity] = self._registry.get_subentity_type(
-            entity.key.kind)
-        return subtype.wrap(entity)
+        return {
+            'project_id': self.client.project,
+            'keys': key_pbs,
+            'read_options': self.read_options,
+        }
+
+    def absorb(self, response: datastore_pb2.LookupResponse,
+               found: List[Subentity], missing: List[Entity]) -> None:
+        """Wraps the entities found by a lookup response and adds them to
+        `found`, adds the missing entities to `missing` if the caller asked for
+        them, and adds both to the entity cache.
+        """
+        entity: Entity
+        entities: List[Entity] = []
+        for result in response.found:
+            entity = helpers.entity_from_protobuf(result.entity)
+            entity.key = intern_key(entity.key)
+            if self.cache is not None:
+                self.cache.put(entity.key, entity_pb2.Entity.pb(result.entity),
+                               self.generations[entity.key.kind])
+            entities.append(entity)
+        found.extend(wrap_entities(entities, self.client._registry))
+        if self.missing is not None or self.cache is not None:
+            for result in response.missing:
+                entity = helpers.entity_from_protobuf(result.entity)
+                entity.key = intern_key(entity.key)
+                if self.cache is not None:
+                    self.cache.put(entity.key, None,
+                                   self.generations[entity.key.kind])
+                if self.missing is not None:
+                    missing.append(entity)
+
+    def merge(self,
+              results: List[Tuple[List[Subentity], List, List]],
+              aligned: bool = False) -> List[Optional[Subentity]]:
+        """Combines the results of the lookups of every chunk, and returns
+        the result of the `get_multi` call.
+        """
+        found: List[Subentity] = self.found
+        identity_map: Optional[Dict[Key, Optional[Subentity]]] = (
+            self.identity_map)
+        resolved: Set[Key] = set()
+        for entities, chunk_missing, chunk_deferred in results:
+            if identity_map is not None:
+                entities = [
+                    identity_map.setdefault(e.key, e) for e in entities
+                ]
+                resolved.update(e.key for e in entities)
+                resolved.update(chunk_deferred)
+            found.extend(entities)
+            if self.missing is not None:
+                self.missing.extend(chunk_missing)
+            if self.deferred is not None:
+                self.deferred.extend(chunk_deferred)
+        if identity_map is not None:
+            # The keys that were neither found nor deferred are missing.
+            for key in self.uncached:
+                if key not in resolved:
+                    identity_map.setdefault(key, None)
+
+        if aligned:
+            by_key: Dict[Key, Subentity] = {e.key: e for e in found}
+            return [by_key.get(key) for key in self.keys]
+        if len(found) > 1:
+            positions: Dict[Key, int] = {}
+            for i, key in enumerate(self.keys):
+                positions.setdefault(key, i)
+            found.sort(key=lambda e: positions.get(e.key, len(positions)))
+        return found
@@ -1,8 +1,98 @@
 from __future__ import annotations
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
-
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+import array
+import copy
+import inspect
+
+from enum import Enum
 from google.cloud.datastore import Client, Entity, Key
 
+#: Dispatch actions used by `Subentity.__getattribute__`. A delegated name is
+#  looked up on the underlying entity, a local name is looked up on the
+#  subentity itself and a property name is read as an item of the underlying
+#  entity.
+_DELEGATE: str = 'delegate'
+_LOCAL: str = 'local'
+_PROPERTY: str = 'property'
+
+#: Dispatch action for delegated methods that hand out the values of the
+#  underlying entity, such as `items`. See `Subentity.mark_clean`.
+_EXPOSE: str = 'expose'
+
+#: The delegated methods that are dispatched as `_EXPOSE`.
+_EXPOSING_NAMES: FrozenSet[str] = frozenset(
+    {'copy', 'get', 'items', 'pop', 'popitem', 'setdefault', 'values'})
+
+#: The types of values that can be changed in place, which are copied into
+#  the snapshot of a clean subentity.
+MUTABLE_TYPES: Tuple[type, ...] = (list, dict, array.array)
+
+#: The attributes that the `Entity` constructor sets on every instance. These
+#  cannot be found by inspecting the `Entity` class, so they are listed here.
+_ENTITY_INSTANCE_ATTRS: FrozenSet[str] = frozenset(vars(Entity()))
+
+#: The state of an entity that is compared to detect changes: its key, the
+#  names excluded from indexes and its values, with copies of the values
+#  that can change in place. See `Subentity.mark_clean`.
+Snapshot = Tuple[Optional[Key], FrozenSet[str], Dict[str, Any]]
+
+
+def _snapshot_value(value: Any) -> Any:
+    """Copies a value so that later in-place changes to the original, such as
+    appending to a list, are not reflected in the copy.
+    """
+    if isinstance(value, list):
+        if value and isinstance(value[0], dict):
+            return copy.deepcopy(value)
+        return list(value)
+    if isinstance(value, array.array):
+        return value.tolist()
+    if isinstance(value, dict):
+        return copy.deepcopy(value)
+    return value
+
+
+def entity_snapshot(entity: Entity) -> Snapshot:
+    """Returns the state of an entity as it is, without copying its values.
+    See `Subentity.mark_clean`.
+    """
+    return (entity.key, frozenset(entity.exclude_from_indexes),
+            dict(entity.items()))
+
+
+def _is_data_descriptor(value: Any) -> bool:
+    """Returns whether or not a class attribute is a data descriptor, which
+    takes precedence over instance attributes of the same name.
+    """
+    value_type: type = type(value)
+    return hasattr(value_type, '__set__') or hasattr(value_type, '__delete__')
+
+
+class ReadMode(str, Enum):
+    """Controls how much validation is done when an entity that was read from
+    the Datastore is wrapped.
+
+    `STRICT` validates every value when the entity is wrapped. `LAZY` defers
+    validating each value until it is first accessed. `TRUSTED` does not
+    validate stored values at all, which is only appropriate for data that was
+    validated when it was written.
+    """
+    STRICT = 'strict'
+    LAZY = 'lazy'
+    TRUSTED = 'trusted'
+
 
 class undelegated:
     """Decorator to mark a method as undelegated.
@@ -15,6 +105,10 @@ class undelegated:
         self.func: Callable = func
 
     def __set_name__(self, owner: Subentity, name: str) -> None:
+        # Each class gets its own copy of the set, so that marking a method as
+        # undelegated on a subclass does not affect its base classes.
+        if '__undelegated_attrs__' not in owner.__dict__:
+            owner.__undelegated_attrs__ = set(owner.__undelegated_attrs__)
         owner.__undelegated_attrs__.add(name)
         setattr(owner, name, self.func)
 
@@ -33,34 +127,80 @@ class Subentity(Entity):
     subentities to be created from base entities without needing to copy over
     property values. A `wrap` class method is provided that allows the caller
     to wrap an existing entity to create a new subentity.
+
+    Whether a name is delegated is decided once per class, when the class is
+    created, and stored in the `__dispatch__` table. Attribute access then
+    costs a single dictionary lookup on top of the regular attribute lookup.
+    Assigning to a delegated name, such as `key`, sets it on the underlying
+    entity.
+
+    Subentities that were read from or committed to the Datastore remember
+    their values at that point, so that batches and transactions can skip
+    writing them if they have not changed. See `is_dirty`.
     """
 
+    __slots__ = ('_entity', '_snapshot')
+
     #: The attributes which should not be delegated to the underlying entity.
     #  Method names can be added to this set by decorating methods with the
     # `undelegated` decorator.
     __undelegated_attrs__: Set[str] = set()
 
+    #: Maps attribute names to the action used to resolve them. Names that are
+    #  not in the table are resolved locally. This is compiled for every
+    #  subclass when it is created and is never modified directly.
+    __dispatch__: Dict[str, str] = {}
+
     def __init__(self,
                  key: Optional[Key] = None,
                  exclude_from_indexes: Union[Tuple, List] = ()):
+        # Note that `Entity.__init__` is intentionally not called on the
+        # subentity itself. All entity state lives on the underlying entity,
+        # so initializing the subentity as well would only allocate a second
+        # set of attributes that are never read.
         self._entity: Entity = Entity(
             key=key,
             exclude_from_indexes=exclude_from_indexes,
         )
-        super().__init__(key=key, exclude_from_indexes=exclude_from_indexes)
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.__dispatch__ = cls._compile_dispatch()
 
     def __getattribute__(self, name: str) -> Any:
-        is_delegated: bool = name not in type(self).__undelegated_attrs__
-        if name.startswith('__') and name.endswith('__'):
-            return object.__getattribute__(self, name)
-        if name == '_entity':
+        action: str = type(self).__dispatch__.get(name, _LOCAL)
+        if action is _LOCAL:
             return object.__getattribute__(self, name)
-        if is_delegated and hasattr(self._entity, name):
-            return getattr(self._entity, name)
-        return object.__getattribute__(self, name)
+        entity: Entity = object.__getattribute__(self, '_entity')
+        if action is _DELEGATE:
+            return getattr(entity, name)
+        if action is _EXPOSE:
+            self._expose_values()
+            return getattr(entity, name)
+        return entity[name]
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        action: str = type(self).__dispatch__.get(name, _LOCAL)
+        if action is _LOCAL:
+            object.__setattr__(self, name, value)
+        elif action is _DELEGATE or action is _EXPOSE:
+            setattr(object.__getattribute__(self, '_entity'), name, value)
+        else:
+            self[name] = value
+
+    def __getattr__(self, name: str) -> Any:
+        # This is only called when a local lookup fails, which covers
+        # attributes that were added to the underlying entity after the
+        # dispatch table was compiled.
+        if name.startswith('__') and name.endswith('__'):
+            raise AttributeError(name)
+        return getattr(object.__getattribute__(self, '_entity'), name)
 
     def __getitem__(self, key: Any) -> Any:
-        return self._entity[key]
+        value: Any = self._entity[key]
+        if isinstance(value, MUTABLE_TYPES):
+            self._detach_snapshot_value(key, value)
+        return value
 
     def __setitem__(self, key: Any, value: Any) -> None:
         self._entity[key] = value
@@ -80,6 +220,7 @@ class Subentity(Entity):
     def __or__(self, other: Dict) -> Dict:
         # Note that the return type is a dict, not a subentity. This behavior
         # is consistent with that of the raw `Entity` class.
+        self._expose_values()
         return self._entity | other
 
     def __ior__(self, other: Dict) -> Subentity:
@@ -89,6 +230,131 @@ class Subentity(Entity):
     def __repr__(self) -> str:
         return self._entity.__repr__()
 
+    @property
+    def is_dirty(self) -> bool:
+        """Returns whether or not the subentity may differ from what is stored
+        in the Datastore.
+
+        A subentity is clean after it is read from the Datastore through a
+        subclient or committed through a batch or transaction, and becomes
+        dirty once its key, its values or the names excluded from indexes
+        change. A subentity read through a subclient is dirty right away if
+        wrapping it filled in defaults or changed the names excluded from
+        indexes. Values are compared rather than tracked, so in-place changes
+        such as appending to a list are detected too. Subentities that were
+        created or wrapped directly are always dirty. See `mark_clean`.
+        """
+        snapshot: Optional[Snapshot] = self._get_snapshot()
+        if snapshot is None:
+            return True
+        key, excluded, values = snapshot
+        entity: Entity = self._entity
+        return (entity.key != key or entity.exclude_from_indexes != excluded
+                or not dict.__eq__(entity, values))
+
+    @property
+    def dirty_properties(self) -> Set[str]:
+        """Returns the names of the values that were set, changed or removed
+        since the subentity was last clean. If the subentity has never been
+        clean, every name is returned.
+        """
+        entity: Entity = self._entity
+        snapshot: Optional[Snapshot] = self._get_snapshot()
+        if snapshot is None:
+            return set(entity)
+        values: Dict[str, Any] = snapshot[2]
+        names: Set[str] = {
+            name for name, value in entity.items()
+            if name not in values or values[name] != value
+        }
+        names.update(name for name in values if name not in entity)
+        return names
+
+    def mark_clean(self,
+                   lazy: bool = False,
+                   stored: Optional[Snapshot] = None) -> None:
+        """Records the current state of the subentity as the state stored in
+        the Datastore. This is called by subclients after reading the
+        subentity and by batches after committing it.
+
+        Values that can be changed in place, such as lists, are copied so
+        that such changes are detected by `is_dirty`. Other values are only
+        referenced.
+
+        :type lazy: bool, optional
+        :param lazy: Whether or not copying a value is deferred until it is
+            first read from the subentity, e.g. through `__getitem__`, a
+            property or `items`. Values that are never read are never
+            copied. This is only correct if nothing else holds a reference to
+            the values, which is the case for subentities that were just read
+            from the Datastore. Defaults to `false`.
+
+        :type stored: tuple, optional
+        :param stored: The state stored in the Datastore, as returned by
+            `entity_snapshot`, if it differs from the current state. Fetched
+            entities are recorded as they were read, before wrapping filled
+            in defaults or changed the names excluded from indexes, so that
+            such changes are written when the subentity is put again.
+        """
+        key: Optional[Key]
+        excluded: FrozenSet[str]
+        values: Dict[str, Any]
+        key, excluded, values = (entity_snapshot(self._entity)
+                                 if stored is None else stored)
+        if not lazy:
+            for name, value in values.items():
+                if isinstance(value, MUTABLE_TYPES):
+                    values[name] = _snapshot_value(value)
+        self._snapshot = (key, excluded, values)
+
+    def mark_dirty(self) -> None:
+        """Marks the subentity as dirty, so that it is written the next time it
+        is committed even if it has not changed.
+        """
+        self._snapshot = None
+
+    def _detach_snapshot_value(self, name: str, value: Any) -> None:
+        """Copies a value that is about to be handed out into the snapshot,
+        if the snapshot still references the value itself. See
+        `mark_clean`.
+        """
+        snapshot: Optional[Snapshot] = self._get_snapshot()
+        if snapshot is not None:
+            values: Dict[str, Any] = snapshot[2]
+            if values.get(name) is value:
+                values[name] = _snapshot_value(value)
+
+    def _expose_values(self) -> None:
+        """Prepares the values of the underlying entity before they are handed
+        out by a delegated method such as `items`. Subclasses can override
+        this to check the values first.
+        """
+        self._detach_snapshot()
+
+    def _detach_snapshot(self) -> None:
+        """Copies every value that the snapshot still references into it,
+        before the values of the underlying entity are handed out.
+        """
+        snapshot: Optional[Snapshot] = self._get_snapshot()
+        if snapshot is not None:
+            values: Dict[str, Any] = snapshot[2]
+            entity: Entity = self._entity
+            for name, value in values.items():
+                if (isinstance(value, MUTABLE_TYPES)
+                        and dict.get(entity, name) is value):
+                    values[name] = _snapshot_value(value)
+
+    def _get_snapshot(self) -> Optional[Snapshot]:
+        """Returns the state recorded by `mark_clean`, or `None` if the
+        subentity has not been marked clean since it was created.
+        """
+        try:
+            return self._snapshot
+        except AttributeError:
+            # The slot is only filled once the subentity is marked clean or
+            # dirty, so that creating subentities does not cost anything.
+            return None
+
     @classmethod
     def kind(cls) -> Optional[str]:
         """Returns the key kind that should be used for keys corresponding to
@@ -96,6 +362,75 @@ class Subentity(Entity):
         """
         return None
 
+    def _autoupdate(self, updates: Dict[Callable, Any]) -> None:
+        """Updates values that should change whenever the subentity is
+        committed. This is called by batches and transactions right before the
+        subentity is put.
+
+        Plain subentities have no such values, but subclasses can override
+        this method.
+
+        :type updates: dict
+        :param updates: Values already generated during the current commit,
+            keyed by the function that generated them. Functions whose values
+            should be shared by every subentity in the commit are only called
+            once, with their value stored here.
+        """
+        pass
+
+    @classmethod
+    def _delegate_type(cls) -> type:
+        """Returns the type of the underlying entity that attribute access is
+        delegated to.
+        """
+        return Entity
+
+    @classmethod
+    def _property_names(cls) -> Iterable[str]:
+        """Returns the names which should be read directly as items of the
+        underlying entity when they are accessed as attributes.
+        """
+        return ()
+
+    @classmethod
+    def _compile_dispatch(cls) -> Dict[str, str]:
+        """Builds the dispatch table used to resolve attribute names on
+        instances of this type.
+
+        A name is delegated if it can be found on the underlying entity and
+        has not been marked as undelegated. Data descriptors defined on a
+        subentity class, such as the properties of a typed entity, are
+        resolved locally even if the underlying entity has a different
+        attribute of the same name, e.g. a property named `id` or `values`.
+        Property names take precedence over all of these and are read
+        directly from the underlying entity.
+        """
+        delegate_type: type = cls._delegate_type()
+        names: Set[str] = set(dir(delegate_type))
+        names.update(_ENTITY_INSTANCE_ATTRS)
+
+        dispatch: Dict[str, str] = {}
+        for name in names:
+            if name in _EXPOSING_NAMES:
+                dispatch[name] = _EXPOSE
+            elif not (name.startswith('__') and name.endswith('__')):
+                dispatch[name] = _DELEGATE
+        for name in cls.__undelegated_attrs__:
+            dispatch[name] = _LOCAL
+        for klass in cls.__mro__:
+            if issubclass(klass, Subentity):
+                for name, value in vars(klass).items():
+                    if (dispatch.get(name) in (_DELEGATE, _EXPOSE)
+                            and _is_data_descriptor(value)
+                            and inspect.getattr_static(
+                                delegate_type, name, None) is not value):
+                        dispatch[name] = _LOCAL
+        for name in cls._property_names():
+            dispatch[name] = _PROPERTY
+        dispatch['_entity'] = _LOCAL
+        dispatch['_snapshot'] = _LOCAL
+        return dispatch
+
     @classmethod
     def create_key(cls,
                    client: Client,
@@ -153,7 +488,9 @@ class Subentity(Entity):
                    **kwargs)
 
     @classmethod
-    def wrap(cls, entity: Entity) -> Subentity:
+    def wrap(cls,
+             entity: Entity,
+             read_mode: Optional[ReadMode] = None) -> Subentity:
         """Wraps an exisitng entity and returns a `Subentity` object.
 
         This function is meant to be called when raw entities are fetched from
@@ -163,12 +500,59 @@ class Subentity(Entity):
         :type entity: :class:`google.cloud.datastore.entity.Entity`
         :param entity: The entity to wrap.
 
+        :type read_mode: :class:`core.subentity.ReadMode`, optional
+        :param read_mode: How the wrapped values should be validated. Plain
+            subentities have no schema, so this is ignored.
+
         :rtype: :class:`core.subentity.Subentity`
         :returns: A subentity which wraps the input entity.
         """
-        wrapped: Subentity = Subentity(
-            key=entity.key,
-            exclude_from_indexes=list(entity.exclude_from_indexes),
-        )
-        wrapped._entity = entity
-        return wrapped
+        return Subentity._attach(entity)
+
+    @classmethod
+    def wrap_many(cls,
+                  entities: Iterable[Entity],
+                  read_mode: Optional[ReadMode] = None) -> List[Subentity]:
+        """Wraps existing entities, in the same way as `wrap`, and returns the
+        subentities in input order.
+
+        Subclasses that override `wrap` should override this method as well,
+        resolving anything shared by the entities once. Otherwise `wrap` is
+        called for each entity.
+
+        :type entities: iterable
+        :param entities: The entities to wrap.
+
+        :type read_mode: :class:`core.subentity.ReadMode`, optional
+        :param read_mode: How the wrapped values should be validated.
+
+        :rtype: list
+        :returns: The subentities which wrap the input entities.
+        """
+        if cls.wrap.__func__ is not Subentity.wrap.__func__:
+            return [
+                cls.wrap(entity, read_mode=read_mode) for entity in entities
+            ]
+        attach: Callable[[Entity], Subentity] = Subentity._attach
+        return [attach(entity) for entity in entities]
+
+    @classmethod
+    def _attach(cls, entity: Entity) -> Subentity:
+        """Allocates a subentity of this type and attaches an existing entity
+        to it without calling the constructor.
+
+        No copies are made, so the returned subentity reads and writes the
+        input entity directly.
+
+        :type entity: :class:`google.cloud.datastore.entity.Entity`
+        :param entity: The entity to attach.
+
+        :rtype: :class:`core.subentity.Subentity`
+        :returns: A subentity of this type which wraps the input entity.
+        """
+        subentity: Subentity = cls.__new__(cls)
+        subentity._entity = entity
+        return subentity
+
+
+Subentity.__dispatch__ = Subentity._compile_dispatch()
@@ -1,13 +1,50 @@
 from __future__ import annotations
-from typing import Any, Callable, Optional, Sequence, Tuple, Type
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator as TypingIterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+import collections
+import queue
+import threading
 
 from google.api_core.page_iterator import Page
 from google.api_core.retry import Retry
-from google.cloud.datastore import Client, Entity, Key
+from google.cloud.datastore import Client, Entity, Key, helpers
 from google.cloud.datastore.query import Iterator, Query
+from google.cloud.datastore_v1.types import datastore as datastore_pb2
+from google.cloud.datastore_v1.types import entity as entity_pb2
+from google.cloud.datastore_v1.types import query as query_pb2
 from google.protobuf.message import Message
 
-from gcdmc.core.registry import Registry
+from gcdmc.core.cache import QueryCache
+from gcdmc.core.chunks import DEFAULT_MAX_WORKERS
+from gcdmc.core.export import (
+    DEFAULT_BUFFER_SIZE,
+    DEFAULT_CHECKPOINT_PAGES,
+    ExportStats,
+    export_query,
+)
+from gcdmc.core.records import RecordConverter, key_from_result, record_type
+from gcdmc.core.registry import Registry, wrap_entities
+from gcdmc.core.sharding import (
+    DEFAULT_OVERSAMPLING,
+    QueryShard,
+    ShardedIterator,
+    check_shardable,
+    key_order,
+    shards_between,
+    split_points,
+)
 from gcdmc.core.subentity import Subentity
 
 
@@ -19,21 +56,27 @@ class Subpage(Page):
                  raw_page: Optional[Message] = None,
                  registry: Optional[Registry] = None):
         self._registry: Registry = registry
+        self._wrapped: Optional[TypingIterator[Subentity]] = None
         super().__init__(parent, items, item_to_value, raw_page=raw_page)
 
     def __next__(self) -> Subentity:
         """Gets the next entity, and returns it as a subentity.
 
-        If the subpage has a registry and the kind of the next entity is in its
-        registry, then the registered subentity type is used to wrap the entity.
-        Otherwise, the plain `Subentity` class is used to wrap the entity.
+        The remaining entities of the page are wrapped together when the first
+        one is requested, through the registry of the subpage if it has one.
+        See `Registry.wrap_many`.
         """
-        entity: Entity = super().next()
-        if self._registry is None:
-            return Subentity.wrap(entity)
-        subentity_type: Type[Subentity] = self._registry.get_subentity_type(
-            entity.key.kind)
-        return subentity_type.wrap(entity)
+        if not self._parent.wraps_results:
+            return super().__next__()
+        if self._wrapped is None:
+            self._wrapped = iter(
+                wrap_entities([
+                    self._item_to_value(self._parent, item)
+                    for item in self._item_iter
+                ], self._registry))
+        subentity: Subentity = next(self._wrapped)
+        self._remaining -= 1
+        return subentity
 
     @classmethod
     def derive(cls,
@@ -50,10 +93,25 @@ class Subpage(Page):
         subpage._item_to_value = page._item_to_value
         subpage._raw_page = page.raw_page
         subpage._registry = registry
+        subpage._wrapped = None
         return subpage
 
 
 class Subiterator(Iterator):
+    """An iterator over the results of a query, which wraps the entities as
+    subentities.
+
+    If `prefetch` is given, the pages are requested on a background thread,
+    which stays up to `prefetch` pages ahead of the pages that have been
+    consumed. The pages are requested with the cursor of the previous page,
+    so the results are the same as without prefetching. The thread stops
+    when every page has been requested, when the iterator is closed, or when
+    iteration over its items or pages is abandoned.
+
+    If `cached` is set and the client has a query cache, the pages are read
+    from the cache when the same query was read before, and cached once
+    every page has been read otherwise. See `core.cache.QueryCache`.
+    """
     def __init__(self,
                  query: Query,
                  client: Client,
@@ -64,8 +122,22 @@ class Subiterator(Iterator):
                  eventual: bool = False,
                  retry: Optional[Retry] = None,
                  timeout: float = None,
-                 registry: Optional[Registry] = None):
+                 registry: Optional[Registry] = None,
+                 prefetch: int = 0,
+                 cached: bool = False):
         self._registry: Optional[Registry] = registry
+        self.prefetch: int = prefetch
+        self.cached: bool = cached
+        self._cache_opened: bool = False
+        self._query_cache: Optional[QueryCache] = None
+        self._fingerprint: Optional[Hashable] = None
+        self._generation: int = 0
+        self._replay: Optional[collections.deque] = None
+        self._recorded: Optional[List[Any]] = None
+        #: Whether or not results are wrapped as subentities. Iterators over
+        #  keys or records convert the results with `item_to_value` instead.
+        self.wraps_results: bool = True
+        self._prefetcher: Optional[_Prefetcher] = None
         super().__init__(query,
                          client,
                          limit=limit,
@@ -76,26 +148,237 @@ class Subiterator(Iterator):
                          retry=retry,
                          timeout=timeout)
 
+    def close(self) -> None:
+        """Stops requesting pages in the background. Pages that were already
+        requested are discarded.
+        """
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+            self._prefetcher = None
+
+    def _page_iter(self, increment: bool) -> TypingIterator[Page]:
+        try:
+            yield from super()._page_iter(increment)
+        finally:
+            self.close()
+
     def _next_page(self) -> Optional[Subpage]:
-        page: Optional[Page] = super()._next_page()
-        if page is None:
+        if not self._more_results:
             return None
-        return Subpage.derive(page, registry=self._registry)
+        if self.cached and not self._cache_opened:
+            self._open_cache()
+
+        response: datastore_pb2.RunQueryResponse
+        if self._replay is not None:
+            response = self._replay.popleft()
+        elif self.prefetch > 0:
+            if self._prefetcher is None:
+                self._prefetcher = _Prefetcher(self)
+            response = self._prefetcher.take()
+        else:
+            response = self._run_query(self._build_protobuf(),
+                                       self._base_request())
+        entity_pbs: List[Any] = self._process_query_results(response)
+        self._record_page(response)
+        return Subpage(self,
+                       entity_pbs,
+                       self.item_to_value,
+                       raw_page=response,
+                       registry=self._registry)
+
+    def _open_cache(self) -> None:
+        """Looks up the query in the query cache of the client before the
+        first page is requested. On a hit, the cached pages are replayed.
+        Otherwise the pages are recorded, and cached once the last page has
+        been read.
+        """
+        self._cache_opened = True
+        cache: Optional[QueryCache] = getattr(self.client, 'query_cache',
+                                              None)
+        if cache is None or self.client.current_transaction is not None:
+            return
+        self._query_cache = cache
+        self._fingerprint = _fingerprint(self)
+        pages: Optional[Tuple[Any, ...]] = cache.get(self._fingerprint)
+        if pages is not None:
+            self._replay = collections.deque(pages)
+        else:
+            self._generation = cache.generation(self._query.kind)
+            self._recorded = []
+
+    def _record_page(self, response: datastore_pb2.RunQueryResponse) -> None:
+        """Records a page of results that was just processed, and caches the
+        recorded pages once the last page has been read. See `_open_cache`.
+        """
+        if self._recorded is not None:
+            self._recorded.append(response)
+            if not self._more_results:
+                self._query_cache.put(self._fingerprint, self._query.kind,
+                                      self._recorded, self._generation)
+                self._recorded = None
+
+    def _base_request(self) -> Dict[str, Any]:
+        """Returns the fields of a query request other than the query. This
+        reads the thread-local transaction of the client.
+        """
+        transaction: Any = self.client.current_transaction
+        return {
+            'project_id': self._query.project,
+            'partition_id': entity_pb2.PartitionId(
+                project_id=self._query.project,
+                namespace_id=self._query.namespace),
+            'read_options': helpers.get_read_options(
+                self._eventual, transaction and transaction.id),
+        }
+
+    def _run_query(
+            self, query_pb: query_pb2.Query,
+            request: Dict[str, Any]) -> datastore_pb2.RunQueryResponse:
+        """Sends a query, and sends it again from where the Datastore stopped
+        until the offset of the query has been skipped. See
+        `google.cloud.datastore.query.Iterator._next_page`.
+        """
+        kwargs: Dict[str, Any] = {}
+        if self._retry is not None:
+            kwargs['retry'] = self._retry
+        if self._timeout is not None:
+            kwargs['timeout'] = self._timeout
+        response: datastore_pb2.RunQueryResponse = (
+            self.client._datastore_api.run_query(
+                request={**request, 'query': query_pb}, **kwargs))
+        while (response.batch.more_results
+               == query_pb2.QueryResultBatch.MoreResultsType.NOT_FINISHED
+               and response.batch.skipped_results < query_pb.offset):
+            query_pb = _copy_query(query_pb)
+            query_pb.start_cursor = response.batch.skipped_cursor
+            query_pb.offset -= response.batch.skipped_results
+            response = self.client._datastore_api.run_query(
+                request={**request, 'query': query_pb}, **kwargs)
+        return response
 
     @classmethod
     def derive(cls,
                iterator: Iterator,
-               registry: Optional[Registry] = None) -> Subiterator:
-        return Subiterator(iterator._query,
-                           iterator.client,
-                           limit=iterator.max_results,
-                           offset=iterator._offset,
-                           start_cursor=iterator.next_page_token,
-                           end_cursor=iterator._end_cursor,
-                           eventual=iterator._eventual,
-                           retry=iterator._retry,
-                           timeout=iterator._timeout,
-                           registry=registry)
+               registry: Optional[Registry] = None,
+               prefetch: int = 0,
+               cached: bool = False) -> Subiterator:
+        return cls(iterator._query,
+                   iterator.client,
+                   limit=iterator.max_results,
+                   offset=iterator._offset,
+                   start_cursor=iterator.next_page_token,
+                   end_cursor=iterator._end_cursor,
+                   eventual=iterator._eventual,
+                   retry=iterator._retry,
+                   timeout=iterator._timeout,
+                   registry=registry,
+                   prefetch=prefetch,
+                   cached=cached)
+
+
+def _fingerprint(iterator: Subiterator) -> Hashable:
+    """Returns a value identifying the results a subiterator will return,
+    from the state of its query and the arguments of the fetch. Filters are
+    combined with AND, so their order is ignored.
+    """
+    query: Query = iterator._query
+    return (
+        query.project,
+        query.namespace,
+        query.kind,
+        query.ancestor,
+        tuple(
+            sorted(((name, operator, _hashable(value))
+                    for name, operator, value in query.filters),
+                   key=repr)),
+        tuple(query.projection),
+        tuple(query.order),
+        tuple(query.distinct_on),
+        iterator.max_results,
+        iterator._offset,
+        iterator.next_page_token,
+        iterator._end_cursor,
+        iterator._eventual,
+    )
+
+
+def _hashable(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+def _copy_query(query_pb: query_pb2.Query) -> query_pb2.Query:
+    copied: query_pb2.Query = query_pb2.Query()
+    query_pb2.Query.pb(copied).CopyFrom(query_pb2.Query.pb(query_pb))
+    return copied
+
+
+class _Prefetcher:
+    """Requests the pages of a subiterator on a background thread.
+
+    The thread requests a page only while fewer than `prefetch` pages are
+    waiting to be taken, so a slow consumer holds back the requests.
+    """
+
+    #: The number of seconds the thread waits for room before checking
+    #  whether it was stopped.
+    POLL_INTERVAL: float = 0.1
+
+    def __init__(self, iterator: Subiterator) -> None:
+        # Everything that depends on the state of the iterator, or on the
+        # thread-local transaction of the client, is read on this thread.
+        self._query_pb: query_pb2.Query = iterator._build_protobuf()
+        self._limit: Optional[int] = (None if iterator.max_results is None
+                                      else self._query_pb.limit)
+        self._request: Dict[str, Any] = iterator._base_request()
+        self._iterator: Subiterator = iterator
+        self._pages: queue.Queue = queue.Queue()
+        self._room: threading.Semaphore = threading.Semaphore(
+            iterator.prefetch)
+        self._stopped: threading.Event = threading.Event()
+        self._thread: threading.Thread = threading.Thread(
+            target=self._run, name='gcdmc-prefetch', daemon=True)
+        self._thread.start()
+
+    def take(self) -> datastore_pb2.RunQueryResponse:
+        """Returns the next page, waiting for it if it has not arrived.
+
+        :raises: The error raised while requesting the page.
+        """
+        result: Any = self._pages.get()
+        self._room.release()
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def stop(self) -> None:
+        """Stops the thread once its current request completes.
+        """
+        self._stopped.set()
+
+    def _run(self) -> None:
+        query_pb: query_pb2.Query = self._query_pb
+        fetched: int = 0
+        while not self._stopped.is_set():
+            if not self._room.acquire(timeout=self.POLL_INTERVAL):
+                continue
+            try:
+                response: datastore_pb2.RunQueryResponse = (
+                    self._iterator._run_query(query_pb, self._request))
+            except Exception as e:
+                self._pages.put(e)
+                return
+            self._pages.put(response)
+            if (response.batch.more_results !=
+                    query_pb2.QueryResultBatch.MoreResultsType.NOT_FINISHED):
+                return
+            fetched += len(response.batch.entity_results)
+            query_pb = _copy_query(query_pb)
+            query_pb.start_cursor = response.batch.end_cursor
+            query_pb.offset = 0
+            if self._limit is not None:
+                query_pb.limit = self._limit - fetched
 
 
 class Subquery(Query):
@@ -129,7 +412,22 @@ class Subquery(Query):
               client: Optional[Client] = None,
               eventual: bool = False,
               retry: Optional[Retry] = None,
-              timeout: Optional[float] = None) -> Subiterator:
+              timeout: Optional[float] = None,
+              prefetch: int = 0,
+              cached: bool = False) -> Subiterator:
+        """Returns an iterator over the results of the query, which wraps the
+        entities as subentities.
+
+        :type prefetch: int, optional
+        :param prefetch: The number of pages to request ahead of the pages
+            that have been consumed, on a background thread. Defaults to `0`,
+            in which case each page is requested once the previous page has
+            been consumed.
+
+        :type cached: bool, optional
+        :param cached: Whether or not the results may be read from, and are
+            added to, the query cache of the client. Defaults to `false`.
+        """
         iterator: Iterator = super().fetch(limit=limit,
                                            offset=offset,
                                            start_cursor=start_cursor,
@@ -138,19 +436,202 @@ class Subquery(Query):
                                            eventual=eventual,
                                            retry=retry,
                                            timeout=timeout)
-        return Subiterator.derive(iterator, registry=self._registry)
+        return Subiterator.derive(iterator,
+                                  registry=self._registry,
+                                  prefetch=prefetch,
+                                  cached=cached)
+
+    def fetch_keys(self, **kwargs: Any) -> Subiterator:
+        """Returns an iterator over the keys of the results of the query. The
+        query is sent as a keys-only query, and no entities are built.
+
+        Accepts the same arguments as `fetch`.
+        """
+        query: Subquery = type(self).derive(self, registry=self._registry)
+        query.keys_only()
+        iterator: Subiterator = query.fetch(**kwargs)
+        iterator.item_to_value = key_from_result
+        iterator.wraps_results = False
+        return iterator
+
+    def fetch_records(self, **kwargs: Any) -> Subiterator:
+        """Returns an iterator over the results of a projection query as
+        records, which are named tuples holding the key followed by the
+        projected properties. No entities are built, so the properties
+        required by a registered entity type need not be projected.
+
+        The record type is generated once per kind and projection. If the
+        entity type registered for the kind has a schema, every projected
+        property must be defined by it.
+
+        Accepts the same arguments as `fetch`.
+
+        :raises: :class:`ValueError` if the query has no projection, or if it
+            projects a property that the schema does not define.
+        """
+        fields: List[str] = [f for f in self.projection if f != '__key__']
+        if not fields:
+            raise ValueError('Records can only be fetched for projection '
+                             'queries')
+        entity_type: Optional[Type[Subentity]] = None
+        if self._registry is not None and self.kind is not None and (
+                self._registry.has_subentity_type(self.kind)):
+            entity_type = self._registry.get_subentity_type(self.kind)
+        converter: RecordConverter = RecordConverter(
+            record_type(self.kind, fields, entity_type), fields)
+        iterator: Subiterator = self.fetch(**kwargs)
+        iterator.item_to_value = converter
+        iterator.wraps_results = False
+        return iterator
+
+    def shard(self,
+              shards: Optional[int] = None,
+              boundaries: Optional[Sequence[Key]] = None,
+              oversampling: int = DEFAULT_OVERSAMPLING) -> List[QueryShard]:
+        """Splits the query into disjoint key ranges, which together cover
+        every result of the query.
+
+        The split points are either given as `boundaries`, or sampled from
+        the `__scatter__` property of the kind, in which case fewer shards
+        than requested are returned if the kind has too few entities. Only
+        queries without inequality filters and without a sort order other
+        than ascending key can be sharded.
+
+        :type shards: int, optional
+        :param shards: The number of shards to split the query into, if
+            `boundaries` are not given.
+
+        :type boundaries: list, optional
+        :param boundaries: The keys at which the shards start, excluding the
+            first shard, which starts at the first key.
+
+        :type oversampling: int, optional
+        :param oversampling: The number of keys sampled per shard.
+
+        :rtype: list
+        :returns: The shards, in key order.
+        :raises: :class:`ValueError` if the query cannot be sharded.
+        """
+        check_shardable(self)
+        if boundaries is None:
+            if shards is None:
+                raise ValueError('Either shards or boundaries must be given')
+            boundaries = split_points(self, shards, oversampling)
+        return shards_between(sorted(boundaries, key=key_order))
+
+    def fetch_sharded(self,
+                      shards: Union[int, Sequence[QueryShard]] = 1,
+                      ordered: bool = False,
+                      max_workers: int = DEFAULT_MAX_WORKERS,
+                      eventual: bool = False,
+                      retry: Optional[Retry] = None,
+                      timeout: Optional[float] = None) -> ShardedIterator:
+        """Returns an iterator over the results of the query, which reads
+        the shards of the query concurrently. See `shard`.
+
+        :type shards: int or list
+        :param shards: The number of shards to split the query into, or the
+            shards to read, such as those of an interrupted scan. Shards that
+            are done are skipped, and the others resume from their cursors.
+
+        :type ordered: bool, optional
+        :param ordered: Whether or not the results are returned in key order.
+            Otherwise, they are returned as soon as any shard delivers them.
+
+        :type max_workers: int, optional
+        :param max_workers: The maximum number of shards read at the same
+            time.
+        """
+        if isinstance(shards, int):
+            shards = self.shard(shards)
+        else:
+            check_shardable(self)
+        return ShardedIterator(self,
+                               list(shards),
+                               ordered=ordered,
+                               max_workers=max_workers,
+                               eventual=eventual,
+                               retry=retry,
+                               timeout=timeout)
+
+    def export(self,
+               path: str,
+               compress: Optional[bool] = None,
+               checkpoint_pages: int = DEFAULT_CHECKPOINT_PAGES,
+               buffer_size: int = DEFAULT_BUFFER_SIZE,
+               limit: Optional[int] = None,
+               prefetch: int = 0,
+               eventual: bool = False,
+               retry: Optional[Retry] = None,
+               timeout: Optional[float] = None) -> ExportStats:
+        """Writes the results of the query to a file of newline delimited
+        JSON, one entity per line.
+
+        Each line holds the path of the key of the entity as `__key__`,
+        followed by its properties. Entities with a schema are written
+        through it, so only serialized properties are written, as returned
+        by their `serialize_value`. Times and dates are written in ISO 8601
+        format, keys as their paths and blobs in base 64.
+
+        The results are read a page at a time and written through a buffer
+        of bounded size, so the memory used does not depend on the number of
+        results. Every `checkpoint_pages` pages, the cursor of the query and
+        the size of the file are saved to a checkpoint file next to it. If an
+        export is interrupted, exporting the same query to the same path
+        resumes it from the checkpoint; rows written after the checkpoint
+        are discarded and written again. The checkpoint file is removed once
+        the export is complete.
+
+        :type path: str
+        :param path: The path of the file to write.
+
+        :type compress: bool, optional
+        :param compress: Whether or not the file is compressed with gzip.
+            Defaults to whether or not the path ends with `.gz`.
+
+        :type checkpoint_pages: int, optional
+        :param checkpoint_pages: The number of pages written between two
+            checkpoints.
+
+        :type buffer_size: int, optional
+        :param buffer_size: The number of bytes of encoded rows held before
+            they are written to the file.
+
+        :type limit: int, optional
+        :param limit: The maximum number of rows in the export, including
+            rows written before it was resumed.
+
+        :type prefetch: int, optional
+        :param prefetch: The number of pages to request ahead. See `fetch`.
+
+        :rtype: :class:`core.export.ExportStats`
+        :returns: The number of rows and pages that were exported.
+        :raises: :class:`ValueError` if the checkpoint file belongs to an
+            export of another query, or to a file that is compressed
+            differently.
+        """
+        return export_query(self,
+                            path,
+                            compress=compress,
+                            checkpoint_pages=checkpoint_pages,
+                            buffer_size=buffer_size,
+                            limit=limit,
+                            prefetch=prefetch,
+                            eventual=eventual,
+                            retry=retry,
+                            timeout=timeout)
 
     @classmethod
     def derive(cls,
                query: Query,
                registry: Optional[Registry] = None) -> Subquery:
-        return Subquery(query._client,
-                        kind=query._kind,
-                        project=query._project,
-                        namespace=query._namespace,
-                        ancestor=query._ancestor,
-                        filters=query._filters,
-                        projection=query._projection,
-                        order=query._order,
-                        distinct_on=query._distinct_on,
-                        registry=registry)
+        return cls(query._client,
+                   kind=query._kind,
+                   project=query._project,
+                   namespace=query._namespace,
+                   ancestor=query._ancestor,
+                   filters=query._filters,
+                   projection=query._projection,
+                   order=query._order,
+                   distinct_on=query._distinct_on,
+                   registry=registry)
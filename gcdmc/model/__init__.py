@@ -1,17 +1,47 @@
 from __future__ import annotations
+from typing import Any, Dict, List, TYPE_CHECKING
+if TYPE_CHECKING:
+    from gcdmc.model.bulk import BulkResult, RowError
+    from gcdmc.model.errors import (
+        SchemaError,
+        UnassignedPropertyError,
+        UndefinedPropertyError,
+        UnexposedPropertyError,
+    )
+    from gcdmc.model.importer import Importer, ImportStats
+    from gcdmc.model.interface import IEntity
+    from gcdmc.model.schema import Schema
+    from gcdmc.model.typed_entity import TypedEntity
 
-from gcdmc.model.errors import (
-    UnassignedPropertyError,
-    UndefinedPropertyError,
-    UnexposedPropertyError,
-)
-from gcdmc.model.interface import IEntity
-from gcdmc.model.typed_entity import TypedEntity
+import importlib
 
-__all__ = [
-    'UnassignedPropertyError',
-    'UndefinedPropertyError',
-    'UnexposedPropertyError',
-    'IEntity',
-    'TypedEntity',
-]
+# The names exported by this package, and the modules that define them. The
+# modules are imported when one of their names is first accessed.
+_EXPORTS: Dict[str, str] = {
+    'BulkResult': 'gcdmc.model.bulk',
+    'RowError': 'gcdmc.model.bulk',
+    'SchemaError': 'gcdmc.model.errors',
+    'UnassignedPropertyError': 'gcdmc.model.errors',
+    'UndefinedPropertyError': 'gcdmc.model.errors',
+    'UnexposedPropertyError': 'gcdmc.model.errors',
+    'Importer': 'gcdmc.model.importer',
+    'ImportStats': 'gcdmc.model.importer',
+    'IEntity': 'gcdmc.model.interface',
+    'Schema': 'gcdmc.model.schema',
+    'TypedEntity': 'gcdmc.model.typed_entity',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module: str = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value: Any = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted({*globals(), *_EXPORTS})
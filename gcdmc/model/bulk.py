@@ -0,0 +1,121 @@
+from __future__ import annotations
+from typing import (
+    Any,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar('T')
+
+#: Marks a value that was not supplied for a row.
+MISSING: Any = object()
+
+
+class RowError:
+    """Describes why a single row could not be used in a bulk operation.
+
+    :type row: int
+    :param row: The index of the row in the input.
+
+    :type name: str
+    :param name: The name of the property (or key argument) that failed.
+
+    :type error: Exception
+    :param error: The error raised while validating the value.
+    """
+    def __init__(self, row: int, name: str, error: Exception) -> None:
+        self.row: int = row
+        self.name: str = name
+        self.error: Exception = error
+
+    def __repr__(self) -> str:
+        return (f'RowError(row={self.row!r}, name={self.name!r}, '
+                f'error={self.error!r})')
+
+    def __str__(self) -> str:
+        return f'row {self.row}: error setting {self.name!r}: {self.error}'
+
+
+class BulkResult(Generic[T]):
+    """The result of a bulk operation.
+
+    :type items: list
+    :param items: One item per input row, in input order. Rows that failed are
+        `None`.
+
+    :type errors: list
+    :param errors: The errors for the rows that failed, ordered by row. A row
+        can have more than one error.
+    """
+    def __init__(self, items: List[Optional[T]],
+                 errors: List[RowError]) -> None:
+        self.items: List[Optional[T]] = items
+        self.errors: List[RowError] = errors
+
+    def __repr__(self) -> str:
+        return (f'BulkResult(items={len(self.items)}, '
+                f'errors={len(self.errors)})')
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @property
+    def ok(self) -> bool:
+        """Returns whether or not every row succeeded.
+        """
+        return len(self.errors) == 0
+
+    @property
+    def valid(self) -> List[T]:
+        """Returns the items of the rows that succeeded, in input order.
+        """
+        failed: Set[int] = self.failed_rows
+        return [item for row, item in enumerate(self.items)
+                if row not in failed]
+
+    @property
+    def failed_rows(self) -> Set[int]:
+        """Returns the indexes of the rows that failed.
+        """
+        return {e.row for e in self.errors}
+
+
+def to_columns(rows: Optional[Iterable[Mapping[str, Any]]],
+               columns: Optional[Mapping[str, Sequence[Any]]],
+               ) -> Tuple[Dict[str, List[Any]], int]:
+    """Normalizes row or columnar input into a dictionary of equally long
+    lists, and returns it along with the number of rows.
+
+    Values that a row does not supply are set to `MISSING`.
+    """
+    if (rows is None) == (columns is None):
+        raise TypeError('exactly one of rows or columns must be provided')
+
+    if columns is not None:
+        out: Dict[str, List[Any]] = {k: list(v) for k, v in columns.items()}
+        lengths: Set[int] = {len(v) for v in out.values()}
+        if len(lengths) > 1:
+            raise ValueError('all columns must have the same length, got '
+                             f'lengths {sorted(lengths)}')
+        return out, lengths.pop() if lengths else 0
+
+    out = {}
+    count: int = 0
+    for count, row in enumerate(rows, start=1):
+        for name, value in row.items():
+            column: Optional[List[Any]] = out.get(name)
+            if column is None:
+                column = out[name] = [MISSING] * (count - 1)
+            column.append(value)
+        for column in out.values():
+            if len(column) < count:
+                column.append(MISSING)
+    return out, count
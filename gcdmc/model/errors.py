@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Any, TYPE_CHECKING
+from typing import Any, Type, Union, TYPE_CHECKING
 if TYPE_CHECKING:
     from gcdmc.model.typed_entity import TypedEntity
 
@@ -8,9 +8,10 @@ class UndefinedPropertyError(Exception):
     """Raised when a user attempts to assign a value to a property that does
     not exist.
     """
-    def __init__(self, name: Any, entity: TypedEntity) -> None:
-        super().__init__(f'{entity.__class__.__name__} does not have property '
-                         f'{name!r}')
+    def __init__(self, name: Any,
+                 entity: Union[TypedEntity, Type[TypedEntity]]) -> None:
+        owner: type = entity if isinstance(entity, type) else type(entity)
+        super().__init__(f'{owner.__name__} does not have property {name!r}')
 
 
 class UnassignedPropertyError(Exception):
@@ -34,3 +35,10 @@ class InvalidKeyError(Exception):
     ancestor hierarchy.
     """
     pass
+
+
+class SchemaError(Exception):
+    """Raised when a typed entity class defines its properties in a way that
+    cannot be compiled into a schema.
+    """
+    pass
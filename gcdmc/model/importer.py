@@ -0,0 +1,598 @@
+from __future__ import annotations
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    IO,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TYPE_CHECKING,
+)
+if TYPE_CHECKING:
+    from gcdmc.model.typed_entity import TypedEntity
+
+import base64
+import collections
+import csv
+import datetime
+import gzip
+import json
+import multiprocessing
+import os
+import time
+
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from google.api_core.retry import Retry
+from google.cloud.datastore import Entity, Key
+from google.cloud.datastore.helpers import GeoPoint
+
+from gcdmc.core.aio import AsyncSubclient
+from gcdmc.core.chunks import DEFAULT_MAX_WORKERS, MAX_MUTATIONS
+from gcdmc.core.reduction import ReducedBatch
+from gcdmc.core.subclient import Subclient
+from gcdmc.model.bulk import BulkResult, RowError
+from gcdmc.model.properties import (
+    BlobProperty,
+    BooleanArrayProperty,
+    BooleanListProperty,
+    BooleanProperty,
+    DateListProperty,
+    DateProperty,
+    DatetimeListProperty,
+    DatetimeProperty,
+    EntityListProperty,
+    EntityProperty,
+    FloatArrayProperty,
+    FloatListProperty,
+    FloatProperty,
+    GeoPointProperty,
+    IntegerArrayProperty,
+    IntegerListProperty,
+    IntegerProperty,
+    KeyListProperty,
+    KeyProperty,
+    Property,
+)
+
+#: The number of rows validated together by a worker, and committed together
+#  in a single batch.
+DEFAULT_CHUNK_SIZE: int = MAX_MUTATIONS
+
+#: A row of the input, as its line or row number and its contents. Lines of
+#  NDJSON files are decoded by the workers, so their contents are the text
+#  of the line. Rows of CSV files are mappings of column names to cells.
+Row = Tuple[int, Any]
+
+#: A function that converts a value read from a file into a property value.
+#  The project and namespace of the import are passed along to build keys.
+Decoder = Callable[[Any, str, Optional[str]], Any]
+
+#: The decoders of the properties of each entity type, built in each worker
+#  process when it first validates rows of the type.
+_decoders: Dict[type, Dict[str, Decoder]] = {}
+
+
+class ImportStats:
+    """Describes an import of rows into a typed entity kind.
+
+    :type rows: int
+    :param rows: The number of rows read from the file.
+
+    :type imported: int
+    :param imported: The number of rows that were committed.
+
+    :type rejected: int
+    :param rejected: The number of rows that failed to parse, validate or
+        commit.
+
+    :type seconds: float
+    :param seconds: The time taken by the import.
+    """
+    def __init__(self,
+                 rows: int = 0,
+                 imported: int = 0,
+                 rejected: int = 0,
+                 seconds: float = 0.0) -> None:
+        self.rows: int = rows
+        self.imported: int = imported
+        self.rejected: int = rejected
+        self.seconds: float = seconds
+
+    def __repr__(self) -> str:
+        return (f'ImportStats(rows={self.rows}, imported={self.imported}, '
+                f'rejected={self.rejected}, '
+                f'rows_per_second={self.rows_per_second:.0f})')
+
+    @property
+    def rows_per_second(self) -> float:
+        """Returns the number of rows read per second.
+        """
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def _parse_bool(v: Any) -> Any:
+    if isinstance(v, str):
+        lowered: str = v.strip().lower()
+        if lowered in ('true', '1'):
+            return True
+        if lowered in ('false', '0'):
+            return False
+        raise ValueError(f'not a boolean: {v!r}')
+    return v
+
+
+def _parse_int(v: Any) -> Any:
+    return int(v) if isinstance(v, str) else v
+
+
+def _parse_float(v: Any) -> Any:
+    if isinstance(v, str) or (isinstance(v, int)
+                              and not isinstance(v, bool)):
+        return float(v)
+    return v
+
+
+def _parse_datetime(v: Any) -> Any:
+    if isinstance(v, str):
+        parsed: datetime.datetime = datetime.datetime.fromisoformat(v)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+        return parsed
+    return v
+
+
+def _parse_date(v: Any) -> Any:
+    if isinstance(v, str):
+        date: datetime.date = datetime.date.fromisoformat(v[:10])
+        return datetime.datetime(date.year,
+                                 date.month,
+                                 date.day,
+                                 tzinfo=datetime.timezone.utc)
+    return v
+
+
+def _parse_key(v: Any, project: str, namespace: Optional[str]) -> Any:
+    if isinstance(v, str):
+        v = json.loads(v)
+    if isinstance(v, list):
+        return Key(*v, project=project, namespace=namespace)
+    return v
+
+
+def _parse_blob(v: Any) -> Any:
+    if isinstance(v, str):
+        return base64.b64decode(v, validate=True)
+    return v
+
+
+def _parse_geo_point(v: Any) -> Any:
+    if isinstance(v, str):
+        v = json.loads(v)
+    if isinstance(v, dict):
+        return GeoPoint(v['latitude'], v['longitude'])
+    return v
+
+
+def _embedded_value(v: Any) -> Any:
+    """Decodes a value of an embedded entity. Embedded entities have no
+    schema, so values are decoded by their shape: objects holding only a
+    latitude and a longitude are geo points, and other objects are entities.
+    Other values, e.g. blobs, keys and times, keep the form they were
+    written in.
+    """
+    if isinstance(v, dict):
+        if v.keys() == {'latitude', 'longitude'}:
+            return GeoPoint(v['latitude'], v['longitude'])
+        entity: Entity = Entity()
+        entity.update((k, _embedded_value(e)) for k, e in v.items())
+        return entity
+    if isinstance(v, list):
+        return [_embedded_value(e) for e in v]
+    return v
+
+
+def _parse_entity(v: Any) -> Any:
+    if isinstance(v, str):
+        v = json.loads(v)
+    if isinstance(v, dict):
+        return _embedded_value(v)
+    return v
+
+
+def _scalar(parse: Callable[[Any], Any]) -> Decoder:
+    return lambda v, project, namespace: parse(v)
+
+
+def _listed(decode: Decoder) -> Decoder:
+    """Returns a decoder for lists of the values that a decoder accepts.
+    Lists read from CSV cells are written as JSON arrays.
+    """
+    def decoder(v: Any, project: str, namespace: Optional[str]) -> Any:
+        if isinstance(v, str):
+            v = json.loads(v)
+        if isinstance(v, list):
+            return [decode(e, project, namespace) for e in v]
+        return v
+
+    return decoder
+
+
+#: The decoders of the property types whose values are not written as they
+#  are stored. Values of other properties are used as they are read. See
+#  `core.export` for how values are written.
+_DECODERS: Tuple[Tuple[Type[Property], Decoder], ...] = (
+    (BooleanProperty, _scalar(_parse_bool)),
+    (IntegerProperty, _scalar(_parse_int)),
+    (FloatProperty, _scalar(_parse_float)),
+    (DatetimeProperty, _scalar(_parse_datetime)),
+    (DateProperty, _scalar(_parse_date)),
+    (KeyProperty, _parse_key),
+    (BlobProperty, _scalar(_parse_blob)),
+    (GeoPointProperty, _scalar(_parse_geo_point)),
+    (EntityProperty, _scalar(_parse_entity)),
+    (BooleanListProperty, _listed(_scalar(_parse_bool))),
+    (BooleanArrayProperty, _listed(_scalar(_parse_bool))),
+    (IntegerListProperty, _listed(_scalar(_parse_int))),
+    (IntegerArrayProperty, _listed(_scalar(_parse_int))),
+    (FloatListProperty, _listed(_scalar(_parse_float))),
+    (FloatArrayProperty, _listed(_scalar(_parse_float))),
+    (DatetimeListProperty, _listed(_scalar(_parse_datetime))),
+    (DateListProperty, _listed(_scalar(_parse_date))),
+    (KeyListProperty, _listed(_parse_key)),
+    (EntityListProperty, _listed(_scalar(_parse_entity))),
+)
+
+
+def _property_decoders(entity_type: Type[TypedEntity]) -> Dict[str, Decoder]:
+    """Returns the decoders of the properties of an entity type, keyed by the
+    name of the property.
+    """
+    decoders: Optional[Dict[str, Decoder]] = _decoders.get(entity_type)
+    if decoders is None:
+        decoders = {}
+        for name, prop in entity_type.__schema__.properties.items():
+            for property_type, decoder in _DECODERS:
+                if isinstance(prop, property_type):
+                    decoders[name] = decoder
+                    break
+        _decoders[entity_type] = decoders
+    return decoders
+
+
+def _decode_row(entity_type: Type[TypedEntity], row: Any, project: str,
+                namespace: Optional[str]) -> Tuple[Key, Dict[str, Any]]:
+    """Decodes a row into its key and its property values. The key is read
+    from the `__key__` field as a path, and is partial if the field is
+    missing.
+    """
+    values: Dict[str, Any]
+    if isinstance(row, str):
+        values = json.loads(row)
+        if not isinstance(values, dict):
+            raise ValueError('line is not a JSON object')
+    else:
+        # Empty CSV cells are treated as missing, so defaults apply.
+        values = {k: v for k, v in row.items() if v != ''}
+
+    kind: str = entity_type.kind()
+    key: Key
+    path: Any = values.pop('__key__', None)
+    if path is None:
+        key = Key(kind, project=project, namespace=namespace)
+    else:
+        key = _parse_key(path, project, namespace)
+        if not isinstance(key, Key) or key.kind != kind:
+            raise ValueError(f'__key__ is not a key of kind {kind!r}: '
+                             f'{path!r}')
+
+    decoders: Dict[str, Decoder] = _property_decoders(entity_type)
+    for name, value in values.items():
+        decoder: Optional[Decoder] = decoders.get(name)
+        if decoder is not None and value is not None:
+            values[name] = decoder(value, project, namespace)
+    return key, values
+
+
+def validate_rows(
+    entity_type: Type[TypedEntity], rows: List[Row], project: str,
+    namespace: Optional[str]
+) -> Tuple[List[Tuple[int, Key, Dict[str, Any]]], List[Tuple[int, List[str]]]]:
+    """Decodes and validates a chunk of rows. This runs in the worker
+    processes of an import.
+
+    :rtype: tuple
+    :returns: The line number, key and validated values of each valid row,
+        and the line number and error messages of each rejected row.
+    """
+    decoded: List[Tuple[int, Key, Dict[str, Any]]] = []
+    rejected: List[Tuple[int, List[str]]] = []
+    for number, row in rows:
+        try:
+            key: Key
+            values: Dict[str, Any]
+            key, values = _decode_row(entity_type, row, project, namespace)
+        except (TypeError, ValueError) as e:
+            rejected.append((number, [f'{type(e).__name__}: {e}']))
+            continue
+        decoded.append((number, key, values))
+
+    result: BulkResult[Dict[str, Any]] = entity_type.validate_many(
+        [values for _, _, values in decoded])
+    errors: Dict[int, List[str]] = collections.defaultdict(list)
+    error: RowError
+    for error in result.errors:
+        errors[error.row].append(f'{error.name}: {error.error}')
+    valid: List[Tuple[int, Key, Dict[str, Any]]] = []
+    for i, (number, key, _) in enumerate(decoded):
+        if i in errors:
+            rejected.append((number, errors[i]))
+        else:
+            valid.append((number, key, result.items[i]))
+    rejected.sort()
+    return valid, rejected
+
+
+def read_rows(path: str, file_format: Optional[str] = None) -> Iterator[Row]:
+    """Reads the rows of an NDJSON or CSV file, optionally compressed with
+    gzip, one at a time. Blank lines of NDJSON files are skipped.
+
+    :type path: str
+    :param path: The path of the file.
+
+    :type file_format: str, optional
+    :param file_format: Either `ndjson` or `csv`. Defaults to `csv` if the
+        path ends with `.csv` or `.csv.gz`, and to `ndjson` otherwise.
+
+    :rtype: iterator
+    :returns: The line number of each row, starting at 1, along with the
+        text of the line for NDJSON files, or a mapping of column names to
+        cells for CSV files, whose line number is that of the first data row.
+    """
+    compressed: bool = path.endswith('.gz')
+    if file_format is None:
+        stem: str = path[:-3] if compressed else path
+        file_format = 'csv' if stem.endswith('.csv') else 'ndjson'
+    if file_format not in ('ndjson', 'csv'):
+        raise ValueError(f'unsupported file format: {file_format!r}')
+
+    f: IO[str]
+    if compressed:
+        f = gzip.open(path, 'rt', encoding='utf-8', newline='')
+    else:
+        f = open(path, 'r', encoding='utf-8', newline='')
+    with f:
+        if file_format == 'csv':
+            yield from enumerate(csv.DictReader(f), start=1)
+            return
+        for number, line in enumerate(f, start=1):
+            if line.strip():
+                yield number, line
+
+
+class Importer:
+    """Imports the rows of an NDJSON or CSV file into a typed entity kind.
+
+    The import runs as three stages. Rows are read from the file on the
+    calling thread, and handed in chunks to a pool of worker processes,
+    which decode them and validate them against the schema of the entity
+    type. The valid rows of each chunk are built into entities and committed
+    in a `ReducedBatch`, with at most `max_in_flight` commits running at the
+    same time on a pool of threads. Each stage holds a bounded number of
+    chunks, so memory does not grow with the size of the file.
+
+    Each row is an object mapping property names to values, in the format
+    written by `Subquery.export`: the key is read from the `__key__` field as
+    a path, and the entity is given a new ID if it is missing. Times and
+    dates are read from ISO 8601 strings, and keys from paths. CSV cells are
+    converted to the type of their property, and lists are read from cells
+    holding JSON arrays. Empty cells are treated as missing.
+
+    Rows that cannot be decoded, validated or committed do not stop the
+    import. They are counted as rejected, and written to `rejected_path` if
+    it is given, one JSON object per line holding the line number, the
+    errors and the input of the row.
+
+    Workers are started with the `spawn` method unless another
+    multiprocessing context is given, since the connections of a Datastore
+    client cannot be shared with forked processes. The entity type must
+    then be defined at the top level of a module.
+
+    :type entity_type: type
+    :param entity_type: The typed entity class to import into. It must have
+        a kind.
+
+    :type client: :class:`core.subclient.Subclient`
+    :param client: The subclient used to commit the entities. Asynchronous
+        subclients are not supported.
+
+    :type processes: int, optional
+    :param processes: The number of worker processes. Defaults to the number
+        of CPUs. If it is `1` or less, rows are validated on the calling
+        thread.
+
+    :type max_in_flight: int, optional
+    :param max_in_flight: The maximum number of commits running at the same
+        time.
+
+    :type chunk_size: int, optional
+    :param chunk_size: The number of rows validated and committed together.
+        At most the number of mutations a single commit accepts.
+
+    :type namespace: str, optional
+    :param namespace: The namespace of the imported keys. Defaults to the
+        namespace of the client.
+
+    :type autoupdate: bool, optional
+    :param autoupdate: Whether or not autoupdated properties are set when the
+        entities are committed. Defaults to `False`, so that values read from
+        the file, such as the times of an export, are kept.
+
+    :raises: :class:`TypeError` if the client is not a synchronous
+        subclient.
+    """
+    def __init__(self,
+                 entity_type: Type[TypedEntity],
+                 client: Subclient,
+                 processes: Optional[int] = None,
+                 max_in_flight: int = DEFAULT_MAX_WORKERS,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 namespace: Optional[str] = None,
+                 mp_context: Optional[Any] = None,
+                 retry: Optional[Retry] = None,
+                 timeout: Optional[float] = None,
+                 autoupdate: bool = False) -> None:
+        if (not isinstance(client, Subclient)
+                or isinstance(client, AsyncSubclient)):
+            raise TypeError('imports are committed through a Subclient, got '
+                            f'{type(client).__name__}')
+        if entity_type.kind() is None:
+            raise ValueError(f'{entity_type.__name__} has no kind to import '
+                             'into')
+        if not 0 < chunk_size <= MAX_MUTATIONS:
+            raise ValueError(f'chunk_size must be between 1 and '
+                             f'{MAX_MUTATIONS}')
+        self.entity_type: Type[TypedEntity] = entity_type
+        self.client: Subclient = client
+        self.processes: int = (os.cpu_count() or 1
+                               if processes is None else processes)
+        self.max_in_flight: int = max(max_in_flight, 1)
+        self.chunk_size: int = chunk_size
+        self.namespace: Optional[str] = (client.namespace if namespace is None
+                                         else namespace)
+        self._mp_context: Any = mp_context or multiprocessing.get_context(
+            'spawn')
+        self._retry: Optional[Retry] = retry
+        self._timeout: Optional[float] = timeout
+        self.autoupdate: bool = autoupdate
+
+    def run(self,
+            path: str,
+            file_format: Optional[str] = None,
+            rejected_path: Optional[str] = None) -> ImportStats:
+        """Imports the rows of a file. See `read_rows` for the supported
+        formats.
+
+        :type path: str
+        :param path: The path of the file to import.
+
+        :type rejected_path: str, optional
+        :param rejected_path: The path of the file the rejected rows are
+            written to. It is written even if no row is rejected.
+
+        :rtype: :class:`model.importer.ImportStats`
+        :returns: The number of rows that were read, imported and rejected,
+            and the time taken.
+        """
+        stats: ImportStats = ImportStats()
+        start: float = time.perf_counter()
+        rejected: Optional[IO[str]] = None
+        if rejected_path is not None:
+            rejected = open(rejected_path, 'w', encoding='utf-8')
+        # The worker processes are started before the commit threads.
+        validators: Optional[Executor] = None
+        if self.processes > 1:
+            validators = ProcessPoolExecutor(max_workers=self.processes,
+                                             mp_context=self._mp_context)
+        committers: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=self.max_in_flight, thread_name_prefix='gcdmc-import')
+        validating: Deque[Tuple[Future, Dict[int, Any]]] = collections.deque()
+        committing: Deque[Tuple[Future, List[Tuple[int, Any]]]] = (
+            collections.deque())
+
+        def reject(number: int, errors: List[str], row: Any) -> None:
+            stats.rejected += 1
+            if rejected is not None:
+                if isinstance(row, str):
+                    row = row.rstrip('\r\n')
+                record: Dict[str, Any] = {
+                    'row': number,
+                    'errors': errors,
+                    'input': row,
+                }
+                rejected.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+        def settle_commit() -> None:
+            future: Future
+            rows: List[Tuple[int, Any]]
+            future, rows = committing.popleft()
+            try:
+                future.result()
+            except Exception as e:
+                for number, row in rows:
+                    reject(number, [f'{type(e).__name__}: {e}'], row)
+            else:
+                stats.imported += len(rows)
+
+        def settle_validation() -> None:
+            future: Future
+            inputs: Dict[int, Any]
+            future, inputs = validating.popleft()
+            valid: List[Tuple[int, Key, Dict[str, Any]]]
+            invalid: List[Tuple[int, List[str]]]
+            valid, invalid = future.result()
+            for number, errors in invalid:
+                reject(number, errors, inputs[number])
+            if not valid:
+                return
+            while len(committing) >= self.max_in_flight:
+                settle_commit()
+            entities: List[TypedEntity] = [
+                self._build(key, values) for _, key, values in valid
+            ]
+            committing.append((committers.submit(self._commit, entities),
+                               [(number, inputs[number])
+                                for number, _, _ in valid]))
+
+        def validate(chunk: List[Row]) -> None:
+            args: Tuple = (self.entity_type, chunk, self.client.project,
+                           self.namespace)
+            future: Future
+            if validators is None:
+                future = Future()
+                future.set_result(validate_rows(*args))
+            else:
+                future = validators.submit(validate_rows, *args)
+            validating.append((future, dict(chunk)))
+            while len(validating) > 2 * max(self.processes, 1):
+                settle_validation()
+
+        try:
+            chunk: List[Row] = []
+            for row in read_rows(path, file_format):
+                stats.rows += 1
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    validate(chunk)
+                    chunk = []
+            if chunk:
+                validate(chunk)
+            while validating:
+                settle_validation()
+            while committing:
+                settle_commit()
+        finally:
+            committers.shutdown(wait=True, cancel_futures=True)
+            if validators is not None:
+                validators.shutdown(wait=True, cancel_futures=True)
+            if rejected is not None:
+                rejected.close()
+            stats.seconds = time.perf_counter() - start
+        return stats
+
+    def _build(self, key: Key, values: Dict[str, Any]) -> TypedEntity:
+        """Builds an entity from the validated values of a row. See
+        `TypedEntity.create_many`.
+        """
+        return self.entity_type._from_validated(key, values)
+
+    def _commit(self, entities: List[TypedEntity]) -> None:
+        batch: ReducedBatch = self.client.batch(autoupdate=self.autoupdate)
+        batch.begin()
+        for entity in entities:
+            batch.put(entity)
+        batch.commit(retry=self._retry, timeout=self._timeout)
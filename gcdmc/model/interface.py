@@ -3,7 +3,9 @@ from typing import (
     Any,
     Dict,
     Generic,
+    Iterable,
     List,
+    Mapping,
     Optional,
     Sequence,
     Tuple,
@@ -13,7 +15,8 @@ from typing import (
 
 from google.cloud.datastore import Client, Entity, Key
 
-from gcdmc.core.subentity import Subentity, undelegated
+from gcdmc.core.subentity import ReadMode, Subentity, undelegated
+from gcdmc.model.bulk import BulkResult, RowError
 from gcdmc.model.errors import InvalidKeyError, UnexposedPropertyError
 from gcdmc.model.typed_entity import TypedEntity
 
@@ -52,16 +55,8 @@ class IEntity(Subentity, Generic[E]):
             raise InvalidKeyError(err_msg)
         self._entity: E = entity
 
-    def __setattr__(self, name: str, value: Any) -> None:
-        if name == '_entity':
-            return super().__setattr__(name, value)
-        elif name in self._entity.properties:
-            self[name] = value
-        else:
-            return super().__setattr__(name, value)
-
     def __setitem__(self, key: Any, value: Any) -> None:
-        if (key in self._entity.properties
+        if (key in type(self._entity).__schema__.properties
                 and key not in self.__exposed_properties__):
             raise UnexposedPropertyError(key, self)
         try:
@@ -127,6 +122,36 @@ class IEntity(Subentity, Generic[E]):
             **kwargs)
         return cls(entity)
 
+    @classmethod
+    def create_many(
+        cls,
+        client: Client,
+        rows: Optional[Iterable[Mapping[str, Any]]] = None,
+        columns: Optional[Mapping[str, Sequence[Any]]] = None,
+    ) -> BulkResult[IEntity]:
+        """Creates many typed entities with the type specified by the
+        interfaced entity class, and returns interfaces to them.
+
+        See `TypedEntity.create_many`. Rows whose keys are not valid for this
+        interface are reported as errors with an `InvalidKeyError`.
+        """
+        result: BulkResult[E] = cls.__type__.create_many(client,
+                                                         rows=rows,
+                                                         columns=columns)
+        items: List[Optional[IEntity]] = []
+        errors: List[RowError] = list(result.errors)
+        for row, entity in enumerate(result.items):
+            if entity is None:
+                items.append(None)
+                continue
+            try:
+                items.append(cls(entity))
+            except InvalidKeyError as e:
+                items.append(None)
+                errors.append(RowError(row, 'parent', e))
+        errors.sort(key=lambda e: e.row)
+        return BulkResult(items, errors)
+
     @classmethod
     def kind(cls) -> Optional[str]:
         """Returns the key kind of the underlying typed entity.
@@ -148,9 +173,40 @@ class IEntity(Subentity, Generic[E]):
         return True, None
 
     @classmethod
-    def wrap(cls, entity: Entity) -> IEntity:
+    def _delegate_type(cls) -> type:
+        """Returns the typed entity class, since that is the type of the
+        underlying entity.
+        """
+        return TypedEntity if cls.__type__ is None else cls.__type__
+
+    @classmethod
+    def _property_names(cls) -> Iterable[str]:
+        """Returns the names of the properties on the underlying typed entity.
+        """
+        if cls.__type__ is None:
+            return ()
+        return cls.__type__.__schema__.fields
+
+    @classmethod
+    def wrap(cls,
+             entity: Entity,
+             read_mode: Optional[ReadMode] = None) -> IEntity:
         """Wraps an entity with the typed entity specified by the interfaced
         entity class, and then returns an interface to it.
         """
-        typed_entity: TypedEntity = cls.__type__.wrap(entity)
+        typed_entity: TypedEntity = cls.__type__.wrap(entity,
+                                                      read_mode=read_mode)
         return cls(typed_entity)
+
+    @classmethod
+    def wrap_many(cls,
+                  entities: Iterable[Entity],
+                  read_mode: Optional[ReadMode] = None) -> List[IEntity]:
+        """Wraps entities with the typed entity specified by the interfaced
+        entity class, and then returns interfaces to them in input order.
+        """
+        return [
+            cls(typed_entity)
+            for typed_entity in cls.__type__.wrap_many(entities,
+                                                       read_mode=read_mode)
+        ]
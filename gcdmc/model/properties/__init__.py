@@ -1,18 +1,34 @@
-from gcdmc.model.properties.boolean import BooleanProperty, BooleanListProperty
+from gcdmc.model.properties.blob import BlobProperty
+from gcdmc.model.properties.boolean import (
+    BooleanArrayProperty,
+    BooleanListProperty,
+    BooleanProperty,
+)
 from gcdmc.model.properties.date import DateProperty, DateListProperty
 from gcdmc.model.properties.datetime import DatetimeProperty, DatetimeListProperty
 from gcdmc.model.properties.email import EmailProperty, EmailListProperty
 from gcdmc.model.properties.entity import EntityProperty, EntityListProperty
-from gcdmc.model.properties.float import FloatProperty, FloatListProperty
-from gcdmc.model.properties.integer import IntegerProperty, IntegerListProperty
+from gcdmc.model.properties.float import (
+    FloatArrayProperty,
+    FloatListProperty,
+    FloatProperty,
+)
+from gcdmc.model.properties.geo_point import GeoPointProperty
+from gcdmc.model.properties.integer import (
+    IntegerArrayProperty,
+    IntegerListProperty,
+    IntegerProperty,
+)
 from gcdmc.model.properties.key import KeyProperty, KeyListProperty
 from gcdmc.model.properties.phone import PhoneProperty, PhoneListProperty
 from gcdmc.model.properties.property import Property
 from gcdmc.model.properties.string import StringProperty, StringListProperty
 
 __all__ = [
+    'BlobProperty',
     'BooleanProperty',
     'BooleanListProperty',
+    'BooleanArrayProperty',
     'DateProperty',
     'DateListProperty',
     'DatetimeProperty',
@@ -23,8 +39,11 @@ __all__ = [
     'EntityListProperty',
     'FloatProperty',
     'FloatListProperty',
+    'FloatArrayProperty',
+    'GeoPointProperty',
     'IntegerProperty',
     'IntegerListProperty',
+    'IntegerArrayProperty',
     'KeyProperty',
     'KeyListProperty',
     'PhoneProperty',
@@ -0,0 +1,12 @@
+from __future__ import annotations
+from typing import List
+
+from gcdmc.model.properties.property import Check, Property, type_check
+
+
+class BlobProperty(Property[bytes, bytes]):
+    def _checks(self) -> List[Check]:
+        return [
+            type_check(bytes, 'blob', 'bytes'),
+            *super()._checks(),
+        ]
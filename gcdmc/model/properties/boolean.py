@@ -1,25 +1,38 @@
 from __future__ import annotations
-from typing import Any
+from typing import List
 
-from gcdmc.model.properties.property import Property
-from gcdmc.model.types import BooleanList
+from gcdmc.model.properties.property import (
+    Check,
+    Property,
+    array_check,
+    list_check,
+    type_check,
+)
+from gcdmc.model.types import BooleanArray, BooleanList
 
 
 class BooleanProperty(Property[bool, bool]):
-    def validate(self, v: Any) -> bool:
-        if v is not None and not isinstance(v, bool):
-            raise TypeError(
-                f'invalid type for boolean property: {type(v).__name__}, '
-                'expected a boolean')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            type_check(bool, 'boolean', 'a boolean'),
+            *super()._checks(),
+        ]
 
 
 class BooleanListProperty(Property[BooleanList, BooleanList]):
-    def validate(self, v: Any) -> BooleanList:
-        if v is not None:
-            if type(v) is list:
-                return self.validate(BooleanList(v))
-            if not isinstance(v, BooleanList):
-                raise TypeError('invalid type for boolean list property: '
-                                f'{type(v).__name__}, expected a boolean list')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            list_check(BooleanList, 'boolean list', 'a boolean list'),
+            *super()._checks(),
+        ]
+
+
+class BooleanArrayProperty(Property[BooleanArray, BooleanArray]):
+    """A compact alternative to `BooleanListProperty`, which stores its
+    values in a `BooleanArray`.
+    """
+    def _checks(self) -> List[Check]:
+        return [
+            array_check(BooleanArray, 'boolean array', 'a boolean array'),
+            *super()._checks(),
+        ]
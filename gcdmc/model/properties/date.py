@@ -1,33 +1,35 @@
 from __future__ import annotations
-from typing import Any, List
+from typing import List
 
 import datetime
 
-from gcdmc.model.properties.property import Property
+from gcdmc.model.properties.property import (
+    Check,
+    Property,
+    list_check,
+    value_check,
+)
 from gcdmc.model.types import DateList
 from gcdmc.model.types.utils import is_valid_date
 
 
 class DateProperty(Property[datetime.datetime, datetime.date]):
-    def validate(self, v: Any) -> datetime.datetime:
-        super().validate(v)
-        if v is not None and not is_valid_date(v):
-            raise ValueError(f'value is not a valid date: {v!r}')
-        return v
+    def _checks(self) -> List[Check]:
+        return [
+            *super()._checks(),
+            value_check(is_valid_date, 'value is not a valid date'),
+        ]
 
     def serialize_value(self, v: datetime.datetime) -> datetime.date:
         return datetime.date(v.year, v.month, v.day)
 
 
 class DateListProperty(Property[DateList, List[datetime.date]]):
-    def validate(self, v: Any) -> DateList:
-        if v is not None:
-            if type(v) is list:
-                return self.validate(DateList(v))
-            if not isinstance(v, DateList):
-                raise TypeError('invalid type for date list property: '
-                                f'{type(v).__name__}, expected a date list')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            list_check(DateList, 'date list', 'a date list'),
+            *super()._checks(),
+        ]
 
     def serialize_value(self, v: DateList) -> List[datetime.date]:
         return [datetime.date(d.year, d.month, d.day) for d in v]
@@ -1,28 +1,28 @@
 from __future__ import annotations
-from typing import Any
+from typing import List
 
 import datetime
 
-from gcdmc.model.properties.property import Property
+from gcdmc.model.properties.property import (
+    Check,
+    Property,
+    list_check,
+    type_check,
+)
 from gcdmc.model.types import DatetimeList
 
 
 class DatetimeProperty(Property[datetime.datetime, datetime.datetime]):
-    def validate(self, v: Any) -> datetime.datetime:
-        if v is not None and not isinstance(v, datetime.datetime):
-            raise TypeError(
-                f'invalid type for datetime property: {type(v).__name__}, '
-                'expected a datetime')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            type_check(datetime.datetime, 'datetime', 'a datetime'),
+            *super()._checks(),
+        ]
 
 
 class DatetimeListProperty(Property[DatetimeList, DatetimeList]):
-    def validate(self, v: Any) -> DatetimeList:
-        if v is not None:
-            if type(v) is list:
-                return self.validate(DatetimeList(v))
-            if not isinstance(v, DatetimeList):
-                raise TypeError(
-                    'invalid type for datetime list property: '
-                    f'{type(v).__name__}, expected a datetime list')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            list_check(DatetimeList, 'datetime list', 'a datetime list'),
+            *super()._checks(),
+        ]
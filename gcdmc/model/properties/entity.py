@@ -1,27 +1,28 @@
 from __future__ import annotations
-from typing import Any
+from typing import List
 
 from google.cloud.datastore import Entity
 
-from gcdmc.model.properties.property import Property
+from gcdmc.model.properties.property import (
+    Check,
+    Property,
+    list_check,
+    type_check,
+)
 from gcdmc.model.types import EntityList
 
 
 class EntityProperty(Property[Entity, Entity]):
-    def validate(self, v: Any) -> Entity:
-        if v is not None and not isinstance(v, Entity):
-            raise TypeError(
-                f'invalid type for entity property: {type(v).__name__}, '
-                'expected an entity')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            type_check(Entity, 'entity', 'an entity'),
+            *super()._checks(),
+        ]
 
 
 class EntityListProperty(Property[EntityList, EntityList]):
-    def validate(self, v: Any) -> EntityList:
-        if v is not None:
-            if type(v) is list:
-                return self.validate(EntityList(v))
-            if not isinstance(v, EntityList):
-                raise TypeError('invalid type for entity list property: '
-                                f'{type(v).__name__}, expected an entity list')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            list_check(EntityList, 'entity list', 'an entity list'),
+            *super()._checks(),
+        ]
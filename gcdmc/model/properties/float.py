@@ -1,25 +1,38 @@
 from __future__ import annotations
-from typing import Any
+from typing import List
 
-from gcdmc.model.properties.property import Property
-from gcdmc.model.types import FloatList
+from gcdmc.model.properties.property import (
+    Check,
+    Property,
+    array_check,
+    list_check,
+    type_check,
+)
+from gcdmc.model.types import FloatArray, FloatList
 
 
 class FloatProperty(Property[float, float]):
-    def validate(self, v: Any) -> float:
-        if v is not None and not isinstance(v, float):
-            raise TypeError(
-                f'invalid type for float property: {type(v).__name__}, '
-                'expected a float')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            type_check(float, 'float', 'a float'),
+            *super()._checks(),
+        ]
 
 
 class FloatListProperty(Property[FloatList, FloatList]):
-    def validate(self, v: Any) -> FloatList:
-        if v is not None:
-            if type(v) is list:
-                return self.validate(FloatList(v))
-            if not isinstance(v, FloatList):
-                raise TypeError('invalid type for float list property: '
-                                f'{type(v).__name__}, expected a float list')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            list_check(FloatList, 'float list', 'a float list'),
+            *super()._checks(),
+        ]
+
+
+class FloatArrayProperty(Property[FloatArray, FloatArray]):
+    """A compact alternative to `FloatListProperty`, which stores its values in
+    a `FloatArray`.
+    """
+    def _checks(self) -> List[Check]:
+        return [
+            array_check(FloatArray, 'float array', 'a float array'),
+            *super()._checks(),
+        ]
@@ -0,0 +1,14 @@
+from __future__ import annotations
+from typing import List
+
+from google.cloud.datastore.helpers import GeoPoint
+
+from gcdmc.model.properties.property import Check, Property, type_check
+
+
+class GeoPointProperty(Property[GeoPoint, GeoPoint]):
+    def _checks(self) -> List[Check]:
+        return [
+            type_check(GeoPoint, 'geo point', 'a geo point'),
+            *super()._checks(),
+        ]
@@ -1,25 +1,38 @@
 from __future__ import annotations
-from typing import Any
+from typing import List
 
-from gcdmc.model.properties.property import Property
-from gcdmc.model.types import IntegerList
+from gcdmc.model.properties.property import (
+    Check,
+    Property,
+    array_check,
+    list_check,
+    type_check,
+)
+from gcdmc.model.types import IntegerArray, IntegerList
 
 
 class IntegerProperty(Property[int, int]):
-    def validate(self, v: Any) -> int:
-        if v is not None and not isinstance(v, int):
-            raise TypeError(
-                f'invalid type for integer property: {type(v).__name__}, '
-                'expected an integer')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            type_check(int, 'integer', 'an integer'),
+            *super()._checks(),
+        ]
 
 
 class IntegerListProperty(Property[IntegerList, IntegerList]):
-    def validate(self, v: Any) -> IntegerList:
-        if v is not None:
-            if type(v) is list:
-                return self.validate(IntegerList(v))
-            if not isinstance(v, IntegerList):
-                raise TypeError('invalid type for integer list property: '
-                                f'{type(v).__name__}, expected a integer list')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            list_check(IntegerList, 'integer list', 'an integer list'),
+            *super()._checks(),
+        ]
+
+
+class IntegerArrayProperty(Property[IntegerArray, IntegerArray]):
+    """A compact alternative to `IntegerListProperty`, which stores its
+    values in an `IntegerArray`.
+    """
+    def _checks(self) -> List[Check]:
+        return [
+            array_check(IntegerArray, 'integer array', 'an integer array'),
+            *super()._checks(),
+        ]
@@ -1,27 +1,28 @@
 from __future__ import annotations
-from typing import Any
+from typing import List
 
 from google.cloud.datastore import Key
 
-from gcdmc.model.properties.property import Property
+from gcdmc.model.properties.property import (
+    Check,
+    Property,
+    list_check,
+    type_check,
+)
 from gcdmc.model.types import KeyList
 
 
 class KeyProperty(Property[Key, Key]):
-    def validate(self, v: Any) -> Key:
-        if v is not None and not isinstance(v, Key):
-            raise TypeError(
-                f'invalid type for key property: {type(v).__name__}, '
-                'expected a Datastore key')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            type_check(Key, 'key', 'a Datastore key'),
+            *super()._checks(),
+        ]
 
 
 class KeyListProperty(Property[KeyList, KeyList]):
-    def validate(self, v: Any) -> KeyList:
-        if v is not None:
-            if type(v) is list:
-                return self.validate(KeyList(v))
-            if not isinstance(v, KeyList):
-                raise TypeError('invalid type for key list property: '
-                                f'{type(v).__name__}, expected a key list')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            list_check(KeyList, 'key list', 'a key list'),
+            *super()._checks(),
+        ]
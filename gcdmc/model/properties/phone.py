@@ -1,26 +1,28 @@
 from __future__ import annotations
-from typing import Any
+from typing import List
 
-from gcdmc.model.properties.property import Property
+from gcdmc.model.properties.property import (
+    Check,
+    Property,
+    list_check,
+    value_check,
+)
 from gcdmc.model.properties.string import StringProperty
 from gcdmc.model.types import PhoneList
 from gcdmc.model.types.utils import is_parseable_phone
 
 
 class PhoneProperty(StringProperty):
-    def validate(self, v: Any) -> str:
-        super().validate(v)
-        if v is not None and not is_parseable_phone(v):
-            raise ValueError(f'value is not a parseable phone: {v!r}')
-        return v
+    def _checks(self) -> List[Check]:
+        return [
+            *super()._checks(),
+            value_check(is_parseable_phone, 'value is not a parseable phone'),
+        ]
 
 
 class PhoneListProperty(Property[PhoneList, PhoneList]):
-    def validate(self, v: Any) -> PhoneList:
-        if v is not None:
-            if type(v) is list:
-                return self.validate(PhoneList(v))
-            if not isinstance(v, PhoneList):
-                raise TypeError('invalid type for phone list property: '
-                                f'{type(v).__name__}, expected a phone list')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            list_check(PhoneList, 'phone list', 'a phone list'),
+            *super()._checks(),
+        ]
@@ -1,5 +1,25 @@
 from __future__ import annotations
-from typing import Any, Callable, Generic, Optional, Tuple, TypeVar, Union
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    TYPE_CHECKING,
+)
+if TYPE_CHECKING:
+    from gcdmc.model.typed_entity import TypedEntity
+
+import array
+
+from gcdmc.core.subentity import MUTABLE_TYPES
+from gcdmc.model.errors import UnassignedPropertyError
+from gcdmc.model.types.cache import ValidatorCache
 
 # The type of the property's value
 T = TypeVar('T')
@@ -9,6 +29,90 @@ Validator = [[T], bool]
 # The type of the property's serialized value.
 S = TypeVar('S')
 
+# A check takes a value and returns it, possibly transformed, or raises a
+# `TypeError` or `ValueError` if the value is invalid.
+Check = Callable[[Any], Any]
+
+
+def type_check(type_: type, description: str, expected: str) -> Check:
+    """Returns a check that raises a `TypeError` if a value is neither `None`
+    nor an instance of the given type.
+    """
+    def check(v: Any) -> Any:
+        if v is not None and not isinstance(v, type_):
+            raise TypeError(f'invalid type for {description} property: '
+                            f'{type(v).__name__}, expected {expected}')
+        return v
+
+    return check
+
+
+def list_check(list_type: type, description: str, expected: str) -> Check:
+    """Returns a check that converts plain lists to the given typed list type,
+    which validates each element, and raises a `TypeError` if a value is
+    neither `None` nor an instance of the typed list type.
+    """
+    def check(v: Any) -> Any:
+        if v is not None:
+            if type(v) is list:
+                return list_type(v)
+            if not isinstance(v, list_type):
+                raise TypeError(f'invalid type for {description} property: '
+                                f'{type(v).__name__}, expected {expected}')
+        return v
+
+    return check
+
+
+def array_check(array_type: type, description: str, expected: str) -> Check:
+    """Returns a check that converts sequences and buffers to the given typed
+    array type, which validates every value in one pass, and raises a
+    `TypeError` if a value is neither `None` nor convertible.
+    """
+    def check(v: Any) -> Any:
+        if v is None or isinstance(v, array_type):
+            return v
+        if (isinstance(v, (list, tuple, array.array))
+                or hasattr(v, '__array__')):
+            return array_type(v)
+        raise TypeError(f'invalid type for {description} property: '
+                        f'{type(v).__name__}, expected {expected}')
+
+    return check
+
+
+def value_check(predicate: Callable[[Any], bool], message: str) -> Check:
+    """Returns a check that raises a `ValueError` if a value is not `None` and
+    does not satisfy the given predicate.
+    """
+    def check(v: Any) -> Any:
+        if v is not None and not predicate(v):
+            raise ValueError(f'{message}: {v!r}')
+        return v
+
+    return check
+
+
+def chain_checks(checks: Sequence[Check]) -> Check:
+    """Combines checks into a single check that runs them in order.
+    """
+    checks = tuple(checks)
+    if len(checks) == 0:
+        return _identity
+    if len(checks) == 1:
+        return checks[0]
+
+    def check(v: Any) -> Any:
+        for c in checks:
+            v = c(v)
+        return v
+
+    return check
+
+
+def _identity(v: Any) -> Any:
+    return v
+
 
 class Property(Generic[T, S]):
     """A property is a definition for a single value that is stored on a typed
@@ -32,12 +136,27 @@ class Property(Generic[T, S]):
     :param autoupdater: A function that will be called to update the value of
         the property whenever the entity is updated. This could be useful e.g.
         to implement a timestamp that is updated anytime the entity is changed.
+        Autoupdaters are run when the entity is committed in a batch or
+        transaction.
+
+    :type shared_autoupdate: bool, optional
+    :param shared_autoupdate: Whether the autoupdater is called once per
+        commit, with its value shared by every entity in the commit, or once
+        per entity. Defaults to `true`, which suits clocks since every entity
+        in a commit then gets the same timestamp. Set this to `false` for
+        autoupdaters that must return a distinct value per entity.
 
     :type validator: callable, optional
     :param validator: A function that will be called to validate a value before
         it is assigned to the property. If the value cannot be validated, then
         a `ValueError` will be raised.
 
+    :type validator_cache_size: int, optional
+    :param validator_cache_size: If set, the results of `validator` are cached
+        in a `ValidatorCache` of this size, which is useful when validation is
+        expensive and the same values recur. The cache is available as
+        `validator_cache`. Defaults to `None`, meaning no cache is added.
+
     :type serialize: bool, optional
     :param serialize: Whether or not the property should included when the
         entity is serialized. Defaults to `true`, meaning that properties are
@@ -48,27 +167,84 @@ class Property(Generic[T, S]):
         Note that `default` could be a callable, in which case the return value
         of the callable will be used as the default value. Defaults to `None`,
         meaning that properties have no default value by default.
+
+    Properties are data descriptors. Reading a property from a typed entity
+    returns the value stored on the underlying entity, and assigning to it
+    validates the value before storing it.
+
+    Subclasses add validation by extending `_checks` rather than overriding
+    `validate`. The checks are combined into a single function when the
+    property is created, so validating a value does not walk the class
+    hierarchy.
     """
     def __init__(self,
                  nullable: bool = True,
                  choices: Optional[Tuple[T, ...]] = None,
                  autoupdater: Optional[Generator] = None,
+                 shared_autoupdate: bool = True,
                  validator: Optional[Validator] = None,
                  indexed: bool = True,
                  serialized: bool = True,
+                 validator_cache_size: Optional[int] = None,
                  **kwargs: Any) -> None:
+        if validator is not None and validator_cache_size is not None:
+            validator = ValidatorCache(validator, maxsize=validator_cache_size)
         self._nullable: bool = nullable
         self._choices: Optional[Tuple[T, ...]] = choices
         self._autoupdater: Optional[Generator] = autoupdater
+        self._shared_autoupdate: bool = shared_autoupdate
         self._validator: Optional[Validator] = validator
         self._indexed: bool = indexed
         self._serialized: bool = serialized
         self._has_set_default: bool = 'default' in kwargs
         self._set_default: Union[None, T, Generator] = kwargs.get('default')
+        self._check: Check = chain_checks(self._checks())
         if self._has_set_default:
             self.validate(self.default)
         if self.is_autoupdated:
             self.validate(self._autoupdater())
+        self._name: Optional[str] = None
+
+    def __set_name__(self, owner: Type[TypedEntity], name: str) -> None:
+        self._name = name
+
+    def __get__(self,
+                instance: Optional[TypedEntity],
+                owner: Optional[Type[TypedEntity]] = None) -> Any:
+        if instance is None:
+            return self
+        if object.__getattribute__(instance, '_unvalidated'):
+            # The entity was wrapped lazily, so the stored value may need to
+            # be validated first.
+            return instance[self._name]
+        value: Any = object.__getattribute__(instance, '_entity')[self._name]
+        if isinstance(value, MUTABLE_TYPES):
+            # The value may be changed in place, so it is read through the
+            # entity in case the snapshot of a clean entity still shares it.
+            return instance[self._name]
+        return value
+
+    def __set__(self, instance: TypedEntity, value: Any) -> None:
+        instance[self._name] = value
+
+    def __delete__(self, instance: TypedEntity) -> None:
+        raise UnassignedPropertyError(self._name, instance)
+
+    @property
+    def name(self) -> Optional[str]:
+        """Returns the name that the property was assigned to on its typed
+        entity class, or `None` if it has not been assigned yet.
+        """
+        return self._name
+
+    @property
+    def validator_cache(self) -> Optional[ValidatorCache]:
+        """Returns the cache of the property's validator, or `None` if the
+        validator is not cached.
+        """
+        if isinstance(self._validator, ValidatorCache):
+            return self._validator
+        return None
 
     @property
     def has_default(self) -> bool:
@@ -103,6 +279,20 @@ class Property(Generic[T, S]):
         """
         return self._autoupdater is not None
 
+    @property
+    def autoupdater(self) -> Optional[Generator]:
+        """Returns the autoupdater function, or `None` if the property is not
+        autoupdated.
+        """
+        return self._autoupdater
+
+    @property
+    def is_autoupdate_shared(self) -> bool:
+        """Returns whether or not the autoupdater is called once per commit
+        rather than once per entity.
+        """
+        return self._shared_autoupdate
+
     def generate_update(self) -> Optional[Generator]:
         """Calls the autoupdater function and returns the generated value.
 
@@ -111,6 +301,17 @@ class Property(Generic[T, S]):
         """
         return self._autoupdater()
 
+    def default_factory(self) -> Optional[Generator]:
+        """Returns a function that takes no arguments and returns the default
+        value of the property, or `None` if the property has no default.
+        """
+        if self._has_set_default:
+            if callable(self._set_default):
+                return self._set_default
+            value: T = self._set_default
+            return lambda: value
+        return self._autoupdater
+
     def validate(self, v: Any) -> T:
         """Validates that a value can be used for a property, and then returns
         it. If the input value is not validated, then an error will be thrown.
@@ -118,16 +319,49 @@ class Property(Generic[T, S]):
         If validation fails, then either a `ValueError` or `TypeError` will be
         thrown.
 
-        Subclasses of the base property type can override this behavior to
-        return a transformed value if necessary.
+        Subclasses of the base property type can return a transformed value by
+        adding a check that returns it.
+        """
+        return self._check(v)
+
+    def compile(self) -> Check:
+        """Returns a single function that validates values for this property.
         """
-        if not self._nullable and v is None:
+        if type(self).validate is not Property.validate:
+            # Subclasses that override `validate` keep their own behavior.
+            return self.validate
+        return self._check
+
+    def _checks(self) -> List[Check]:
+        """Returns the checks used to validate a value, in the order that they
+        should run.
+
+        Subclasses should extend the returned list with their own checks, e.g.
+        prepending a type check.
+        """
+        checks: List[Check] = []
+        if not self._nullable:
+            checks.append(self._check_nullable)
+        if self._choices is not None:
+            checks.append(self._check_choices)
+        if self._validator is not None:
+            checks.append(self._check_validator)
+        return checks
+
+    def _check_nullable(self, v: Any) -> Any:
+        if v is None:
             raise ValueError('property value cannot be None')
-        if self._choices is not None and v not in self._choices:
+        return v
+
+    def _check_choices(self, v: Any) -> Any:
+        if v not in self._choices:
             choices: str = ', '.join(repr(c) for c in self._choices)
             raise ValueError(f'got invalid property value: {v!r}, '
                              f'expected one of {choices}')
-        if self._validator is not None and not self._validator(v):
+        return v
+
+    def _check_validator(self, v: Any) -> Any:
+        if not self._validator(v):
             raise ValueError(f'could not validate property value: {v!r}')
         return v
 
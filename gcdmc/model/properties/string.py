@@ -1,25 +1,26 @@
 from __future__ import annotations
-from typing import Any
+from typing import List
 
-from gcdmc.model.properties.property import Property
+from gcdmc.model.properties.property import (
+    Check,
+    Property,
+    list_check,
+    type_check,
+)
 from gcdmc.model.types import StringList
 
 
 class StringProperty(Property[str, str]):
-    def validate(self, v: Any) -> str:
-        if v is not None and not isinstance(v, str):
-            raise TypeError(
-                f'invalid type for string property: {type(v).__name__}, '
-                'expected a string')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            type_check(str, 'string', 'a string'),
+            *super()._checks(),
+        ]
 
 
 class StringListProperty(Property[StringList, StringList]):
-    def validate(self, v: Any) -> StringList:
-        if v is not None:
-            if type(v) is list:
-                return self.validate(StringList(v))
-            if not isinstance(v, StringList):
-                raise TypeError('invalid type for string list property: '
-                                f'{type(v).__name__}, expected a string list')
-        return super().validate(v)
+    def _checks(self) -> List[Check]:
+        return [
+            list_check(StringList, 'string list', 'a string list'),
+            *super()._checks(),
+        ]
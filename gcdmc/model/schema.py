@@ -0,0 +1,125 @@
+from __future__ import annotations
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Tuple,
+    Type,
+    TYPE_CHECKING,
+)
+if TYPE_CHECKING:
+    from gcdmc.model.typed_entity import TypedEntity
+
+from gcdmc.core.subentity import ReadMode
+from gcdmc.model.errors import SchemaError
+from gcdmc.model.properties.property import Check, Property
+
+
+class Schema:
+    """A schema is the compiled form of the properties defined on a typed
+    entity class.
+
+    Schemas are built once per class when the class is created, so that
+    constructing, wrapping and validating entities does not need to inspect
+    the class again. Any problem with the property definitions is raised as a
+    `SchemaError` when the class is created.
+
+    :type fields: tuple
+    :param fields: The names of the properties, in definition order. Properties
+        inherited from base classes come first.
+
+    :type properties: dict
+    :param properties: The properties, keyed by name.
+    """
+    def __init__(self, fields: Tuple[str, ...],
+                 properties: Dict[str, Property]) -> None:
+        #: The names of the properties, in definition order.
+        self.fields: Tuple[str, ...] = fields
+
+        #: The properties, keyed by name.
+        self.properties: Dict[str, Property] = properties
+
+        #: Functions that return the default value of a property, keyed by the
+        #  name of the property. Properties without a default are omitted.
+        self.defaults: Dict[str, Callable[[], Any]] = {}
+
+        #: A single function that validates values for each property, keyed by
+        #  the name of the property.
+        self.validators: Dict[str, Check] = {}
+
+        unindexed: List[str] = []
+        autoupdaters: List[Tuple[str, Callable[[], Any], bool]] = []
+        for name in fields:
+            prop: Property = properties[name]
+            factory: Callable[[], Any] = prop.default_factory()
+            if factory is not None:
+                self.defaults[name] = factory
+            self.validators[name] = prop.compile()
+            if not prop.is_indexed:
+                unindexed.append(name)
+            if prop.is_autoupdated:
+                autoupdaters.append(
+                    (name, prop.autoupdater, prop.is_autoupdate_shared))
+
+        #: The names of the properties that should not be indexed.
+        self.unindexed: FrozenSet[str] = frozenset(unindexed)
+
+        #: The autoupdated properties, as tuples of the property name, the
+        #  autoupdater and whether the update is shared by every entity in a
+        #  commit.
+        self.autoupdaters: Tuple[Tuple[str, Callable[[], Any], bool],
+                                 ...] = tuple(autoupdaters)
+
+    def __repr__(self) -> str:
+        return f'Schema(fields={self.fields!r})'
+
+    @classmethod
+    def build(cls, entity_type: Type[TypedEntity],
+              reserved: Iterable[str] = ()) -> Schema:
+        """Builds the schema for a typed entity class.
+
+        :type entity_type: type
+        :param entity_type: The typed entity class to build the schema for.
+
+        :type reserved: iterable, optional
+        :param reserved: Names that cannot be used for properties, because
+            they are needed by the typed entity itself.
+
+        :rtype: :class:`model.schema.Schema`
+        :returns: The compiled schema.
+        """
+        name: str = entity_type.__name__
+        kind: Any = entity_type.__dict__.get('__kind__')
+        if kind is not None and not isinstance(kind, str):
+            raise SchemaError(f'{name}.__kind__ must be a string, got '
+                              f'{type(kind).__name__}')
+        try:
+            ReadMode(entity_type.__read_mode__)
+        except ValueError:
+            raise SchemaError(f'{name}.__read_mode__ is not a valid read '
+                              f'mode: {entity_type.__read_mode__!r}')
+
+        reserved = frozenset(reserved)
+        properties: Dict[str, Property] = {}
+        for base in reversed(entity_type.__mro__):
+            for attr_name, attr in vars(base).items():
+                if not isinstance(attr, Property):
+                    # A plain attribute hides a property of the same name
+                    # defined on a base class.
+                    properties.pop(attr_name, None)
+                    continue
+                if attr_name in reserved:
+                    raise SchemaError(f'{name} cannot define a property named '
+                                      f'{attr_name!r}, since the name is '
+                                      'reserved by TypedEntity')
+                if attr.name != attr_name:
+                    raise SchemaError(f'{name}.{attr_name} is the same '
+                                      f'property object as '
+                                      f'{name}.{attr.name}; each name needs '
+                                      'its own property')
+                properties[attr_name] = attr
+
+        return cls(tuple(properties), properties)
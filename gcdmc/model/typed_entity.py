@@ -1,20 +1,27 @@
 from __future__ import annotations
 from typing import (
     Any,
+    Callable,
     Dict,
+    FrozenSet,
     Iterable,
+    Mapping,
     Optional,
+    Sequence,
+    Set,
     Type,
     Union,
     Tuple,
     List,
 )
 
-from google.cloud.datastore import Entity, Key
+from google.cloud.datastore import Client, Entity, Key
 
-from gcdmc.core.subentity import Subentity, undelegated
+from gcdmc.core.subentity import ReadMode, Subentity, undelegated
+from gcdmc.model.bulk import MISSING, BulkResult, RowError, to_columns
 from gcdmc.model.errors import UnassignedPropertyError, UndefinedPropertyError
-from gcdmc.model.properties.property import Property
+from gcdmc.model.properties.property import Check, Property
+from gcdmc.model.schema import Schema
 
 
 class TypedEntity(Subentity):
@@ -27,19 +34,31 @@ class TypedEntity(Subentity):
     the found keyword argument value against the property. If the value is
     validated, then it is set on the entity. Otherwise, either a `TypeError` or
     `ValueError` is raised.
+
+    Entities read from the Datastore are wrapped according to a read mode,
+    which can be set per class with `__read_mode__` or per registry. See
+    `wrap` for details.
+
+    The properties of each subclass are compiled into a `Schema` when the
+    subclass is created, so invalid definitions raise a `SchemaError` at
+    import time.
     """
 
     #: The kind of the entity. Must be set by subclass implementations if
     #  instances of the subclass are meant to be persisted into the Datastore.
     __kind__: Optional[str] = None
 
-    #: The properties to be set on the entity. This is lazy intialized and is
-    #  never accessed directly.
-    __cached_properties__: Optional[Dict[str, Property]] = None
+    #: The compiled properties of the entity. This is built when the class is
+    #  created and should not be set directly.
+    __schema__: Schema
+
+    #: How entities of this type are validated when they are wrapped, unless
+    #  a registry specifies otherwise.
+    __read_mode__: ReadMode = ReadMode.STRICT
 
-    #: The properties that should not be indexed. This is lazy initialized and
-    #  never accessed directly.
-    __unindexed_properties__: Optional[List[str]] = None
+    #: The names of the properties whose stored values have not been validated
+    #  yet. This is only set on entities that were wrapped lazily.
+    _unvalidated: Optional[Set[str]] = None
 
     def __init__(self,
                  key: Optional[Key] = None,
@@ -59,14 +78,21 @@ class TypedEntity(Subentity):
                              'set on typed entities and is instead defined '
                              'by the properties on the entity')
 
-        super().__init__(key=key,
-                         exclude_from_indexes=self.unindexed_properties)
+        schema: Schema = cls.__schema__
+        entity: Entity = Entity(key=key)
+        entity.exclude_from_indexes = set(schema.unindexed)
+        self._entity = entity
 
-        for name, prop in self.properties.items():
+        for name in schema.fields:
             try:
-                value: Any = (kwargs.pop(name)
-                              if name in kwargs else prop.default)
-                self[name] = value
+                value: Any
+                if name in kwargs:
+                    value = kwargs.pop(name)
+                elif name in schema.defaults:
+                    value = schema.defaults[name]()
+                else:
+                    raise AttributeError('property has no default')
+                entity[name] = schema.validators[name](value)
             except (TypeError, ValueError, AttributeError) as e:
                 msg: str = f'error setting property {name!r}: {str(e)!r}'
                 raise type(e)(msg)
@@ -76,28 +102,25 @@ class TypedEntity(Subentity):
         for name, value in kwargs.items():
             self[name] = value
 
-    def __getattribute__(self, name: str) -> Any:
-        if name in ('properties', 'unindexed_properties'):
-            return object.__getattribute__(self, name)
-        if name in self.properties:
-            return self[name]
-        return super().__getattribute__(name)
+    def __getitem__(self, key: Any) -> Any:
+        if self._unvalidated and key in self._unvalidated:
+            self._validate_stored_value(key)
+        return super().__getitem__(key)
 
-    def __setattr__(self, name: str, value: Any) -> None:
-        if name in self.properties:
-            self[name] = value
-        else:
-            super().__setattr__(name, value)
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        cls.__schema__ = Schema.build(cls, reserved=_RESERVED_NAMES)
+        super().__init_subclass__(**kwargs)
 
     def __setitem__(self, key: Any, value: Any) -> None:
-        if key not in self.properties:
+        validator: Optional[Check] = type(self).__schema__.validators.get(key)
+        if validator is None:
             raise UndefinedPropertyError(key, self)
-        prop: Property = self.properties[key]
-        value = prop.validate(value)
-        super().__setitem__(key, value)
+        super().__setitem__(key, validator(value))
+        if self._unvalidated:
+            self._unvalidated.discard(key)
 
     def __delitem__(self, key: Any) -> None:
-        if key in self.properties:
+        if key in type(self).__schema__.properties:
             raise UnassignedPropertyError(key, self)
         super().__delitem__(key)
 
@@ -115,37 +138,22 @@ class TypedEntity(Subentity):
 
     @classmethod
     def _properties(cls) -> Dict[str, Property]:
-        """Lazy initializes the `__cached_properties__` dictionary and returns
-        it.
+        """Returns the properties from the compiled schema of the class.
         """
-        if cls.__cached_properties__ is None:
-            cls.__cached_properties__ = {}
-            for name in dir(cls):
-                attr: Any = getattr(cls, name)
-                if isinstance(attr, Property):
-                    cls.__cached_properties__[name] = attr
-
-        return cls.__cached_properties__
+        return cls.__schema__.properties
 
     @property
-    def unindexed_properties(self) -> List[str]:
+    def unindexed_properties(self) -> FrozenSet[str]:
         """Returns the properties that should not be indexed.
         """
         return type(self)._unindexed_properties()
 
     @classmethod
-    def _unindexed_properties(cls) -> List[str]:
-        """Lazy initializes the `__unindexed_properties__` list and returns it.
+    def _unindexed_properties(cls) -> FrozenSet[str]:
+        """Returns the unindexed properties from the compiled schema of the
+        class.
         """
-        if cls.__unindexed_properties__ is None:
-            cls.__unindexed_properties__ = []
-            for name in dir(cls):
-                attr: Any = getattr(cls, name)
-                if isinstance(attr, Property):
-                    if not attr.is_indexed:
-                        cls.__unindexed_properties__.append(name)
-
-        return cls.__unindexed_properties__
+        return cls.__schema__.unindexed
 
     @undelegated
     def clear(self) -> None:
@@ -161,7 +169,7 @@ class TypedEntity(Subentity):
         This method is generally a no-op, due to the fact that only properties
         can be set on typed entities.
         """
-        if key in self.properties:
+        if key in type(self).__schema__.properties:
             raise UnassignedPropertyError(key, self)
         return super().pop(key, *args)
 
@@ -181,12 +189,10 @@ class TypedEntity(Subentity):
             raise TypeError('setdefault expected at most 2 positional '
                             f'arguments, got {len(args)+1} arguments instead')
 
-        if key not in self.properties:
+        validator: Optional[Check] = type(self).__schema__.validators.get(key)
+        if validator is None:
             raise UndefinedPropertyError(key, self)
-
-        prop: Property = self.properties[key]
-        value: Any = prop.validate(args[0])
-        return super().setdefault(key, value)
+        return super().setdefault(key, validator(args[0]))
 
     @undelegated
     def update(self, *args: Union[Dict, List[Tuple]], **kwargs: Any) -> None:
@@ -216,14 +222,346 @@ class TypedEntity(Subentity):
         """
         return cls.__kind__
 
+    def _autoupdate(self, updates: Dict[Callable, Any]) -> None:
+        """Sets every autoupdated property to a newly generated value. See
+        `Subentity._autoupdate`.
+        """
+        schema: Schema = type(self).__schema__
+        if not schema.autoupdaters:
+            return
+        entity: Entity = self._entity
+        for name, autoupdater, shared in schema.autoupdaters:
+            value: Any
+            if not shared:
+                value = autoupdater()
+            elif autoupdater in updates:
+                value = updates[autoupdater]
+            else:
+                value = updates[autoupdater] = autoupdater()
+            entity[name] = schema.validators[name](value)
+        if self._unvalidated:
+            self._unvalidated.difference_update(
+                name for name, _, _ in schema.autoupdaters)
+
+    @classmethod
+    def validate_many(
+        cls,
+        rows: Optional[Iterable[Mapping[str, Any]]] = None,
+        columns: Optional[Mapping[str, Sequence[Any]]] = None,
+    ) -> BulkResult[Dict[str, Any]]:
+        """Validates many sets of property values at once, without creating
+        any entities.
+
+        Exactly one of `rows` or `columns` must be given. Values are validated
+        one property at a time using the compiled validators of the class, and
+        missing values are replaced by the property defaults. Invalid rows do
+        not stop validation; they are reported in the returned result instead.
+
+        :type rows: iterable, optional
+        :param rows: Mappings of property names to values, one per row.
+
+        :type columns: dict, optional
+        :param columns: A mapping of property names to lists of values, which
+            must all have the same length.
+
+        :rtype: :class:`model.bulk.BulkResult`
+        :returns: The validated values of each row, and the errors of the
+            rows that failed.
+        """
+        data, count = to_columns(rows, columns)
+        return cls._validate_columns(data, count)
+
+    @classmethod
+    def create_many(
+        cls,
+        client: Client,
+        rows: Optional[Iterable[Mapping[str, Any]]] = None,
+        columns: Optional[Mapping[str, Sequence[Any]]] = None,
+    ) -> BulkResult[TypedEntity]:
+        """Creates many typed entities of this type at once.
+
+        Each row takes the same arguments as `create`: `parent` and
+        `id_or_name` are used to build the key, and every other name is a
+        property. Rows may also be given as `columns`, a mapping of names to
+        lists of values. Rows without an `id_or_name` that share a parent also
+        share one partial key, which is completed when the entity is
+        committed.
+
+        Rows that fail validation or key creation do not stop the other rows
+        from being created; they are `None` in the returned items and are
+        described in the returned errors. Key errors are reported under
+        `parent` if the parent is invalid, and under `id_or_name` otherwise.
+
+        Values are validated once per column, and the entities are then
+        created without validating them again. Subclasses that override
+        `__init__` are created through their constructor instead, and errors
+        it raises are reported under `__init__`.
+
+        :type client: :class:`google.cloud.datastore.client.Client`
+        :param client: The client to use to create the keys.
+
+        :type rows: iterable, optional
+        :param rows: Mappings of argument names to values, one per entity.
+
+        :type columns: dict, optional
+        :param columns: A mapping of argument names to lists of values, which
+            must all have the same length.
+
+        :rtype: :class:`model.bulk.BulkResult`
+        :returns: The created entities, and the errors of the rows that
+            failed.
+        """
+        data, count = to_columns(rows, columns)
+        parents: Optional[List[Any]] = data.pop('parent', None)
+        ids: Optional[List[Any]] = data.pop('id_or_name', None)
+
+        validated: BulkResult[Dict[str, Any]] = cls._validate_columns(
+            data, count)
+        keys: List[Optional[Key]] = [None] * count
+        errors: List[RowError] = list(validated.errors)
+        if cls.kind() is not None:
+            errors.extend(cls._create_keys(client, parents, ids, keys))
+            errors.sort(key=lambda e: e.row)
+
+        failed: Set[int] = {e.row for e in errors}
+        entities: List[Optional[TypedEntity]] = []
+        for row, values in enumerate(validated.items):
+            if row in failed:
+                entities.append(None)
+                continue
+            try:
+                entities.append(cls._from_validated(keys[row], values))
+            except (TypeError, ValueError, AttributeError) as e:
+                entities.append(None)
+                errors.append(RowError(row, '__init__', e))
+        errors.sort(key=lambda e: e.row)
+        return BulkResult(entities, errors)
+
     @classmethod
-    def wrap(cls, entity: Entity) -> TypedEntity:
+    def _from_validated(cls, key: Optional[Key],
+                        values: Dict[str, Any]) -> TypedEntity:
+        """Creates a typed entity from values that were already validated.
+
+        The entity is attached without validating the values again, unless
+        the class overrides `__init__`, in which case it is created through
+        the constructor so that the override runs.
+        """
+        if cls.__init__ is not TypedEntity.__init__:
+            return cls(key=key, **values)
+        entity: Entity = Entity(key=key)
+        entity.exclude_from_indexes = set(cls.__schema__.unindexed)
+        entity.update(values)
+        return cls._attach(entity)
+
+    @classmethod
+    def _validate_columns(cls, data: Dict[str, List[Any]],
+                          count: int) -> BulkResult[Dict[str, Any]]:
+        """Validates columnar property values. See `validate_many`.
+        """
+        schema: Schema = cls.__schema__
+        items: List[Dict[str, Any]] = [{} for _ in range(count)]
+        errors: List[RowError] = []
+
+        for name in schema.fields:
+            column: List[Any] = data.pop(name, None) or [MISSING] * count
+            validator: Check = schema.validators[name]
+            factory: Optional[Callable[[], Any]] = schema.defaults.get(name)
+
+            values: Optional[List[Any]] = None
+            if not any(v is MISSING for v in column):
+                try:
+                    values = [validator(v) for v in column]
+                except (TypeError, ValueError, AttributeError):
+                    # Fall back to validating row by row to find every row
+                    # that failed.
+                    pass
+
+            if values is not None:
+                for item, value in zip(items, values):
+                    item[name] = value
+                continue
+
+            for row, value in enumerate(column):
+                try:
+                    if value is MISSING:
+                        if factory is None:
+                            raise AttributeError('property has no default')
+                        value = factory()
+                    items[row][name] = validator(value)
+                except (TypeError, ValueError, AttributeError) as e:
+                    errors.append(RowError(row, name, e))
+
+        for name, column in data.items():
+            for row, value in enumerate(column):
+                if value is not MISSING:
+                    errors.append(
+                        RowError(row, name, UndefinedPropertyError(name, cls)))
+
+        errors.sort(key=lambda e: e.row)
+        failed: Set[int] = {e.row for e in errors}
+        return BulkResult(
+            [None if row in failed else item
+             for row, item in enumerate(items)], errors)
+
+    @classmethod
+    def _create_keys(cls, client: Client, parents: Optional[List[Any]],
+                     ids: Optional[List[Any]],
+                     keys: List[Optional[Key]]) -> List[RowError]:
+        """Fills `keys` with a key for each row and returns the errors of the
+        rows whose keys could not be created.
+        """
+        partial: Dict[Optional[Key], Key] = {}
+        errors: List[RowError] = []
+        for row in range(len(keys)):
+            parent: Optional[Key] = None if parents is None else parents[row]
+            parent = None if parent is MISSING else parent
+            id_or_name: Any = None if ids is None else ids[row]
+            # The partial key of the parent is created first, so that an
+            # invalid parent is reported as such.
+            column: str = 'parent'
+            try:
+                key: Optional[Key] = partial.get(parent)
+                if key is None:
+                    key = partial[parent] = client.key(cls.kind(),
+                                                       parent=parent)
+                if id_or_name is not None and id_or_name is not MISSING:
+                    column = 'id_or_name'
+                    key = client.key(cls.kind(), id_or_name, parent=parent)
+                keys[row] = key
+            except (TypeError, ValueError, AttributeError) as e:
+                errors.append(RowError(row, column, e))
+        return errors
+
+    @classmethod
+    def wrap(cls,
+             entity: Entity,
+             read_mode: Optional[ReadMode] = None) -> TypedEntity:
         """Wraps an existing entity and returns a `TypedEntity` object.
 
-        This method will check the data types and values of the underlying
-        entity and raise an error if it does not match the schema defined by
-        the calling `TypedEntity` class.
+        In `STRICT` mode, this method will check the data types and values of
+        the underlying entity and raise an error if it does not match the
+        schema defined by the calling `TypedEntity` class.
+
+        In `LAZY` and `TRUSTED` mode, the entity is attached without copying
+        it, so the typed entity and the input entity share their values.
+        Properties that are missing from the entity are set on the input
+        entity to their default, or to `None` if they have no default, and
+        its `exclude_from_indexes` is replaced by the unindexed properties.
+        Stored values that are not defined by a property are kept as they
+        are, and can be read but not assigned through the item interface.
+
+        `LAZY` mode validates each stored value the first time it is read
+        through the property or item interface, and every pending value
+        before methods such as `get`, `items` or `copy` hand out values.
+        Missing properties without a default are validated the same way, so
+        reading a missing property that is not nullable raises a
+        `ValueError`. `TRUSTED` mode never validates stored values, so
+        missing properties read as `None` even if they are not nullable.
+        Values assigned after wrapping are always validated.
+
+        :type entity: :class:`google.cloud.datastore.entity.Entity`
+        :param entity: The entity to wrap.
+
+        :type read_mode: :class:`core.subentity.ReadMode`, optional
+        :param read_mode: How the entity should be validated. Defaults to the
+            `__read_mode__` of the class.
+        """
+        return cls.wrap_many([entity], read_mode=read_mode)[0]
+
+    @classmethod
+    def wrap_many(cls,
+                  entities: Iterable[Entity],
+                  read_mode: Optional[ReadMode] = None) -> List[TypedEntity]:
+        """Wraps existing entities, in the same way as `wrap`, and returns the
+        typed entities in input order. The read mode and schema are resolved
+        once for all the entities.
+
+        :type entities: iterable
+        :param entities: The entities to wrap.
+
+        :type read_mode: :class:`core.subentity.ReadMode`, optional
+        :param read_mode: How the entities should be validated. Defaults to
+            the `__read_mode__` of the class.
+        """
+        mode: ReadMode = ReadMode(cls.__read_mode__ if read_mode is None else
+                                  read_mode)
+        if mode is ReadMode.STRICT:
+            return [cls(key=entity.key, **entity) for entity in entities]
+
+        kind: Optional[str] = cls.__kind__
+        schema: Schema = cls.__schema__
+        fields: Tuple[str, ...] = schema.fields
+        defaults: Dict[str, Callable[[], Any]] = schema.defaults
+        unindexed: FrozenSet[str] = schema.unindexed
+        lazy: bool = mode is ReadMode.LAZY
+        attach: Callable[[Entity], TypedEntity] = cls._attach
+        wrapped: List[TypedEntity] = []
+        entity: Entity
+        for entity in entities:
+            if kind is not None and entity.key.kind != kind:
+                raise TypeError(
+                    f'got unexpected key kind: {entity.key.kind!r}, '
+                    f'expected: {kind!r}')
+            unvalidated: Set[str] = set()
+            for name in fields:
+                if name in entity:
+                    unvalidated.add(name)
+                else:
+                    factory: Optional[Callable[[], Any]] = defaults.get(name)
+                    if factory is not None:
+                        entity[name] = factory()
+                    else:
+                        # The property may not be nullable, which is only
+                        # checked when it is read.
+                        entity[name] = None
+                        unvalidated.add(name)
+            entity.exclude_from_indexes = set(unindexed)
+
+            typed: TypedEntity = attach(entity)
+            if lazy and unvalidated:
+                typed._unvalidated = unvalidated
+            wrapped.append(typed)
+        return wrapped
+
+    def _expose_values(self) -> None:
+        """Validates every stored value that has not been validated yet, so
+        that methods such as `get` and `items` only hand out valid values.
+        """
+        if self._unvalidated:
+            for name in list(self._unvalidated):
+                self._validate_stored_value(name)
+        super()._expose_values()
+
+    def _validate_stored_value(self, name: str) -> None:
+        """Validates a value that was stored before the entity was wrapped
+        lazily, and replaces it with the validated value.
         """
-        return cls(key=entity.key,
-                   exclude_from_indexes=list(entity.exclude_from_indexes),
-                   **entity)
+        validator: Check = type(self).__schema__.validators[name]
+        try:
+            value: Any = validator(super().__getitem__(name))
+        except (TypeError, ValueError, AttributeError) as e:
+            msg: str = f'error reading property {name!r}: {str(e)!r}'
+            raise type(e)(msg)
+        super().__setitem__(name, value)
+        self._unvalidated.discard(name)
+
+
+# Names that properties cannot use, since typed entities keep their state
+# in them or since subclients, batches and transactions call them on every
+# entity. Other names, such as `id` or `values`, can be used for properties,
+# which then hide the entity attributes of the same name.
+_RESERVED_NAMES: FrozenSet[str] = frozenset({
+    '_entity',
+    '_snapshot',
+    '_unvalidated',
+    '_autoupdate',
+    '_get_snapshot',
+    '_expose_values',
+    '_validate_stored_value',
+    'key',
+    'is_dirty',
+    'mark_clean',
+    'mark_dirty',
+})
+
+TypedEntity.__schema__ = Schema.build(TypedEntity)
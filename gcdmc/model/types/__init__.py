@@ -5,6 +5,13 @@ import datetime
 
 from google.cloud.datastore import Key, Entity
 
+from gcdmc.model.types.cache import ValidatorCache, cached_validator
+from gcdmc.model.types.typed_array import (
+    BooleanArray,
+    FloatArray,
+    IntegerArray,
+    TypedArray,
+)
 from gcdmc.model.types.typed_list import TypedList
 from gcdmc.model.types.utils import (
     is_parseable_phone,
@@ -77,4 +84,10 @@ __all__ = [
     'DateList',
     'KeyList',
     'EntityList',
+    'TypedArray',
+    'BooleanArray',
+    'IntegerArray',
+    'FloatArray',
+    'ValidatorCache',
+    'cached_validator',
 ]
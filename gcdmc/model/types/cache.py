@@ -0,0 +1,128 @@
+from __future__ import annotations
+from typing import Any, Callable, Optional
+
+import functools
+
+#: The number of results cached by a validator cache unless another size is
+#  given.
+DEFAULT_CACHE_SIZE: int = 4096
+
+
+class ValidatorCache:
+    """Wraps a validator function and caches its results, evicting the least
+    recently used result once the cache is full.
+
+    A validator cache can be used anywhere a validator function is expected,
+    e.g. as the `validator` of a property. Values that cannot be hashed are
+    validated without being cached. The type of a value is part of its cache
+    key, so e.g. `1` and `True` are cached separately.
+
+    The `hits` and `misses` counters can be used to size the cache.
+
+    :type func: callable
+    :param func: A function that takes a single value and returns a boolean
+        indicating whether or not the value is valid.
+
+    :type maxsize: int, optional
+    :param maxsize: The maximum number of results to cache. A size of zero
+        disables caching.
+    """
+    def __init__(self,
+                 func: Callable[[Any], bool],
+                 maxsize: int = DEFAULT_CACHE_SIZE) -> None:
+        functools.update_wrapper(self, func)
+        self._func: Callable[[Any], bool] = func
+        self._cached: Callable[[Any], bool]
+        self._maxsize: int
+        self._hits: int = 0
+        self._misses: int = 0
+        self.maxsize = maxsize
+
+    def __call__(self, value: Any) -> bool:
+        try:
+            hash(value)
+        except TypeError:
+            # Unhashable values cannot be cached.
+            return self._func(value)
+        # Errors raised by the validator function propagate from here, so
+        # the function is only called once per value.
+        return self._cached(value)
+
+    def __repr__(self) -> str:
+        return (f'ValidatorCache({self._func.__name__}, '
+                f'maxsize={self._maxsize}, hits={self.hits}, '
+                f'misses={self.misses})')
+
+    @property
+    def maxsize(self) -> int:
+        """Returns the maximum number of results that are cached.
+        """
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize: int) -> None:
+        """Sets the maximum number of results that are cached. This clears the
+        cached results, but keeps the counters.
+        """
+        if maxsize < 0:
+            raise ValueError(f'maxsize must not be negative, got {maxsize}')
+        cached: Optional[Any] = self.__dict__.get('_cached')
+        if cached is not None:
+            info: Any = cached.cache_info()
+            self._hits += info.hits
+            self._misses += info.misses
+        self._maxsize = maxsize
+        self._cached = functools.lru_cache(maxsize=maxsize,
+                                           typed=True)(self._func)
+
+    @property
+    def hits(self) -> int:
+        """Returns the number of calls answered from the cache.
+        """
+        return self._hits + self._cached.cache_info().hits
+
+    @property
+    def misses(self) -> int:
+        """Returns the number of calls that ran the validator function.
+        """
+        return self._misses + self._cached.cache_info().misses
+
+    @property
+    def size(self) -> int:
+        """Returns the number of results that are currently cached.
+        """
+        return self._cached.cache_info().currsize
+
+    @property
+    def hit_rate(self) -> float:
+        """Returns the fraction of calls that were answered from the cache, or
+        `0.0` if the cache has not been called.
+        """
+        hits: int = self.hits
+        calls: int = hits + self.misses
+        return hits / calls if calls > 0 else 0.0
+
+    def clear(self) -> None:
+        """Removes all cached results and resets the counters.
+        """
+        self._cached.cache_clear()
+        self._hits = 0
+        self._misses = 0
+
+
+def cached_validator(
+    func: Optional[Callable[[Any], bool]] = None,
+    maxsize: int = DEFAULT_CACHE_SIZE,
+) -> Any:
+    """Wraps a validator function in a `ValidatorCache`. This can be used as
+    a decorator, with or without arguments.
+
+    :type func: callable, optional
+    :param func: The validator function to wrap.
+
+    :type maxsize: int, optional
+    :param maxsize: The maximum number of results to cache.
+    """
+    if func is None:
+        return functools.partial(cached_validator, maxsize=maxsize)
+    return ValidatorCache(func, maxsize=maxsize)
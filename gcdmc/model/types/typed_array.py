@@ -0,0 +1,212 @@
+from __future__ import annotations
+from typing import Any, FrozenSet, Iterable, List, Optional, Set
+
+import array
+
+
+class TypedArray(array.array):
+    """A compact alternative to `TypedList` for numeric values, which stores
+    the values unboxed in an `array.array` buffer.
+
+    Values are checked as they are converted into the buffer, so a sequence is
+    validated in a single pass implemented in C rather than with one
+    `isinstance` call per value. Objects that expose a contiguous buffer of a
+    compatible format, such as a NumPy array, are copied in directly.
+
+    Typed arrays support the buffer protocol, so `memoryview` and
+    `numpy.frombuffer` can read them without copying. They are converted to a
+    plain list when the entity that holds them is committed.
+
+    :type iterable: iterable, optional
+    :param iterable: The values to initialize the array with.
+    """
+
+    #: The `array` type code of the stored values.
+    __typecode__: str = ''
+
+    #: The buffer formats that can be copied into the array as they are.
+    __formats__: FrozenSet[str] = frozenset()
+
+    def __new__(cls, iterable: Optional[Iterable] = None) -> TypedArray:
+        self: TypedArray = super().__new__(cls, cls.__typecode__)
+        if iterable is not None:
+            self.extend(iterable)
+        return self
+
+    def __init__(self, iterable: Optional[Iterable] = None) -> None:
+        # The values are loaded in `__new__`, since `array.array` does not
+        # accept arguments in `__init__`.
+        pass
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.tolist()!r})'
+
+    def __getitem__(self, i: Any) -> Any:
+        v: Any = super().__getitem__(i)
+        if isinstance(i, slice):
+            # Slices of `array.array` are plain arrays, so they are copied
+            # into an array of the same type.
+            result: TypedArray = type(self)()
+            array.array.extend(result, v)
+            return result
+        return v
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (list, tuple)):
+            return self.tolist() == list(other)
+        return super().__eq__(other)
+
+    def __ne__(self, other: Any) -> bool:
+        return not self == other
+
+    def __add__(self, other: Iterable) -> TypedArray:
+        result: TypedArray = self.copy()
+        result.extend(other)
+        return result
+
+    def __iadd__(self, other: Iterable) -> TypedArray:
+        self.extend(other)
+        return self
+
+    def __copy__(self) -> TypedArray:
+        return self.copy()
+
+    def __deepcopy__(self, memo: Any) -> TypedArray:
+        return self.copy()
+
+    def __reduce_ex__(self, protocol: int) -> Any:
+        return type(self), (self.tolist(), )
+
+    def copy(self) -> TypedArray:
+        result: TypedArray = type(self)()
+        array.array.extend(result, self)
+        return result
+
+    def extend(self, iterable: Iterable) -> None:
+        """Appends values to the array. Either all of the values are appended,
+        or none are if any value is invalid.
+        """
+        array.array.extend(self, self._convert(iterable))
+
+    def to_numpy(self) -> Any:
+        """Returns a NumPy array that shares the buffer of this array. This
+        requires NumPy to be installed.
+        """
+        import numpy
+        return numpy.frombuffer(self, dtype=self.typecode)
+
+    def _convert(self, iterable: Iterable) -> array.array:
+        """Converts values to a plain array with the storage type code, and
+        raises an error if any value is invalid.
+        """
+        name: str = type(self).__name__
+        if isinstance(iterable, (str, bytes, bytearray)):
+            raise TypeError(f'invalid type for {name}: '
+                            f'{type(iterable).__name__}')
+
+        converted: array.array = array.array(self.typecode)
+        if not isinstance(iterable, list):
+            try:
+                view: memoryview = memoryview(iterable)
+            except TypeError:
+                pass
+            else:
+                if (view.format in self.__formats__ and view.ndim == 1
+                        and view.itemsize == self.itemsize
+                        and view.c_contiguous):
+                    converted.frombytes(view.cast('B'))
+                    self._check_converted(converted)
+                    return converted
+
+        values: List = (iterable
+                        if isinstance(iterable, list) else list(iterable))
+        self._check_values(values)
+        try:
+            converted.fromlist(values)
+        except TypeError as e:
+            raise TypeError(f'invalid type for {name}: {e}') from None
+        except OverflowError as e:
+            raise ValueError(f'invalid value for {name}: {e}') from None
+        return converted
+
+    def _check_values(self, values: List) -> None:
+        """Checks values before they are converted. Subclasses can override
+        this to be stricter than the conversion itself.
+        """
+        pass
+
+    def _check_converted(self, converted: array.array) -> None:
+        """Checks values that were copied from a buffer without conversion.
+        """
+        pass
+
+
+class IntegerArray(TypedArray):
+    """A compact list of 64-bit integers.
+    """
+    __typecode__ = 'q'
+    __formats__ = frozenset(('q', 'l', '<q', '=q'))
+
+
+class FloatArray(TypedArray):
+    """A compact list of 64-bit floats. Integers are converted to floats.
+    """
+    __typecode__ = 'd'
+    __formats__ = frozenset(('d', '<d', '=d'))
+
+
+class BooleanArray(TypedArray):
+    """A compact list of booleans, stored as one byte per value.
+    """
+    __typecode__ = 'B'
+    __formats__ = frozenset(('?', ))
+
+    def __getitem__(self, i: Any) -> Any:
+        v: Any = super().__getitem__(i)
+        if isinstance(i, slice):
+            return v
+        return v == 1
+
+    def __setitem__(self, i: Any, v: Any) -> None:
+        if isinstance(i, slice):
+            v = v if isinstance(v, BooleanArray) else BooleanArray(v)
+        else:
+            self._check_values([v])
+        super().__setitem__(i, v)
+
+    def __iter__(self) -> Any:
+        return iter(self.tolist())
+
+    def __contains__(self, v: Any) -> bool:
+        return v in self.tolist()
+
+    def append(self, v: Any) -> None:
+        self._check_values([v])
+        super().append(v)
+
+    def insert(self, i: int, v: Any) -> None:
+        self._check_values([v])
+        super().insert(i, v)
+
+    def pop(self, i: int = -1) -> bool:
+        return super().pop(i) == 1
+
+    def tolist(self) -> List[bool]:
+        return [v == 1 for v in super().tolist()]
+
+    def to_numpy(self) -> Any:
+        import numpy
+        return numpy.frombuffer(self, dtype=numpy.bool_)
+
+    def _check_values(self, values: List) -> None:
+        types: Set[type] = set(map(type, values))
+        if not types <= {bool}:
+            invalid: str = ', '.join(sorted(t.__name__ for t in types
+                                            if t is not bool))
+            raise TypeError(f'invalid type for {type(self).__name__}: '
+                            f'{invalid}, expected bool')
+
+    def _check_converted(self, converted: array.array) -> None:
+        if converted and max(converted) > 1:
+            raise ValueError(f'invalid value for {type(self).__name__}: '
+                             'booleans must be stored as 0 or 1')
@@ -1,5 +1,14 @@
 from __future__ import annotations
-from typing import Any, Callable, Generic, Iterable, List, Optional, TypeVar
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
 T = TypeVar('T')
 Validator = Callable[[T], bool]
@@ -62,6 +71,13 @@ class TypedList(Generic[T], List[T], list):
         self.extend(iterable)
         return self
 
+    def __reduce__(self) -> Tuple:
+        # The type and validator are set by the constructor, so lists are
+        # pickled as a call to it. Subclasses only take the values.
+        if type(self) is TypedList:
+            return TypedList, (self._type, self._validator, list(self))
+        return type(self), (list(self), )
+
     def _check_value(self, v: Any) -> None:
         if not isinstance(v, self._type):
             raise TypeError(
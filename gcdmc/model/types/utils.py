@@ -3,7 +3,7 @@ from __future__ import annotations
 import datetime
 import re
 
-import phonenumbers
+from gcdmc.model.types.cache import cached_validator
 
 # From the W3C HTML5 spec:
 # https://html.spec.whatwg.org/multipage/input.html#valid-e-mail-address
@@ -13,6 +13,7 @@ _email_regex: re.Pattern = re.compile(
     r"(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*$")
 
 
+@cached_validator
 def is_valid_email(email: str) -> bool:
     """Returns whether or not the input string is a valid email address as
     defined by the W3C HTML5 spec.
@@ -22,10 +23,14 @@ def is_valid_email(email: str) -> bool:
     return _email_regex.match(email) is not None
 
 
+@cached_validator
 def is_parseable_phone(number: str) -> bool:
     """Returns whether or not the input string is a phone number in E.164
     format.
     """
+    # `phonenumbers` loads a large amount of metadata, so it is imported when
+    # the first phone number is validated rather than when this module is.
+    import phonenumbers
     try:
         # Note that we don't check if the number if valid. We could do this
         # with the `phonenumbers.is_valid_number` function, but this probably
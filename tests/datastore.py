@@ -0,0 +1,244 @@
+"""An in-memory implementation of the Datastore API, used by the tests in
+place of the gRPC and HTTP clients.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncio
+import itertools
+import zlib
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.datastore_v1.types import datastore as datastore_pb2
+from google.cloud.datastore_v1.types import entity as entity_pb2
+from google.cloud.datastore_v1.types import query as query_pb2
+
+from gcdmc.core import AsyncSubclient, Registry, Subclient, Subentity
+
+
+def _key_id(key_pb: entity_pb2.Key) -> bytes:
+    return entity_pb2.Key.serialize(key_pb)
+
+
+def _is_partial(key_pb: entity_pb2.Key) -> bool:
+    element: Any = key_pb.path[-1]
+    return not element.id and not element.name
+
+
+def _key_order(key_pb: entity_pb2.Key) -> Tuple:
+    return tuple((e.kind, bool(e.name), e.id, e.name) for e in key_pb.path)
+
+
+#: Compares the sort order of a key with that of a filter value.
+_KEY_COMPARISONS: Dict[Any, Any] = {
+    query_pb2.PropertyFilter.Operator.LESS_THAN: lambda a, b: a < b,
+    query_pb2.PropertyFilter.Operator.LESS_THAN_OR_EQUAL: lambda a, b: a <= b,
+    query_pb2.PropertyFilter.Operator.GREATER_THAN: lambda a, b: a > b,
+    query_pb2.PropertyFilter.Operator.GREATER_THAN_OR_EQUAL:
+    lambda a, b: a >= b,
+    query_pb2.PropertyFilter.Operator.EQUAL: lambda a, b: a == b,
+}
+
+
+def _matches(entity_pb: entity_pb2.Entity,
+             filter_pb: query_pb2.Filter) -> bool:
+    """Supports equality and ancestor filters, and key comparisons, combined
+    with AND.
+    """
+    if 'composite_filter' in filter_pb:
+        return all(
+            _matches(entity_pb, f)
+            for f in filter_pb.composite_filter.filters)
+    if 'property_filter' not in filter_pb:
+        return True
+    property_filter: query_pb2.PropertyFilter = filter_pb.property_filter
+    name: str = property_filter.property.name
+    if property_filter.op == query_pb2.PropertyFilter.Operator.HAS_ANCESTOR:
+        ancestor: Any = property_filter.value.key_value.path
+        return list(entity_pb.key.path[:len(ancestor)]) == list(ancestor)
+    if name == '__key__':
+        return _KEY_COMPARISONS[property_filter.op](
+            _key_order(entity_pb.key),
+            _key_order(property_filter.value.key_value))
+    if property_filter.op != query_pb2.PropertyFilter.Operator.EQUAL:
+        raise NotImplementedError(f'unsupported operator {property_filter.op}')
+    return (name in entity_pb.properties
+            and entity_pb.properties[name] == property_filter.value)
+
+
+class InMemoryDatastoreAPI:
+    """Stores entity protobufs in a dictionary and records every request that
+    is made.
+
+    If `max_results` is given, lookups answer at most that many keys and
+    return the rest as deferred. If `batch_size` is given, queries return at
+    most that many results per page. Queries return results in key order,
+    or in a fixed pseudo-random order when ordered by `__scatter__`.
+    """
+    def __init__(self,
+                 max_results: Optional[int] = None,
+                 batch_size: Optional[int] = None) -> None:
+        self.max_results: Optional[int] = max_results
+        self.batch_size: Optional[int] = batch_size
+        self.entities: Dict[bytes, entity_pb2.Entity] = {}
+        self.requests: List[tuple] = []
+        self._ids: itertools.count = itertools.count(1000)
+        self._transactions: itertools.count = itertools.count(1)
+
+    def count(self, method: str) -> int:
+        return sum(1 for name, _ in self.requests if name == method)
+
+    def lookup(self, request: Dict[str, Any],
+               **kwargs: Any) -> datastore_pb2.LookupResponse:
+        self.requests.append(('lookup', request))
+        response: datastore_pb2.LookupResponse = datastore_pb2.LookupResponse()
+        for i, key_pb in enumerate(request['keys']):
+            if self.max_results is not None and i >= self.max_results:
+                response.deferred.append(key_pb)
+                continue
+            found: Optional[entity_pb2.Entity] = self.entities.get(
+                _key_id(key_pb))
+            if found is None:
+                response.missing.append(
+                    query_pb2.EntityResult(entity=entity_pb2.Entity(
+                        key=key_pb)))
+            else:
+                response.found.append(query_pb2.EntityResult(entity=found))
+        return response
+
+    def commit(self, request: Dict[str, Any],
+               **kwargs: Any) -> datastore_pb2.CommitResponse:
+        self.requests.append(('commit', request))
+        response: datastore_pb2.CommitResponse = datastore_pb2.CommitResponse()
+        for mutation in request['mutations']:
+            result: datastore_pb2.MutationResult = (
+                datastore_pb2.MutationResult())
+            if 'delete' in mutation:
+                self.entities.pop(_key_id(mutation.delete), None)
+            else:
+                entity_pb: entity_pb2.Entity = (mutation.upsert if 'upsert'
+                                                in mutation else
+                                                mutation.insert)
+                entity_pb = entity_pb2.Entity.deserialize(
+                    entity_pb2.Entity.serialize(entity_pb))
+                if _is_partial(entity_pb.key):
+                    entity_pb.key.path[-1].id = next(self._ids)
+                    result.key = entity_pb.key
+                self.entities[_key_id(entity_pb.key)] = entity_pb
+            response.mutation_results.append(result)
+        return response
+
+    def run_query(self, request: Dict[str, Any],
+                  **kwargs: Any) -> datastore_pb2.RunQueryResponse:
+        self.requests.append(('run_query', request))
+        query: query_pb2.Query = request['query']
+        kinds: List[str] = [k.name for k in query.kind]
+        results: List[entity_pb2.Entity] = sorted(
+            (e for e in self.entities.values()
+             if (not kinds or e.key.path[-1].kind in kinds)
+             and _matches(e, query.filter)),
+            key=lambda e: _key_order(e.key))
+        if any(o.property.name == '__scatter__' for o in query.order):
+            results.sort(key=lambda e: zlib.crc32(_key_id(e.key)))
+        projection: List[str] = [p.property.name for p in query.projection]
+        if projection:
+            results = [
+                entity_pb2.Entity(key=e.key,
+                                  properties={
+                                      name: e.properties[name]
+                                      for name in projection
+                                      if name in e.properties
+                                  }) for e in results
+            ]
+
+        start: int = (int(query.start_cursor.decode())
+                      if query.start_cursor else 0)
+        skipped: int = min(query.offset, max(len(results) - start, 0))
+        start += skipped
+        end: int = len(results)
+        more: Any = query_pb2.QueryResultBatch.MoreResultsType.NO_MORE_RESULTS
+        if query.limit is not None and start + query.limit < end:
+            end = start + query.limit
+            more = (query_pb2.QueryResultBatch.MoreResultsType.
+                    MORE_RESULTS_AFTER_LIMIT)
+        if self.batch_size is not None and start + self.batch_size < end:
+            end = start + self.batch_size
+            more = query_pb2.QueryResultBatch.MoreResultsType.NOT_FINISHED
+
+        return datastore_pb2.RunQueryResponse(batch=query_pb2.QueryResultBatch(
+            entity_results=[
+                query_pb2.EntityResult(entity=e) for e in results[start:end]
+            ],
+            end_cursor=str(end).encode(),
+            skipped_results=skipped,
+            more_results=more,
+        ))
+
+    def begin_transaction(
+            self, request: Dict[str, Any],
+            **kwargs: Any) -> datastore_pb2.BeginTransactionResponse:
+        self.requests.append(('begin_transaction', request))
+        return datastore_pb2.BeginTransactionResponse(
+            transaction=str(next(self._transactions)).encode())
+
+    def rollback(self, request: Dict[str, Any],
+                 **kwargs: Any) -> datastore_pb2.RollbackResponse:
+        self.requests.append(('rollback', request))
+        return datastore_pb2.RollbackResponse()
+
+
+def make_client(registry: Optional[Registry] = None,
+                api: Optional[InMemoryDatastoreAPI] = None) -> Subclient:
+    """Returns a subclient that uses an in-memory Datastore API.
+    """
+    client: Subclient = Subclient(project='test',
+                                  credentials=AnonymousCredentials(),
+                                  registry=registry)
+    client._datastore_api_internal = api or InMemoryDatastoreAPI()
+    return client
+
+
+def make_entities(client: Subclient,
+                  count: int,
+                  kind: str = 'Item') -> List[Subentity]:
+    """Returns subentities of a kind with IDs from 1, each holding its index
+    as `n`.
+    """
+    entities: List[Subentity] = []
+    for i in range(count):
+        entity: Subentity = Subentity(key=client.key(kind, i + 1))
+        entity['n'] = i
+        entities.append(entity)
+    return entities
+
+
+class AsyncInMemoryDatastoreAPI:
+    """Exposes the methods of an in-memory Datastore API as coroutines, which
+    yield to the event loop before answering.
+    """
+    def __init__(self, api: Optional[InMemoryDatastoreAPI] = None) -> None:
+        self.api: InMemoryDatastoreAPI = api or InMemoryDatastoreAPI()
+
+    def __getattr__(self, name: str) -> Any:
+        method: Any = getattr(self.api, name)
+        if name not in ('lookup', 'commit', 'run_query', 'begin_transaction',
+                        'rollback'):
+            return method
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            await asyncio.sleep(0)
+            return method(*args, **kwargs)
+
+        return call
+
+
+def make_async_client(
+        registry: Optional[Registry] = None,
+        api: Optional[InMemoryDatastoreAPI] = None) -> AsyncSubclient:
+    """Returns an async subclient that uses an in-memory Datastore API.
+    """
+    client: AsyncSubclient = AsyncSubclient(project='test',
+                                            credentials=AnonymousCredentials(),
+                                            registry=registry)
+    client._async_datastore_api_internal = AsyncInMemoryDatastoreAPI(api)
+    return client
@@ -0,0 +1,307 @@
+from __future__ import annotations
+from typing import Any, List, Optional
+
+import asyncio
+
+import grpc
+import pytest
+
+from google.api_core.exceptions import ServiceUnavailable
+from google.api_core.retry import Retry, if_exception_type
+from google.cloud.datastore import Entity, Key
+from google.cloud.datastore_v1.services.datastore import DatastoreAsyncClient
+from google.cloud.datastore_v1.services.datastore.transports import (
+    DatastoreGrpcAsyncIOTransport, )
+
+from gcdmc.core import (
+    AsyncSubclient,
+    AsyncSubiterator,
+    ChunkError,
+    QueryCache,
+    Subclient,
+    Subentity,
+)
+from gcdmc.core.chunks import MAX_LOOKUP_KEYS, MAX_MUTATIONS
+from tests.datastore import (
+    AsyncInMemoryDatastoreAPI,
+    InMemoryDatastoreAPI,
+    make_async_client,
+    make_client,
+    make_entities,
+)
+from tests.test_subclient import FlakyDatastoreAPI
+
+
+def test_get_put_and_delete():
+    async def main() -> None:
+        client: AsyncSubclient = make_async_client()
+        entities: List[Subentity] = make_entities(client, 3)
+        await client.put_multi(entities)
+        assert not any(e.is_dirty for e in entities)
+
+        missing: List[Entity] = []
+        keys: List[Key] = [e.key for e in entities] + [client.key('Item', 9)]
+        found: List[Subentity] = await client.get_multi(keys,
+                                                        missing=missing)
+        assert [e['n'] for e in found] == [0, 1, 2]
+        assert [e.key for e in missing] == [keys[-1]]
+        assert not found[0].is_dirty
+
+        await client.delete(keys[0])
+        assert await client.get(keys[0]) is None
+        assert await client.get_multi(keys, aligned=True) == [
+            None, found[1], found[2], None
+        ]
+
+    asyncio.run(main())
+
+
+def test_large_calls_are_chunked_concurrently():
+    async def main() -> None:
+        client: AsyncSubclient = make_async_client()
+        api: InMemoryDatastoreAPI = client._async_datastore_api.api
+        count: int = MAX_LOOKUP_KEYS * 2 + 1
+        entities: List[Subentity] = make_entities(client, count)
+        await client.put_multi(entities)
+        assert api.count('commit') == -(-count // MAX_MUTATIONS)
+
+        keys: List[Key] = [e.key for e in reversed(entities)]
+        found: List[Subentity] = await client.get_multi(keys)
+        assert api.count('lookup') == 3
+        assert [e.key for e in found] == keys
+
+    asyncio.run(main())
+
+
+def test_failed_chunks_are_reported():
+    async def main() -> None:
+        entities: List[Subentity] = make_entities(make_client(),
+                                              MAX_MUTATIONS * 2)
+        client: AsyncSubclient = make_async_client(
+            api=FlakyDatastoreAPI(fail=[entities[0].key]))
+        with pytest.raises(ChunkError) as info:
+            await client.put_multi(entities)
+        assert info.value.failed_items == entities[:MAX_MUTATIONS]
+
+    asyncio.run(main())
+
+
+def test_batches_are_used_with_async_with():
+    async def main() -> None:
+        client: AsyncSubclient = make_async_client()
+        api: InMemoryDatastoreAPI = client._async_datastore_api.api
+        entities: List[Subentity] = make_entities(client, 3)
+        async with client.batch() as batch:
+            assert client.current_batch is batch
+            await client.put_multi(entities)
+            await client.delete(client.key('Item', 10))
+            assert api.count('commit') == 0
+        assert client.current_batch is None
+        assert api.count('commit') == 1
+        assert len(api.entities) == 3
+
+        with pytest.raises(TypeError):
+            with client.batch():
+                pass
+
+    asyncio.run(main())
+
+
+def test_transactions_commit_and_roll_back():
+    async def main() -> None:
+        client: AsyncSubclient = make_async_client()
+        api: InMemoryDatastoreAPI = client._async_datastore_api.api
+        entities: List[Subentity] = make_entities(client, 2)
+        async with client.transaction() as transaction:
+            await client.put(entities[0])
+            assert client.current_transaction is transaction
+            assert (await client.get(entities[0].key)) is entities[0]
+        assert api.count('begin_transaction') == 1
+        assert api.requests[-1][1]['transaction'] == b'1'
+        assert len(api.entities) == 1
+
+        with pytest.raises(RuntimeError):
+            async with client.transaction():
+                await client.put(entities[1])
+                raise RuntimeError('abort')
+        assert api.count('rollback') == 1
+        assert len(api.entities) == 1
+
+    asyncio.run(main())
+
+
+def test_concurrent_tasks_use_their_own_transactions():
+    async def main() -> None:
+        client: AsyncSubclient = make_async_client()
+        entities: List[Subentity] = make_entities(client, 2)
+
+        async def write(entity: Subentity) -> Optional[Any]:
+            async with client.transaction() as transaction:
+                await asyncio.sleep(0)
+                assert client.current_transaction is transaction
+                await client.put(entity)
+                return transaction.identity_map
+
+        maps: List[Any] = await asyncio.gather(*map(write, entities))
+        assert [list(m) for m in maps] == [[e.key] for e in entities]
+
+    asyncio.run(main())
+
+
+def test_queries_are_iterated_with_async_for():
+    async def main() -> None:
+        client: AsyncSubclient = make_async_client(
+            api=InMemoryDatastoreAPI(batch_size=2))
+        api: InMemoryDatastoreAPI = client._async_datastore_api.api
+        await client.put_multi(make_entities(client, 5) +
+                               make_entities(client, 2, kind='Other'))
+
+        iterator: AsyncSubiterator = client.query(kind='Item').fetch()
+        results: List[Subentity] = [e async for e in iterator]
+        assert [e['n'] for e in results] == [0, 1, 2, 3, 4]
+        assert iterator.num_results == 5
+        assert api.count('run_query') == 3
+        assert not results[0].is_dirty
+
+        limited: List[Subentity] = [
+            e async for e in client.query(kind='Item').fetch(limit=3,
+                                                             offset=1)
+        ]
+        assert [e['n'] for e in limited] == [1, 2, 3]
+
+        with pytest.raises(TypeError):
+            list(client.query(kind='Item').fetch())
+
+    asyncio.run(main())
+
+
+def test_async_queries_are_cached():
+    async def main() -> None:
+        client: AsyncSubclient = make_async_client(
+            api=InMemoryDatastoreAPI(batch_size=2))
+        api: InMemoryDatastoreAPI = client._async_datastore_api.api
+        client.query_cache = QueryCache()
+        await client.put_multi(make_entities(client, 3))
+
+        for _ in range(2):
+            results: List[Subentity] = [
+                e async for e in client.query(kind='Item').fetch(cached=True)
+            ]
+            assert [e['n'] for e in results] == [0, 1, 2]
+        assert api.count('run_query') == 2
+        assert client.query_cache.hits == 1
+
+        await client.put(make_entities(client, 4)[3])
+        results = [
+            e async for e in client.query(kind='Item').fetch(cached=True)
+        ]
+        assert [e['n'] for e in results] == [0, 1, 2, 3]
+        assert api.count('run_query') == 4
+
+    asyncio.run(main())
+
+
+def test_async_queries_cannot_be_exported(tmp_path):
+    client: AsyncSubclient = make_async_client()
+    path: Any = tmp_path / 'items.ndjson'
+    path.write_text('kept\n')
+    with pytest.raises(NotImplementedError):
+        client.query(kind='Item').export(str(path))
+    assert path.read_text() == 'kept\n'
+
+
+def test_async_queries_cannot_be_sharded():
+    client: AsyncSubclient = make_async_client()
+    with pytest.raises(NotImplementedError):
+        client.query(kind='Item').shard(2)
+    with pytest.raises(NotImplementedError):
+        client.query(kind='Item').fetch_sharded(2)
+
+
+def test_pages_are_prefetched():
+    async def main() -> None:
+        client: AsyncSubclient = make_async_client(
+            api=InMemoryDatastoreAPI(batch_size=2))
+        api: InMemoryDatastoreAPI = client._async_datastore_api.api
+        await client.put_multi(make_entities(client, 6))
+
+        pages: Any = client.query(kind='Item').fetch().pages
+        await pages.__anext__()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert api.count('run_query') == 2
+        await pages.aclose()
+
+        pages = client.query(kind='Item').fetch(prefetch=False).pages
+        await pages.__anext__()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert api.count('run_query') == 3
+        await pages.aclose()
+
+    asyncio.run(main())
+
+
+
+def test_large_batches_are_committed_in_chunks():
+    async def main() -> None:
+        client: AsyncSubclient = make_async_client()
+        api: InMemoryDatastoreAPI = client._async_datastore_api.api
+        entities: List[Subentity] = make_entities(client, MAX_MUTATIONS + 1)
+        entities[0].key = client.key('Item')
+        async with client.batch():
+            await client.put_multi(entities)
+        assert api.count('commit') == 2
+        assert len(api.entities) == MAX_MUTATIONS + 1
+        assert not entities[0].key.is_partial
+
+    asyncio.run(main())
+
+
+class RetryingDatastoreAPI(AsyncInMemoryDatastoreAPI):
+    """Fails the first lookup with a retryable error, and applies the retry
+    passed to each call in the same way as the asyncio API client does.
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        self.failed: bool = False
+
+    async def lookup(self, request: Any, retry: Any = None,
+                     **kwargs: Any) -> Any:
+        async def call() -> Any:
+            if not self.failed:
+                self.failed = True
+                raise ServiceUnavailable('unavailable')
+            return self.api.lookup(request)
+
+        return await (call() if retry is None else retry(call)())
+
+
+def test_sync_retries_are_converted_for_the_async_api():
+    async def main() -> None:
+        client: AsyncSubclient = make_async_client()
+        api: RetryingDatastoreAPI = RetryingDatastoreAPI()
+        client._async_datastore_api_internal = api
+        retry: Retry = Retry(predicate=if_exception_type(ServiceUnavailable),
+                             initial=0.01,
+                             timeout=5)
+        assert await client.get(client.key('Item', 1), retry=retry) is None
+        assert api.failed
+        with pytest.raises(TypeError):
+            await client.get(client.key('Item', 1), retry=object())
+
+    asyncio.run(main())
+
+
+def test_emulator_uses_a_grpc_aio_channel(monkeypatch):
+    monkeypatch.setenv('DATASTORE_EMULATOR_HOST', 'localhost:8081')
+
+    async def main() -> None:
+        client: AsyncSubclient = AsyncSubclient(project='test')
+        api: DatastoreAsyncClient = client._async_datastore_api
+        assert isinstance(api.transport, DatastoreGrpcAsyncIOTransport)
+        assert isinstance(api.transport.grpc_channel, grpc.aio.Channel)
+        assert client._async_datastore_api is api
+        await api.transport.close()
+
+    asyncio.run(main())
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import pytest
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.datastore import Client, Key
+
+from gcdmc.model import (
+    BulkResult,
+    IEntity,
+    TypedEntity,
+    UndefinedPropertyError,
+)
+from gcdmc.model.errors import InvalidKeyError
+from gcdmc.model.properties import (
+    EmailProperty,
+    FloatListProperty,
+    IntegerProperty,
+    StringProperty,
+)
+from gcdmc.model.types import FloatList
+
+
+class Reading(TypedEntity):
+    __kind__ = 'Reading'
+    name = StringProperty(nullable=False)
+    email = EmailProperty(default=None)
+    count = IntegerProperty(default=0)
+    samples = FloatListProperty(indexed=False, default=list)
+
+
+class ChildReading(IEntity[Reading]):
+    __type__ = Reading
+
+    @classmethod
+    def is_key_valid(cls, key):
+        if key.parent is None:
+            return False, 'readings must have a parent'
+        return True, None
+
+
+@pytest.fixture
+def client() -> Client:
+    return Client(project='test', credentials=AnonymousCredentials())
+
+
+def test_validate_many_rows():
+    result: BulkResult = Reading.validate_many(rows=[
+        {'name': 'a', 'samples': [1.0]},
+        {'name': 'b', 'count': 'x'},
+        {'name': None, 'email': 'bad'},
+    ])
+    assert len(result) == 3
+    assert not result.ok
+    assert result.items[0] == {
+        'name': 'a', 'email': None, 'count': 0, 'samples': [1.0]
+    }
+    assert isinstance(result.items[0]['samples'], FloatList)
+    assert result.items[1] is None and result.items[2] is None
+    assert [(e.row, e.name) for e in result.errors] == [
+        (1, 'count'), (2, 'name'), (2, 'email')
+    ]
+    assert isinstance(result.errors[0].error, TypeError)
+    assert result.failed_rows == {1, 2}
+    assert len(result.valid) == 1
+
+
+def test_validate_many_columns():
+    result: BulkResult = Reading.validate_many(columns={
+        'name': ['a', 'b'],
+        'count': [1, 2],
+    })
+    assert result.ok
+    assert [item['count'] for item in result.items] == [1, 2]
+
+
+def test_validate_many_rejects_uneven_columns():
+    with pytest.raises(ValueError):
+        Reading.validate_many(columns={'name': ['a'], 'count': [1, 2]})
+
+
+def test_validate_many_reports_undefined_properties():
+    result: BulkResult = Reading.validate_many(rows=[{'name': 'a'},
+                                                     {'name': 'b', 'x': 1}])
+    assert result.items[0] is not None
+    assert [(e.row, e.name) for e in result.errors] == [(1, 'x')]
+    assert isinstance(result.errors[0].error, UndefinedPropertyError)
+
+
+def test_create_many(client: Client):
+    parent: Key = client.key('Station', 1)
+    result: BulkResult = Reading.create_many(client, rows=[
+        {'name': 'a', 'id_or_name': 10, 'parent': parent},
+        {'name': 'b'},
+        {'name': 'c'},
+        {'name': None},
+    ])
+    assert [e.row for e in result.errors] == [3]
+    first, second, third, fourth = result.items
+    assert isinstance(first, Reading)
+    assert first.key == client.key('Station', 1, 'Reading', 10)
+    assert first.name == 'a'
+    assert first.exclude_from_indexes == {'samples'}
+    assert second.key.is_partial
+    assert second.key is third.key
+    assert fourth is None
+
+
+def test_create_many_values_are_independent(client: Client):
+    result: BulkResult = Reading.create_many(client,
+                                             columns={'name': ['a', 'b']})
+    first, second = result.items
+    first.samples.append(1.0)
+    assert second.samples == []
+    first.exclude_from_indexes.add('name')
+    assert second.exclude_from_indexes == {'samples'}
+
+
+def test_create_many_reports_invalid_ids(client: Client):
+    result: BulkResult = Reading.create_many(client, rows=[
+        {'name': 'a', 'id_or_name': 1.5},
+    ])
+    assert [(e.row, e.name) for e in result.errors] == [(0, 'id_or_name')]
+
+
+def test_create_many_reports_invalid_parents(client: Client):
+    result: BulkResult = Reading.create_many(client, rows=[
+        {'name': 'a', 'id_or_name': 1, 'parent': client.key('Station')},
+        {'name': 'b', 'parent': 'station'},
+        {'name': 'c', 'id_or_name': 'c', 'parent': client.key('Station', 1)},
+    ])
+    assert [(e.row, e.name) for e in result.errors] == [(0, 'parent'),
+                                                        (1, 'parent')]
+    assert result.items[2].key == client.key('Station', 1, 'Reading', 'c')
+
+
+def test_create_many_calls_custom_constructors(client: Client):
+    class Labelled(Reading):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            if self.name == 'bad':
+                raise ValueError('bad name')
+            self.count = len(self.name)
+
+    result: BulkResult = Labelled.create_many(client,
+                                              columns={'name': ['ab', 'bad']})
+    assert isinstance(result.items[0], Labelled)
+    assert result.items[0].count == 2
+    assert result.items[1] is None
+    assert [(e.row, e.name) for e in result.errors] == [(1, '__init__')]
+
+
+def test_interfaced_create_many_checks_keys(client: Client):
+    result: BulkResult = ChildReading.create_many(client, rows=[
+        {'name': 'a', 'parent': client.key('Station', 1)},
+        {'name': 'b'},
+    ])
+    assert isinstance(result.items[0], ChildReading)
+    assert result.items[1] is None
+    assert isinstance(result.errors[0].error, InvalidKeyError)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+from typing import List
+
+from google.cloud.datastore import Entity, Key
+
+from gcdmc.core import EntityCache, QueryCache, Subclient, Subentity
+from tests.datastore import make_client, make_entities
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now: float = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _client(cache: EntityCache, count: int = 3) -> Subclient:
+    client: Subclient = make_client()
+    client.cache = cache
+    client.put_multi(make_entities(client, count, kind='Plan'))
+    return client
+
+
+def test_lookups_are_cached():
+    cache: EntityCache = EntityCache()
+    client: Subclient = _client(cache)
+    keys: List[Key] = [client.key('Plan', i + 1) for i in range(3)]
+    first: List[Subentity] = client.get_multi(keys)
+    second: List[Subentity] = client.get_multi(keys)
+    assert client._datastore_api.count('lookup') == 1
+    assert [e['n'] for e in second] == [0, 1, 2]
+    assert first[0] is not second[0]
+    assert not second[0].is_dirty
+    assert (cache.hits, cache.misses, cache.size) == (3, 3, 3)
+
+    second[0]['n'] = 10
+    assert client.get(keys[0])['n'] == 0
+
+
+def test_missing_keys_are_cached():
+    cache: EntityCache = EntityCache()
+    client: Subclient = _client(cache)
+    key: Key = client.key('Plan', 100)
+    assert client.get(key) is None
+    missing: List[Entity] = []
+    assert client.get_multi([key], missing=missing) == []
+    assert [e.key for e in missing] == [key]
+    assert client._datastore_api.count('lookup') == 1
+
+
+def test_commits_invalidate_keys():
+    cache: EntityCache = EntityCache()
+    client: Subclient = _client(cache)
+    key: Key = client.key('Plan', 1)
+    entity: Subentity = client.get(key)
+    entity['n'] = 5
+    client.put(entity)
+    assert key not in cache._entries
+    assert client.get(key)['n'] == 5
+
+    client.get(client.key('Plan', 2))
+    with client.transaction():
+        client.delete(client.key('Plan', 2))
+    assert client.get(client.key('Plan', 2)) is None
+
+
+def test_transactions_bypass_the_cache():
+    cache: EntityCache = EntityCache()
+    client: Subclient = _client(cache)
+    key: Key = client.key('Plan', 1)
+    client.get(key)
+    lookups: int = client._datastore_api.count('lookup')
+    with client.transaction():
+        client.get(key)
+    assert client._datastore_api.count('lookup') == lookups + 1
+    assert cache.hits == 0
+
+
+def test_entries_expire_per_kind():
+    clock: Clock = Clock()
+    cache: EntityCache = EntityCache(ttl=10, ttls={'Plan': 1}, clock=clock)
+    client: Subclient = _client(cache)
+    key: Key = client.key('Plan', 1)
+    client.get(key)
+    clock.now = 0.5
+    client.get(key)
+    clock.now = 1.5
+    client.get(key)
+    assert client._datastore_api.count('lookup') == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_zero_ttl_disables_caching():
+    cache: EntityCache = EntityCache(ttls={'Plan': 0})
+    client: Subclient = _client(cache)
+    client.get(client.key('Plan', 1))
+    assert cache.size == 0
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache: EntityCache = EntityCache(max_entries=2)
+    client: Subclient = _client(cache)
+    keys: List[Key] = [client.key('Plan', i + 1) for i in range(3)]
+    client.get(keys[0])
+    client.get(keys[1])
+    client.get(keys[0])
+    client.get(keys[2])
+    assert list(cache._entries) == [keys[0], keys[2]]
+    assert cache.evictions == 1
+
+    small: EntityCache = EntityCache(max_bytes=1)
+    client.cache = small
+    client.get(keys[0])
+    assert small.size == 0 and small.nbytes == 0
+
+
+def test_stale_lookups_are_not_cached():
+    cache: EntityCache = EntityCache()
+    client: Subclient = _client(cache)
+    key: Key = client.key('Plan', 1)
+    generation: int = cache.generation('Plan')
+    cache.invalidate([key])
+    cache.put(key, None, generation)
+    assert cache.size == 0
+
+    generation = cache.generation('Plan')
+    client.put(Subentity(key=client.key('Config', 1)))
+    cache.put(key, None, generation)
+    assert cache.size == 1
+    cache.clear()
+    cache.put(key, None, generation)
+    assert cache.size == 0
+
+
+def _queried(client: Subclient) -> int:
+    return client._datastore_api.count('run_query')
+
+
+def test_queries_are_cached():
+    client: Subclient = _client(EntityCache(), count=5)
+    client.query_cache = QueryCache()
+    first: List[Subentity] = list(
+        client.query(kind='Plan', filters=[('n', '=', 1)]).fetch(cached=True))
+    second: List[Subentity] = list(
+        client.query(kind='Plan', filters=[('n', '=', 1)]).fetch(cached=True))
+    assert _queried(client) == 1
+    assert [e['n'] for e in second] == [1]
+    assert first[0] is not second[0]
+    assert not second[0].is_dirty
+
+    list(client.query(kind='Plan').fetch(cached=True, limit=2))
+    list(client.query(kind='Plan').fetch(limit=2))
+    list(client.query(kind='Plan').fetch_keys(cached=True, limit=2))
+    assert _queried(client) == 4
+    keys: List[Key] = list(
+        client.query(kind='Plan').fetch_keys(cached=True, limit=2))
+    assert keys == [client.key('Plan', 1), client.key('Plan', 2)]
+    assert _queried(client) == 4
+    assert client.query_cache.hits == 2
+
+
+def test_commits_invalidate_queries_of_their_kinds():
+    client: Subclient = _client(EntityCache(), count=2)
+    cache: QueryCache = QueryCache()
+    client.query_cache = cache
+    list(client.query(kind='Plan').fetch(cached=True))
+    list(client.query(kind='Other').fetch(cached=True))
+    list(client.query().fetch(cached=True))
+    assert cache.size == 3
+
+    entity: Subentity = Subentity(key=client.key('Plan'))
+    entity['n'] = 9
+    client.put(entity)
+    assert cache.size == 1
+    plans: List[Subentity] = list(client.query(kind='Plan').fetch(cached=True))
+    assert [e['n'] for e in plans] == [0, 1, 9]
+
+    client.put(client.get(client.key('Plan', 1)))
+    assert cache.size == 2
+
+
+def test_partly_read_and_transactional_queries_are_not_cached():
+    client: Subclient = _client(EntityCache(), count=3)
+    client._datastore_api.batch_size = 1
+    cache: QueryCache = QueryCache()
+    client.query_cache = cache
+    next(iter(client.query(kind='Plan').fetch(cached=True)))
+    assert cache.size == 0
+    with client.transaction():
+        list(client.query(kind='Plan').fetch(cached=True))
+    assert cache.size == 0 and cache.misses == 1
+
+
+def test_query_entries_expire_and_are_evicted():
+    clock: Clock = Clock()
+    cache: QueryCache = QueryCache(max_entries=1, ttl=1, clock=clock)
+    client: Subclient = _client(EntityCache())
+    client.query_cache = cache
+    list(client.query(kind='Plan').fetch(cached=True))
+    clock.now = 2
+    list(client.query(kind='Plan').fetch(cached=True))
+    assert _queried(client) == 2
+    list(client.query(kind='Plan', filters=[('n', '=', 0)]).fetch(cached=True))
+    assert cache.size == 1 and cache.evictions == 1
+
+    generation: int = cache.generation('Plan')
+    cache.clear()
+    cache.put('stale', 'Plan', [], generation)
+    assert cache.size == 0
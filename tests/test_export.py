@@ -0,0 +1,133 @@
+from __future__ import annotations
+from typing import Any, Dict, List
+
+import datetime
+import gzip
+import json
+import os
+
+import pytest
+
+from gcdmc.core import ExportStats, Registry, Subclient, Subentity
+from gcdmc.core.export import checkpoint_path
+from gcdmc.model import TypedEntity
+from gcdmc.model.properties import (
+    DateProperty,
+    IntegerProperty,
+    StringProperty,
+)
+from tests.datastore import InMemoryDatastoreAPI, make_client
+
+
+class FailingDatastoreAPI(InMemoryDatastoreAPI):
+    """Fails the query after the given number of queries, once.
+    """
+    def __init__(self, fail_after: int, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.fail_after: int = fail_after
+
+    def run_query(self, request: Dict[str, Any], **kwargs: Any) -> Any:
+        if self.count('run_query') == self.fail_after:
+            self.fail_after = -1
+            raise RuntimeError('query failed')
+        return super().run_query(request, **kwargs)
+
+
+class Account(TypedEntity):
+    __kind__ = 'Account'
+    name = StringProperty(nullable=False)
+    secret = StringProperty(serialized=False)
+    joined = DateProperty()
+    logins = IntegerProperty()
+
+
+def _client(count: int, api: InMemoryDatastoreAPI) -> Subclient:
+    registry: Registry = Registry()
+    registry.register_subentity_type('Account', Account)
+    client: Subclient = make_client(registry=registry, api=api)
+    client.put_multi([
+        Account(key=client.key('Account', i + 1),
+                name=f'account {i}',
+                secret='hunter2',
+                joined=datetime.datetime(2020, 1, i + 1,
+                                         tzinfo=datetime.timezone.utc),
+                logins=i) for i in range(count)
+    ])
+    return client
+
+
+def _read(path: str) -> List[Dict[str, Any]]:
+    opener: Any = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_exports_serialize_entities_through_their_schema(tmp_path):
+    client: Subclient = _client(5, InMemoryDatastoreAPI(batch_size=2))
+    path: str = str(tmp_path / 'accounts.ndjson')
+    stats: ExportStats = client.query(kind='Account').export(path)
+    assert (stats.rows, stats.pages, stats.resumed) == (5, 3, False)
+    rows: List[Dict[str, Any]] = _read(path)
+    assert rows[0] == {
+        '__key__': ['Account', 1],
+        'name': 'account 0',
+        'joined': '2020-01-01',
+        'logins': 0,
+    }
+    assert [row['logins'] for row in rows] == [0, 1, 2, 3, 4]
+    assert not os.path.exists(checkpoint_path(path))
+
+
+def test_exports_write_every_value_of_unregistered_kinds(tmp_path):
+    client: Subclient = make_client()
+    entity: Subentity = Subentity(key=client.key('Item', 'a'))
+    entity.update(at=datetime.datetime(2020, 1, 1), blob=b'\x00', n=None)
+    client.put(entity)
+    path: str = str(tmp_path / 'items.ndjson.gz')
+    client.query(kind='Item').export(path)
+    row: Dict[str, Any] = _read(path)[0]
+    assert row['__key__'] == ['Item', 'a']
+    assert row['at'].startswith('2020-01-01T00:00:00')
+    assert (row['blob'], row['n']) == ('AA==', None)
+
+
+@pytest.mark.parametrize('name', ['accounts.ndjson', 'accounts.ndjson.gz'])
+def test_interrupted_exports_resume_from_their_checkpoint(tmp_path, name):
+    api: FailingDatastoreAPI = FailingDatastoreAPI(fail_after=5, batch_size=2)
+    client: Subclient = _client(15, api)
+    path: str = str(tmp_path / name)
+    with pytest.raises(RuntimeError):
+        client.query(kind='Account').export(path,
+                                            checkpoint_pages=2,
+                                            buffer_size=1)
+    checkpoint: Dict[str, Any] = json.load(open(checkpoint_path(path)))
+    assert checkpoint['rows'] == 8
+
+    stats: ExportStats = client.query(kind='Account').export(
+        path, checkpoint_pages=2)
+    assert (stats.rows, stats.pages, stats.resumed) == (15, 4, True)
+    assert [row['logins'] for row in _read(path)] == list(range(15))
+    assert not os.path.exists(checkpoint_path(path))
+
+
+def test_exports_check_their_checkpoint_and_limit(tmp_path):
+    client: Subclient = _client(7, FailingDatastoreAPI(fail_after=2,
+                                                        batch_size=2))
+    path: str = str(tmp_path / 'accounts.ndjson')
+    with pytest.raises(RuntimeError):
+        client.query(kind='Account').export(path, checkpoint_pages=1)
+    written: List[Dict[str, Any]] = _read(path)
+    with pytest.raises(ValueError):
+        client.query(kind='Item').export(path)
+    with pytest.raises(ValueError):
+        client.query(kind='Account',
+                     filters=[('logins', '=', 1)]).export(path)
+    with pytest.raises(ValueError):
+        client.query(kind='Account', order=['logins']).export(path)
+    with pytest.raises(ValueError):
+        client.query(kind='Account').export(path, compress=True)
+    assert _read(path) == written
+
+    stats: ExportStats = client.query(kind='Account').export(path, limit=5)
+    assert (stats.rows, stats.pages) == (5, 1)
+    assert [row['logins'] for row in _read(path)] == [0, 1, 2, 3, 4]
@@ -0,0 +1,237 @@
+from __future__ import annotations
+from typing import Any, Dict, List
+
+import datetime
+import json
+import threading
+import time
+
+import pytest
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.datastore import Client, Entity
+from google.cloud.datastore.helpers import GeoPoint
+
+from gcdmc.core import Registry, Subclient
+from gcdmc.model import ImportStats, Importer, TypedEntity
+from gcdmc.model.properties import (
+    BlobProperty,
+    BooleanProperty,
+    DateProperty,
+    DatetimeProperty,
+    EntityListProperty,
+    EntityProperty,
+    FloatListProperty,
+    GeoPointProperty,
+    IntegerProperty,
+    StringProperty,
+)
+from tests.datastore import (
+    AsyncInMemoryDatastoreAPI,
+    InMemoryDatastoreAPI,
+    make_async_client,
+    make_client,
+)
+
+
+class Account(TypedEntity):
+    __kind__ = 'Account'
+    name = StringProperty(nullable=False)
+    active = BooleanProperty(default=True)
+    joined = DateProperty(default=None)
+    logins = IntegerProperty(default=0)
+    scores = FloatListProperty(default=list)
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class Note(TypedEntity):
+    __kind__ = 'Note'
+    text = StringProperty(nullable=False)
+    updated = DatetimeProperty(autoupdater=_now)
+
+
+class Place(TypedEntity):
+    __kind__ = 'Place'
+    name = StringProperty(nullable=False)
+    photo = BlobProperty(default=None)
+    location = GeoPointProperty(default=None)
+    address = EntityProperty(default=None)
+    visits = EntityListProperty(default=list)
+
+
+class CountingDatastoreAPI(InMemoryDatastoreAPI):
+    """Records the largest number of commits running at the same time, and
+    fails commits that write the given name.
+    """
+    def __init__(self, fail_name: str = '', **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.fail_name: str = fail_name
+        self.running: int = 0
+        self.most_running: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+    def commit(self, request: Dict[str, Any], **kwargs: Any) -> Any:
+        with self._lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        try:
+            time.sleep(0.01)
+            for mutation in request['mutations']:
+                entity_pb: Any = (mutation.upsert
+                                  if 'upsert' in mutation else mutation.insert)
+                name: str = entity_pb.properties['name'].string_value
+                if self.fail_name and name == self.fail_name:
+                    raise RuntimeError('commit failed')
+            return super().commit(request, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+def _client(api: InMemoryDatastoreAPI) -> Subclient:
+    registry: Registry = Registry()
+    registry.register_subentity_type('Account', Account)
+    return make_client(registry=registry, api=api)
+
+
+def test_imports_read_exported_files(tmp_path):
+    source: Subclient = _client(InMemoryDatastoreAPI(batch_size=3))
+    source.put_multi([
+        Account(key=source.key('Account', i + 1),
+                name=f'account {i}',
+                joined=datetime.datetime(2020, 1, i + 1,
+                                         tzinfo=datetime.timezone.utc),
+                logins=i,
+                scores=[float(i), 0.5]) for i in range(10)
+    ])
+    path: str = str(tmp_path / 'accounts.ndjson.gz')
+    source.query(kind='Account').export(path)
+
+    client: Subclient = _client(InMemoryDatastoreAPI())
+    stats: ImportStats = Importer(Account, client, processes=1,
+                                  chunk_size=4).run(path)
+    assert (stats.rows, stats.imported, stats.rejected) == (10, 10, 0)
+    assert stats.rows_per_second > 0
+    imported: List[Account] = list(client.query(kind='Account').fetch())
+    original: List[Account] = list(source.query(kind='Account').fetch())
+    assert [dict(e.items())
+            for e in imported] == [dict(e.items()) for e in original]
+    assert [e.key for e in imported] == [e.key for e in original]
+
+
+def test_imports_validate_in_worker_processes(tmp_path):
+    path: str = str(tmp_path / 'accounts.csv')
+    with open(path, 'w') as f:
+        f.write('__key__,name,active,joined,logins,scores\n'
+                '"[""Account"", ""a""]",Ada,true,2021-02-03,3,"[1, 2.5]"\n'
+                ',Bob,,,,\n'
+                '"[""Account"", ""c""]",,false,,1,\n'
+                '"[""Other"", ""d""]",Dan,,,,\n'
+                '"[""Account"", ""e""]",Eve,maybe,,,\n')
+    rejected_path: str = str(tmp_path / 'rejected.ndjson')
+    client: Subclient = _client(InMemoryDatastoreAPI())
+    stats: ImportStats = Importer(Account, client, processes=2,
+                                  chunk_size=2).run(
+                                      path, rejected_path=rejected_path)
+    assert (stats.rows, stats.imported, stats.rejected) == (5, 2, 3)
+
+    ada: Account = client.get(client.key('Account', 'a'))
+    assert (ada.active, ada.logins, list(ada.scores)) == (True, 3, [1.0, 2.5])
+    assert ada.joined == datetime.datetime(2021, 2, 3,
+                                           tzinfo=datetime.timezone.utc)
+    bob: Account = next(e for e in client.query(kind='Account').fetch()
+                        if e.name == 'Bob')
+    assert not bob.key.is_partial and bob.active
+
+    with open(rejected_path) as f:
+        rejected: List[Dict[str, Any]] = [json.loads(line) for line in f]
+    assert [r['row'] for r in rejected] == [3, 4, 5]
+    assert rejected[0]['errors'][0].startswith('name:')
+    assert 'Other' in rejected[1]['errors'][0]
+    assert rejected[2]['input']['active'] == 'maybe'
+
+
+def test_imports_bound_commits_and_reject_failed_chunks(tmp_path):
+    path: str = str(tmp_path / 'accounts.ndjson')
+    with open(path, 'w') as f:
+        for i in range(40):
+            f.write(json.dumps({'name': f'account {i}', 'logins': i}) + '\n')
+        f.write('\nnot json\n')
+    api: CountingDatastoreAPI = CountingDatastoreAPI(fail_name='account 13')
+    rejected_path: str = str(tmp_path / 'rejected.ndjson')
+    stats: ImportStats = Importer(Account,
+                                  _client(api),
+                                  processes=1,
+                                  chunk_size=5,
+                                  max_in_flight=2).run(
+                                      path, rejected_path=rejected_path)
+    assert (stats.rows, stats.imported, stats.rejected) == (41, 35, 6)
+    assert api.count('commit') == 7
+    assert 1 < api.most_running <= 2
+
+    with open(rejected_path) as f:
+        rejected: List[Dict[str, Any]] = [json.loads(line) for line in f]
+    assert sorted(r['row'] for r in rejected) == [11, 12, 13, 14, 15, 42]
+    assert 'commit failed' in rejected[0]['errors'][0]
+    assert rejected[-1]['input'] == 'not json'
+
+
+def test_imports_decode_every_exported_value_type(tmp_path):
+    registry: Registry = Registry()
+    registry.register_subentity_type('Place', Place)
+    source: Subclient = make_client(registry=registry)
+    address: Entity = Entity()
+    address.update({
+        'street': 'Main St',
+        'number': 1,
+        'corner': GeoPoint(1.5, -2.25),
+        'unit': Entity(),
+    })
+    visit: Entity = Entity()
+    visit.update({'by': 'ada', 'count': 2})
+    source.put(
+        Place(key=source.key('Place', 'home'),
+              name='home',
+              photo=b'\x00\xffpng',
+              location=GeoPoint(51.5, -0.125),
+              address=address,
+              visits=[visit]))
+    path: str = str(tmp_path / 'places.ndjson')
+    source.query(kind='Place').export(path)
+
+    client: Subclient = make_client(registry=registry)
+    stats: ImportStats = Importer(Place, client, processes=1).run(path)
+    assert (stats.imported, stats.rejected) == (1, 0)
+    place: Place = client.get(client.key('Place', 'home'))
+    assert place.photo == b'\x00\xffpng'
+    assert place.location == GeoPoint(51.5, -0.125)
+    assert isinstance(place.address, Entity)
+    assert dict(place.address) == dict(address)
+    assert [dict(v) for v in place.visits] == [dict(visit)]
+
+
+def test_imports_keep_autoupdated_values(tmp_path):
+    path: str = str(tmp_path / 'notes.ndjson')
+    with open(path, 'w') as f:
+        f.write(json.dumps({'__key__': ['Note', 1], 'text': 'kept',
+                            'updated': '2020-05-05T10:00:00+00:00'}) + '\n')
+    registry: Registry = Registry()
+    registry.register_subentity_type('Note', Note)
+    client: Subclient = make_client(registry=registry)
+    Importer(Note, client, processes=1).run(path)
+    assert client.get(client.key('Note', 1)).updated == datetime.datetime(
+        2020, 5, 5, 10, tzinfo=datetime.timezone.utc)
+
+    Importer(Note, client, processes=1, autoupdate=True).run(path)
+    assert client.get(client.key('Note', 1)).updated.year > 2020
+
+
+def test_imports_require_a_subclient():
+    with pytest.raises(TypeError):
+        Importer(Note, Client(project='test',
+                              credentials=AnonymousCredentials()))
+    with pytest.raises(TypeError):
+        Importer(Note, make_async_client(api=AsyncInMemoryDatastoreAPI()))
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+
+def _loaded_after(statement: str, module: str) -> bool:
+    code: str = f'import sys; {statement}; print({module!r} in sys.modules)'
+    result: subprocess.CompletedProcess = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True,
+        check=True)
+    return result.stdout.strip() == 'True'
+
+
+def test_import_gcdmc_does_not_load_datastore():
+    assert not _loaded_after('import gcdmc', 'google.cloud.datastore')
+    assert not _loaded_after('import gcdmc.core', 'google.cloud.datastore')
+    assert not _loaded_after('import gcdmc.model', 'google.cloud.datastore')
+
+
+def test_models_do_not_load_phonenumbers():
+    assert not _loaded_after(
+        'from gcdmc.model.properties import PhoneProperty', 'phonenumbers')
+
+
+def test_subpackages_are_loaded_on_access():
+    assert _loaded_after('import gcdmc; gcdmc.core.Subclient',
+                         'gcdmc.core.subclient')
+    assert _loaded_after('from gcdmc.model import TypedEntity',
+                         'gcdmc.model.typed_entity')
@@ -0,0 +1,82 @@
+from __future__ import annotations
+from typing import List
+
+import pickle
+
+from google.cloud.datastore import Key
+
+from gcdmc.core import Subclient, Subentity
+from gcdmc.core.keys import (
+    HashedKey,
+    KeyTable,
+    intern_key,
+    key_from_urlsafe,
+)
+from gcdmc.core.reduction import Reduction
+from tests.datastore import make_client
+
+
+def _key(id_: int = 1) -> Key:
+    return Key('Parent', 'p', 'Item', id_, project='test')
+
+
+def test_hashed_keys_equal_plain_keys():
+    hashed: HashedKey = HashedKey.of(_key())
+    assert hashed == _key() and _key() == hashed
+    assert hash(hashed) == hash(_key())
+    assert hashed != _key(2)
+    assert {_key(): 1}[hashed] == 1
+    assert hashed.parent == Key('Parent', 'p', project='test')
+    assert HashedKey.of(hashed) is hashed
+
+    partial: HashedKey = HashedKey.of(Key('Item', project='test'))
+    assert partial != partial
+
+
+def test_hashed_keys_drop_their_hash_when_pickled():
+    hashed: HashedKey = HashedKey.of(_key())
+    hash(hashed)
+    restored: HashedKey = pickle.loads(pickle.dumps(hashed))
+    assert '_hash' not in vars(restored)
+    assert restored == hashed and hash(restored) == hash(hashed)
+
+
+def test_key_table_interns_equal_keys():
+    table: KeyTable = KeyTable(max_entries=2)
+    first: Key = table.intern(_key())
+    assert isinstance(first, HashedKey)
+    assert table.intern(_key()) is first
+    assert table.intern(first) is first
+
+    partial: Key = Key('Item', project='test')
+    assert table.intern(partial) is partial
+    table.intern(_key(2))
+    table.intern(_key(3))
+    assert len(table) == 1
+    assert table.intern(_key()) is not first
+
+
+def test_urlsafe_strings_are_decoded_once():
+    urlsafe: str = _key().to_legacy_urlsafe().decode()
+    key_from_urlsafe.cache_clear()
+    assert key_from_urlsafe(urlsafe) == _key()
+    assert key_from_urlsafe(urlsafe) is key_from_urlsafe(urlsafe)
+    assert key_from_urlsafe.cache_info().hits == 2
+
+
+def test_reductions_and_lookups_use_interned_keys():
+    reduction: Reduction = Reduction()
+    first: Subentity = Subentity(key=_key())
+    second: Subentity = Subentity(key=_key())
+    reduction.put(first)
+    reduction.put(second)
+    assert reduction.entities == [second]
+    reduction.delete(_key())
+    assert reduction.deleted[0] is intern_key(_key())
+
+    client: Subclient = make_client()
+    entity: Subentity = Subentity(key=client.key('Item', 1))
+    client.put(entity)
+    urlsafe: str = entity.key.to_legacy_urlsafe().decode()
+    found: List[Subentity] = client.get_multi([urlsafe, entity.key])
+    assert found[0].key is intern_key(entity.key)
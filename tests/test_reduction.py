@@ -0,0 +1,288 @@
+from __future__ import annotations
+from typing import List
+
+import datetime
+import itertools
+
+import pytest
+
+from google.cloud.datastore import Entity, Key
+
+from gcdmc.core import ReadMode, Registry, Subclient
+from gcdmc.core.chunks import MAX_MUTATIONS
+from gcdmc.model import IEntity, TypedEntity
+from gcdmc.model.properties import (
+    DatetimeProperty,
+    IntegerProperty,
+    StringListProperty,
+    StringProperty,
+)
+from tests.datastore import InMemoryDatastoreAPI, make_client
+
+_clock_calls: List[datetime.datetime] = []
+_counter: itertools.count = itertools.count(1)
+
+
+def _now() -> datetime.datetime:
+    now: datetime.datetime = datetime.datetime.now(datetime.timezone.utc)
+    _clock_calls.append(now)
+    return now
+
+
+def _next() -> int:
+    return next(_counter)
+
+
+class Post(TypedEntity):
+    __kind__ = 'Post'
+    title = StringProperty()
+    tags = StringListProperty(default=list)
+    updated_at = DatetimeProperty(autoupdater=_now)
+    revision = IntegerProperty(autoupdater=_next, shared_autoupdate=False)
+
+
+class IPost(IEntity[Post]):
+    __type__ = Post
+
+
+def _posts(client: Subclient, count: int) -> List[Post]:
+    return [Post.create(client, title=str(i)) for i in range(count)]
+
+
+def test_autoupdaters_run_once_per_commit():
+    client: Subclient = make_client()
+    posts: List[Post] = _posts(client, 3)
+    _clock_calls.clear()
+    client.put_multi(posts)
+    assert len(_clock_calls) == 1
+    assert {p.updated_at for p in posts} == {_clock_calls[0]}
+    assert len({p.revision for p in posts}) == 3
+
+
+def test_autoupdaters_run_in_transactions():
+    client: Subclient = make_client()
+    post: Post = _posts(client, 1)[0]
+    before: datetime.datetime = post.updated_at
+    with client.transaction():
+        client.put(IPost(post))
+    assert post.updated_at > before
+    assert client.get(post.key)['updated_at'] == post.updated_at
+
+
+def test_autoupdate_can_be_disabled():
+    client: Subclient = make_client()
+    post: Post = _posts(client, 1)[0]
+    updated_at: datetime.datetime = post.updated_at
+    revision: int = post.revision
+    with client.batch(autoupdate=False) as batch:
+        batch.put(post)
+    with client.transaction(autoupdate=False) as transaction:
+        transaction.put(post)
+    assert post.updated_at == updated_at
+    assert post.revision == revision
+
+
+def _stored_posts(client: Subclient, count: int) -> List[Post]:
+    posts: List[Post] = _posts(client, count)
+    client.put_multi(posts)
+    return posts
+
+
+def test_committed_entities_are_clean():
+    client: Subclient = make_client()
+    post: Post = _posts(client, 1)[0]
+    assert post.is_dirty
+    client.put(post)
+    assert not post.is_dirty
+    assert post.dirty_properties == set()
+    post.title = 'changed'
+    assert post.is_dirty
+    assert post.dirty_properties == {'title'}
+
+
+def test_fetched_entities_are_clean():
+    client: Subclient = make_client()
+    post: Post = _stored_posts(client, 1)[0]
+    fetched = client.get(post.key)
+    assert not fetched.is_dirty
+    fetched['tags'].append('a')
+    assert fetched.dirty_properties == {'tags'}
+
+
+def test_fetched_values_are_copied_when_first_read():
+    api: InMemoryDatastoreAPI = InMemoryDatastoreAPI()
+    registry: Registry = Registry()
+    registry.register_subentity_type('Post', Post)
+    client: Subclient = make_client(registry=registry, api=api)
+    post: Post = _stored_posts(client, 1)[0]
+    plain = make_client(api=api).get(post.key)
+    assert plain._get_snapshot()[2]['tags'] is plain._entity['tags']
+
+    fetched: Post = client.get(post.key)
+    values = fetched._get_snapshot()[2]
+    fetched.tags.append('a')
+    assert values['tags'] == []
+    assert fetched.dirty_properties == {'tags'}
+
+    wrapped: IPost = IPost(client.get(post.key))
+    for name, value in wrapped.items():
+        if name == 'tags':
+            value.append('b')
+    assert wrapped.is_dirty
+
+
+class Member(TypedEntity):
+    __kind__ = 'Member'
+    name = StringProperty(indexed=False)
+    age = IntegerProperty(default=0)
+
+
+@pytest.mark.parametrize('read_mode', list(ReadMode))
+def test_entities_normalized_when_read_are_written_again(read_mode):
+    registry: Registry = Registry(read_mode=read_mode)
+    registry.register_subentity_type('Member', Member)
+    client: Subclient = make_client(registry=registry)
+    stored: Entity = Entity(key=client.key('Member', 1))
+    stored['name'] = 'x'
+    client.put(stored)
+
+    member: Member = client.get(stored.key)
+    assert dict(member.items()) == {'name': 'x', 'age': 0}
+    assert member.is_dirty
+    client.write_stats.reset()
+    client.put(member)
+    assert (client.write_stats.writes, client.write_stats.elided) == (1, 0)
+    refetched: Member = client.get(stored.key)
+    assert refetched.exclude_from_indexes == {'name'}
+    assert not refetched.is_dirty
+
+
+def test_in_place_changes_are_detected():
+    client: Subclient = make_client()
+    post: Post = _posts(client, 1)[0]
+    post['tags'] = ['a']
+    client.put(post)
+    post['tags'].append('b')
+    assert post.dirty_properties == {'tags'}
+    post['tags'].pop()
+    assert not post.is_dirty
+    post.exclude_from_indexes.add('title')
+    assert post.is_dirty
+
+
+def test_clean_entities_are_not_written():
+    client: Subclient = make_client()
+    posts: List[Post] = _stored_posts(client, 3)
+    commits: int = client._datastore_api.count('commit')
+    client.write_stats.reset()
+
+    with client.batch() as batch:
+        for post in posts:
+            batch.put(post)
+    assert batch.elided_writes == 3
+    assert client._datastore_api.count('commit') == commits
+
+    posts[0].title = 'changed'
+    revision: int = posts[1].revision
+    client.put_multi(posts)
+    assert len(client._datastore_api.requests[-1][1]['mutations']) == 1
+    assert posts[1].revision == revision
+    assert not posts[0].is_dirty
+    assert client.write_stats.writes == 1
+    assert client.write_stats.elided == 5
+
+
+def test_clean_entities_can_be_forced():
+    client: Subclient = make_client()
+    posts: List[Post] = _stored_posts(client, 2)
+    with client.batch(force=True) as batch:
+        for post in posts:
+            batch.put(post)
+    assert batch.elided_writes == 0
+    assert len(client._datastore_api.requests[-1][1]['mutations']) == 2
+
+    posts[0].mark_dirty()
+    client.put_multi(posts)
+    assert len(client._datastore_api.requests[-1][1]['mutations']) == 1
+
+
+def test_transactions_skip_clean_entities():
+    client: Subclient = make_client()
+    post: Post = _stored_posts(client, 1)[0]
+    with client.transaction() as transaction:
+        transaction.put(IPost(post))
+    assert transaction.elided_writes == 1
+    assert client._datastore_api.requests[-1][0] == 'commit'
+    assert len(client._datastore_api.requests[-1][1]['mutations']) == 0
+
+
+def _mutations(client: Subclient) -> List[str]:
+    name: str
+    request: dict
+    name, request = client._datastore_api.requests[-1]
+    assert name == 'commit'
+    return [('delete' if 'delete' in m else 'upsert')
+            for m in request['mutations']]
+
+
+def test_delete_after_put_only_deletes():
+    client: Subclient = make_client()
+    post: Post = _stored_posts(client, 1)[0]
+    post.title = 'changed'
+    with client.batch() as batch:
+        batch.put(post)
+        batch.delete(post.key)
+        batch.delete(post.key)
+    assert _mutations(client) == ['delete']
+    assert client.get(post.key) is None
+
+
+def test_put_after_delete_only_puts():
+    client: Subclient = make_client()
+    post: Post = _stored_posts(client, 1)[0]
+    with client.batch() as batch:
+        batch.delete(post.key)
+        batch.put(post)
+    assert _mutations(client) == ['upsert']
+    assert client.get(post.key) is not None
+
+
+def test_deletes_are_collapsed_across_keys():
+    client: Subclient = make_client()
+    posts: List[Post] = _stored_posts(client, 2)
+    with client.transaction():
+        client.delete_multi([p.key for p in posts] + [posts[0].key])
+        client.put(posts[1])
+    assert sorted(_mutations(client)) == ['delete', 'upsert']
+    assert client.get(posts[0].key) is None
+    assert client.get(posts[1].key) is not None
+
+
+def test_deletes_check_keys_when_added():
+    client: Subclient = make_client()
+    batch = client.batch()
+    batch.begin()
+    for key in (client.key('Post'), Key('Post', 1, project='other')):
+        with pytest.raises(ValueError):
+            batch.delete(key)
+    assert batch._reduction.deleted == []
+    batch.rollback()
+    with pytest.raises(ValueError, match='in progress'):
+        batch.delete(client.key('Post', 1))
+
+
+def test_large_batches_are_committed_in_chunks():
+    client: Subclient = make_client()
+    posts: List[Post] = _posts(client, 2 * MAX_MUTATIONS)
+    with client.batch() as batch:
+        for post in posts:
+            batch.put(post)
+        batch.delete(client.key('Post', 1))
+    sizes: List[int] = [
+        len(request['mutations'])
+        for name, request in client._datastore_api.requests
+        if name == 'commit'
+    ]
+    assert sizes == [MAX_MUTATIONS, MAX_MUTATIONS, 1]
+    assert len({p.key for p in posts}) == 2 * MAX_MUTATIONS
+    assert not any(p.key.is_partial or p.is_dirty for p in posts)
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import pytest
+
+from google.cloud.datastore import Key
+
+from gcdmc.model import SchemaError, TypedEntity
+from gcdmc.model.properties import (
+    EmailProperty,
+    FloatListProperty,
+    IntegerProperty,
+    StringProperty,
+)
+
+
+class Base(TypedEntity):
+    name = StringProperty(nullable=False)
+    count = IntegerProperty(default=0)
+
+
+class Contact(Base):
+    __kind__ = 'Contact'
+    email = EmailProperty(choices=('a@example.com', 'b@example.com'))
+    readings = FloatListProperty(indexed=False, default=list)
+    count = IntegerProperty(default=1)
+
+
+def test_schema_is_built_per_class():
+    assert Base.__schema__ is not Contact.__schema__
+    assert Base.__schema__.fields == ('name', 'count')
+    assert Contact.__schema__.fields == ('name', 'count', 'email', 'readings')
+    assert Contact.__schema__.properties['count'] is Contact.count
+    assert Contact.__schema__.unindexed == frozenset({'readings'})
+    assert set(Contact.__schema__.defaults) == {'count', 'readings'}
+
+
+def test_schema_validators_flatten_checks():
+    validate = Contact.__schema__.validators['email']
+    assert validate('a@example.com') == 'a@example.com'
+    with pytest.raises(TypeError):
+        validate(1)
+    with pytest.raises(ValueError):
+        validate('not an email')
+    with pytest.raises(ValueError):
+        validate('c@example.com')
+
+
+def test_init_uses_schema_defaults():
+    contact: Contact = Contact(key=Key('Contact', 1, project='test'),
+                               name='Ada',
+                               email='a@example.com')
+    assert contact.count == 1
+    assert contact.readings == []
+    assert contact.readings is not Contact(
+        key=Key('Contact', 2, project='test'), name='Bob',
+        email='a@example.com').readings
+    assert contact.exclude_from_indexes == {'readings'}
+
+
+def test_init_requires_properties_without_defaults():
+    with pytest.raises(AttributeError, match="error setting property 'name'"):
+        Base()
+
+
+def test_reserved_property_name_raises_at_class_creation():
+    with pytest.raises(SchemaError, match="'key'"):
+
+        class Invalid(TypedEntity):
+            key = StringProperty()
+
+    with pytest.raises(SchemaError, match="'is_dirty'"):
+
+        class AlsoInvalid(TypedEntity):
+            is_dirty = StringProperty()
+
+
+def test_shared_property_object_raises_at_class_creation():
+    with pytest.raises(SchemaError):
+
+        class Invalid(TypedEntity):
+            first = second = StringProperty()
+
+
+def test_invalid_kind_raises_at_class_creation():
+    with pytest.raises(SchemaError):
+
+        class Invalid(TypedEntity):
+            __kind__ = 1
+
+
+def test_invalid_read_mode_raises_at_class_creation():
+    with pytest.raises(SchemaError):
+
+        class Invalid(TypedEntity):
+            __read_mode__ = 'eager'
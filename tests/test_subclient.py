@@ -0,0 +1,200 @@
+from __future__ import annotations
+from typing import Any, Dict, List
+
+import pytest
+
+from google.cloud.datastore import Entity, Key
+
+from gcdmc.core import ChunkError, Registry, Subclient, Subentity
+from gcdmc.core.chunks import (
+    MAX_DEFERRED_LOOKUPS,
+    MAX_LOOKUP_KEYS,
+    MAX_MUTATIONS,
+)
+from tests.datastore import InMemoryDatastoreAPI, make_client, make_entities
+
+
+class FlakyDatastoreAPI(InMemoryDatastoreAPI):
+    """Fails every request that contains one of the given keys.
+    """
+    def __init__(self, fail: List[Key]) -> None:
+        super().__init__()
+        self.fail: List[Any] = [key.to_protobuf() for key in fail]
+
+    def lookup(self, request: Dict[str, Any], **kwargs: Any) -> Any:
+        if any(key in request['keys'] for key in self.fail):
+            raise RuntimeError('lookup failed')
+        return super().lookup(request, **kwargs)
+
+    def commit(self, request: Dict[str, Any], **kwargs: Any) -> Any:
+        if any(m.upsert.key in self.fail for m in request['mutations']):
+            raise RuntimeError('commit failed')
+        return super().commit(request, **kwargs)
+
+
+def test_get_multi_chunks_lookups_and_keeps_input_order():
+    client: Subclient = make_client()
+    count: int = MAX_LOOKUP_KEYS * 2 + 10
+    client.put_multi(make_entities(client, count))
+    keys: List[Key] = [client.key('Item', i + 1) for i in range(count)]
+    keys.reverse()
+    keys.insert(5, client.key('Item', count + 1))
+
+    missing: List[Entity] = []
+    found: List[Subentity] = client.get_multi(keys, missing=missing)
+    assert client._datastore_api.count('lookup') == 3
+    assert [e.key for e in found] == keys[:5] + keys[6:]
+    assert [e.key for e in missing] == [keys[5]]
+
+
+def test_put_and_delete_multi_are_chunked():
+    client: Subclient = make_client()
+    entities: List[Subentity] = make_entities(client, MAX_MUTATIONS * 2 + 1)
+    client.put_multi(entities + entities[:10])
+    assert client._datastore_api.count('commit') == 3
+    assert len(client._datastore_api.entities) == len(entities)
+    assert not any(e.is_dirty for e in entities)
+
+    client.delete_multi([e.key for e in entities] + entities[:10])
+    assert client._datastore_api.count('commit') == 6
+    assert client._datastore_api.entities == {}
+
+
+def test_chunks_are_not_split_inside_transactions():
+    client: Subclient = make_client()
+    entities: List[Subentity] = make_entities(client, MAX_MUTATIONS + 1)
+    with client.transaction():
+        client.put_multi(entities)
+    assert client._datastore_api.count('commit') == 1
+
+
+def test_failed_chunks_are_reported():
+    client: Subclient = make_client()
+    entities: List[Subentity] = make_entities(client, MAX_LOOKUP_KEYS * 3)
+    client.put_multi(entities)
+    failing: Key = entities[MAX_LOOKUP_KEYS + 1].key
+    flaky: FlakyDatastoreAPI = FlakyDatastoreAPI(fail=[failing])
+    flaky.entities = client._datastore_api.entities
+    client._datastore_api_internal = flaky
+
+    with pytest.raises(ChunkError) as info:
+        client.get_multi([e.key for e in entities])
+    error: ChunkError = info.value
+    assert [f.index for f in error.failures] == [1]
+    assert error.failed_items == [
+        e.key for e in entities[MAX_LOOKUP_KEYS:MAX_LOOKUP_KEYS * 2]
+    ]
+    assert error.results[1] is None
+    assert error.results[0] is not None and error.results[2] is not None
+
+
+def test_failed_commit_chunks_are_reported():
+    entities: List[Subentity] = make_entities(make_client(), MAX_MUTATIONS * 2)
+    client: Subclient = make_client(
+        api=FlakyDatastoreAPI(fail=[entities[0].key]))
+    with pytest.raises(ChunkError) as info:
+        client.put_multi(entities)
+    assert info.value.failed_items == entities[:MAX_MUTATIONS]
+    assert len(client._datastore_api.entities) == MAX_MUTATIONS
+
+
+def test_deferred_keys_are_resolved():
+    client: Subclient = make_client(api=InMemoryDatastoreAPI(max_results=2))
+    entities: List[Subentity] = make_entities(client, 5)
+    client.put_multi(entities)
+    found: List[Subentity] = client.get_multi([e.key for e in entities])
+    assert [e['n'] for e in found] == [0, 1, 2, 3, 4]
+    assert client._datastore_api.count('lookup') == 3
+
+
+def test_deferred_lookups_are_bounded():
+    client: Subclient = make_client(api=InMemoryDatastoreAPI(max_results=1))
+    entities: List[Subentity] = make_entities(client, MAX_DEFERRED_LOOKUPS + 2)
+    client.put_multi(entities)
+    keys: List[Key] = [e.key for e in entities]
+    assert len(client.get_multi(keys[1:])) == MAX_DEFERRED_LOOKUPS + 1
+    with pytest.raises(ChunkError) as info:
+        client.get_multi(keys)
+    assert isinstance(info.value.failures[0].error, RuntimeError)
+
+
+def test_deferred_keys_can_be_returned():
+    client: Subclient = make_client(api=InMemoryDatastoreAPI(max_results=2))
+    entities: List[Subentity] = make_entities(client, 5)
+    client.put_multi(entities)
+    deferred: List[Key] = []
+    found: List[Subentity] = client.get_multi([e.key for e in entities],
+                                              deferred=deferred)
+    assert len(found) == 2
+    assert deferred == [e.key for e in entities[2:]]
+
+
+def test_aligned_results():
+    client: Subclient = make_client(api=InMemoryDatastoreAPI(max_results=2))
+    entities: List[Subentity] = make_entities(client, 3)
+    client.put_multi(entities)
+    keys: List[Key] = [
+        entities[2].key,
+        client.key('Item', 100),
+        entities[0].key,
+        entities[2].key,
+    ]
+    result: List[Subentity] = client.get_multi(keys, aligned=True)
+    assert [None if e is None else e['n'] for e in result] == [2, None, 0, 2]
+    assert client.get_multi([], aligned=True) == []
+
+
+def test_transactions_return_the_same_entity_per_key():
+    client: Subclient = make_client()
+    entities: List[Subentity] = make_entities(client, 2)
+    client.put_multi(entities)
+    lookups: int = client._datastore_api.count('lookup')
+    absent: Key = client.key('Item', 100)
+    with client.transaction() as transaction:
+        first: Subentity = client.get(entities[0].key)
+        found: List[Subentity] = client.get_multi(
+            [entities[0].key, entities[1].key, absent])
+        assert found[0] is first
+        assert client.get(absent) is None
+        assert client._datastore_api.count('lookup') == lookups + 2
+
+        first['n'] = 10
+        client.put(client.get(entities[0].key))
+        assert transaction.identity_map[entities[0].key] is first
+    assert client.get(entities[0].key)['n'] == 10
+
+
+class Record(Subentity):
+    @classmethod
+    def wrap(cls, entity: Entity, read_mode: Any = None) -> Record:
+        return cls._attach(entity)
+
+
+def test_transaction_writes_of_raw_entities_are_read_back_wrapped():
+    registry: Registry = Registry()
+    registry.register_subentity_type('Item', Record)
+    client: Subclient = make_client(registry=registry)
+    with client.transaction():
+        raw: Entity = Entity(key=client.key('Item', 1))
+        raw['n'] = 1
+        client.put(raw)
+        found: Subentity = client.get(raw.key)
+        assert type(found) is Record and found['n'] == 1
+        assert client.get_multi([raw.key]) == [found]
+        raw['n'] = 2
+        assert found['n'] == 1
+    assert type(client.get(raw.key)) is Record
+
+
+def test_transaction_writes_update_the_identity_map():
+    client: Subclient = make_client()
+    entities: List[Subentity] = make_entities(client, 2)
+    client.put_multi(entities)
+    lookups: int = client._datastore_api.count('lookup')
+    with client.transaction():
+        replacement: Subentity = Subentity(key=entities[0].key)
+        client.put(replacement)
+        assert client.get(entities[0].key) is replacement
+        client.delete(entities[1].key)
+        assert client.get(entities[1].key) is None
+    assert client._datastore_api.count('lookup') == lookups
@@ -0,0 +1,121 @@
+from __future__ import annotations
+from typing import List
+
+from google.cloud.datastore import Entity, Key
+
+from gcdmc.core import Subentity, undelegated
+
+
+def _entity() -> Entity:
+    entity: Entity = Entity(key=Key('Foo', 1, project='test'),
+                            exclude_from_indexes=('bar', ))
+    entity['bar'] = 'baz'
+    return entity
+
+
+def test_init_delegates_to_underlying_entity():
+    key: Key = Key('Foo', 1, project='test')
+    subentity: Subentity = Subentity(key=key, exclude_from_indexes=('bar', ))
+    subentity['bar'] = 'baz'
+    assert subentity.key == key
+    assert subentity.exclude_from_indexes == {'bar'}
+    assert subentity['bar'] == 'baz'
+
+
+def test_init_does_not_allocate_shadow_state():
+    subentity: Subentity = Subentity(key=Key('Foo', 1, project='test'))
+    assert 'key' not in vars(subentity)
+    assert 'exclude_from_indexes' not in vars(subentity)
+    assert dict.__len__(subentity) == 0
+
+
+def test_wrap_attaches_entity_without_copying():
+    entity: Entity = _entity()
+    wrapped: Subentity = Subentity.wrap(entity)
+    assert wrapped._entity is entity
+    assert wrapped.key is entity.key
+    assert wrapped.exclude_from_indexes is entity.exclude_from_indexes
+    assert wrapped['bar'] == 'baz'
+
+
+def test_wrap_many_attaches_every_entity():
+    entities: List[Entity] = [_entity(), _entity()]
+    wrapped: List[Subentity] = Subentity.wrap_many(entities)
+    assert [type(w) for w in wrapped] == [Subentity, Subentity]
+    assert [w._entity for w in wrapped] == entities
+    assert wrapped[0]._entity is entities[0]
+
+
+def test_wrap_writes_through_to_entity():
+    entity: Entity = _entity()
+    wrapped: Subentity = Subentity.wrap(entity)
+    wrapped['qux'] = 1
+    assert entity['qux'] == 1
+
+
+def test_dispatch_delegates_entity_attributes():
+    assert Subentity.__dispatch__['key'] == 'delegate'
+    assert Subentity.__dispatch__['update'] == 'delegate'
+    assert Subentity.__dispatch__['_entity'] == 'local'
+    assert 'wrap' not in Subentity.__dispatch__
+
+
+def test_delegated_methods_act_on_underlying_entity():
+    entity: Entity = _entity()
+    wrapped: Subentity = Subentity.wrap(entity)
+    wrapped.update({'qux': 1})
+    assert wrapped.get('qux') == 1
+    assert entity['qux'] == 1
+
+
+def test_undelegated_is_scoped_to_subclass():
+    class Custom(Subentity):
+        @undelegated
+        def get(self, key: str) -> str:
+            return 'custom'
+
+    entity: Entity = _entity()
+    assert Custom._attach(entity).get('bar') == 'custom'
+    assert Subentity.wrap(entity).get('bar') == 'baz'
+    assert 'get' not in Subentity.__undelegated_attrs__
+
+
+def test_attributes_added_to_entity_later_are_delegated():
+    entity: Entity = _entity()
+    wrapped: Subentity = Subentity.wrap(entity)
+    entity.extra = 'value'
+    assert wrapped.extra == 'value'
+
+
+def test_setting_delegated_attribute_sets_it_on_entity():
+    entity: Entity = Entity(key=Key('Foo', project='test'))
+    wrapped: Subentity = Subentity.wrap(entity)
+    wrapped.key = entity.key.completed_key(1)
+    assert entity.key == Key('Foo', 1, project='test')
+    assert wrapped.key == entity.key
+
+
+def test_data_descriptors_take_precedence_over_delegation():
+    class Item:
+        def __init__(self, name: str) -> None:
+            self.name: str = name
+
+        def __get__(self, instance: Subentity, owner: type) -> str:
+            return instance[self.name]
+
+        def __set__(self, instance: Subentity, value: str) -> None:
+            instance[self.name] = value
+
+    class Custom(Subentity):
+        id = Item('id')
+        values = Item('values')
+
+    entity: Entity = _entity()
+    entity.update(id='a', values='b')
+    custom: Custom = Custom._attach(entity)
+    assert Custom.__dispatch__['id'] == 'local'
+    assert (custom.id, custom.values) == ('a', 'b')
+    custom.id = 'c'
+    assert entity['id'] == 'c'
+    assert custom.key.id == 1
+    assert Subentity.__dispatch__['id'] == 'delegate'
@@ -0,0 +1,211 @@
+from __future__ import annotations
+from typing import Any, Dict, List
+
+import threading
+
+import pytest
+
+from google.cloud.datastore import Key
+
+from gcdmc.core import (
+    QueryShard,
+    Registry,
+    ShardedIterator,
+    Subclient,
+    Subentity,
+    Subiterator,
+)
+from gcdmc.model import TypedEntity
+from gcdmc.model.properties import IntegerProperty, StringProperty
+from tests.datastore import InMemoryDatastoreAPI, make_client, make_entities
+
+
+class GatedDatastoreAPI(InMemoryDatastoreAPI):
+    """Counts queries, and fails the query with the given start cursor.
+    """
+    def __init__(self, fail_at: bytes = b'', **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.fail_at: bytes = fail_at
+        self.queried: threading.Semaphore = threading.Semaphore(0)
+
+    def run_query(self, request: Dict[str, Any], **kwargs: Any) -> Any:
+        self.queried.release()
+        if self.fail_at and request['query'].start_cursor == self.fail_at:
+            raise RuntimeError('query failed')
+        return super().run_query(request, **kwargs)
+
+
+def _client(count: int, api: InMemoryDatastoreAPI) -> Subclient:
+    client: Subclient = make_client(api=api)
+    client.put_multi(make_entities(client, count))
+    return client
+
+
+def _wait_for_queries(api: GatedDatastoreAPI, count: int) -> None:
+    for _ in range(count):
+        assert api.queried.acquire(timeout=5)
+
+
+def test_queries_wrap_entities():
+    client: Subclient = _client(3, InMemoryDatastoreAPI(batch_size=2))
+    results: List[Subentity] = list(client.query(kind='Item').fetch())
+    assert [e['n'] for e in results] == [0, 1, 2]
+    assert all(isinstance(e, Subentity) for e in results)
+    assert not results[0].is_dirty
+
+
+@pytest.mark.parametrize('limit,offset', [(None, 0), (5, 0), (4, 3),
+                                          (None, 8), (20, 0)])
+def test_prefetched_results_match(limit, offset):
+    client: Subclient = _client(10, InMemoryDatastoreAPI(batch_size=3))
+    plain: Subiterator = client.query(kind='Item').fetch(limit=limit,
+                                                         offset=offset)
+    expected: List[Any] = [e['n'] for e in plain]
+    iterator: Subiterator = client.query(kind='Item').fetch(limit=limit,
+                                                            offset=offset,
+                                                            prefetch=2)
+    assert [e['n'] for e in iterator] == expected
+    assert iterator.num_results == len(expected)
+    assert iterator.next_page_token == plain.next_page_token
+
+
+def test_prefetch_is_bounded():
+    api: GatedDatastoreAPI = GatedDatastoreAPI(batch_size=1)
+    client: Subclient = _client(10, api)
+    items: Any = iter(client.query(kind='Item').fetch(prefetch=2))
+    assert next(items)['n'] == 0
+    _wait_for_queries(api, 3)
+    assert not api.queried.acquire(timeout=0.3)
+
+    assert next(items)['n'] == 1
+    _wait_for_queries(api, 1)
+    assert not api.queried.acquire(timeout=0.3)
+
+    items.close()
+    assert not api.queried.acquire(timeout=0.3)
+
+
+def test_prefetch_errors_are_raised_in_order():
+    api: GatedDatastoreAPI = GatedDatastoreAPI(fail_at=b'2', batch_size=2)
+    client: Subclient = _client(6, api)
+    results: List[Any] = []
+    with pytest.raises(RuntimeError):
+        for entity in client.query(kind='Item').fetch(prefetch=3):
+            results.append(entity['n'])
+    assert results == [0, 1]
+
+
+def test_queries_are_split_into_disjoint_shards():
+    client: Subclient = _client(100, InMemoryDatastoreAPI(batch_size=7))
+    query: Any = client.query(kind='Item')
+    shards: List[QueryShard] = query.shard(4)
+    assert len(shards) == 4
+    assert shards[0].start is None and shards[-1].end is None
+    assert all(a.end == b.start for a, b in zip(shards, shards[1:]))
+
+    results: List[Subentity] = list(query.fetch_sharded(shards))
+    assert sorted(e['n'] for e in results) == list(range(100))
+    assert all(s.done for s in shards)
+
+
+def test_sharded_results_can_be_ordered():
+    client: Subclient = _client(50, InMemoryDatastoreAPI(batch_size=4))
+    query: Any = client.query(kind='Item')
+    iterator: ShardedIterator = query.fetch_sharded(
+        query.shard(boundaries=[client.key('Item', 30),
+                                client.key('Item', 10)]),
+        ordered=True,
+        max_workers=2)
+    assert [e['n'] for e in iterator] == list(range(50))
+    assert iterator.num_results == 50
+
+
+def test_sharded_scans_resume_from_their_cursors():
+    client: Subclient = _client(40, InMemoryDatastoreAPI(batch_size=3))
+    query: Any = client.query(kind='Item')
+    shards: List[QueryShard] = query.shard(
+        boundaries=[client.key('Item', 21)])
+    seen: List[int] = []
+    for entity in query.fetch_sharded(shards, ordered=True):
+        seen.append(entity['n'])
+        if len(seen) == 25:
+            break
+    assert shards[0].done and not shards[1].done
+    assert shards[1].cursor is not None
+
+    # The page holding the last two results was only partly consumed, so
+    # those results are returned again.
+    seen += [e['n'] for e in query.fetch_sharded(shards)]
+    assert sorted(set(seen)) == list(range(40))
+    assert len(seen) == 42
+
+
+def test_unshardable_queries_are_rejected():
+    client: Subclient = make_client()
+    with pytest.raises(ValueError):
+        client.query(kind='Item', order=['-n']).shard(2)
+    with pytest.raises(ValueError):
+        client.query(kind='Item', filters=[('n', '>', 1)]).shard(2)
+    with pytest.raises(ValueError):
+        client.query().shard(2)
+
+
+class Account(TypedEntity):
+    __kind__ = 'Account'
+    name = StringProperty(nullable=False)
+    email = StringProperty(nullable=False)
+    seats = IntegerProperty(nullable=False)
+
+
+def _accounts() -> Subclient:
+    registry: Registry = Registry()
+    registry.register_subentity_type('Account', Account)
+    client: Subclient = make_client(registry=registry)
+    client.put_multi([
+        Account(key=client.key('Account', i + 1),
+                name=f'account {i}',
+                email=f'{i}@example.com',
+                seats=i) for i in range(3)
+    ])
+    return client
+
+
+def test_keys_only_queries_yield_keys():
+    client: Subclient = _accounts()
+    keys: List[Key] = list(client.query(kind='Account').fetch_keys(limit=2))
+    assert keys == [client.key('Account', 1), client.key('Account', 2)]
+    query: Any = client._datastore_api.requests[-1][1]['query']
+    assert [p.property.name for p in query.projection] == ['__key__']
+
+
+def test_projection_queries_yield_records():
+    client: Subclient = _accounts()
+    records: List[Any] = list(
+        client.query(kind='Account', projection=['seats',
+                                                 'name']).fetch_records())
+    assert [tuple(r) for r in records] == [
+        (client.key('Account', i + 1), i, f'account {i}') for i in range(3)
+    ]
+    assert records[1].name == 'account 1'
+    assert type(records[0]).__name__ == 'AccountRecord'
+    assert type(records[0]) is type(
+        next(iter(client.query(kind='Account',
+                               projection=['seats',
+                                           'name']).fetch_records())))
+
+
+def test_records_require_a_projection_defined_by_the_schema():
+    client: Subclient = _accounts()
+    with pytest.raises(ValueError):
+        client.query(kind='Account').fetch_records()
+    with pytest.raises(ValueError):
+        client.query(kind='Account', projection=['plan']).fetch_records()
+
+
+def test_typed_kinds_are_sharded_by_their_keys():
+    client: Subclient = _accounts()
+    query: Any = client.query(kind='Account')
+    shards: List[QueryShard] = query.shard(2)
+    assert len(shards) == 2
+    results: List[Account] = list(query.fetch_sharded(shards))
+    assert sorted(e.seats for e in results) == [0, 1, 2]
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import array
+import copy
+import pickle
+
+import pytest
+
+from google.cloud.datastore import Key
+
+from gcdmc.model import TypedEntity
+from gcdmc.model.properties import (
+    BooleanArrayProperty,
+    FloatArrayProperty,
+    IntegerArrayProperty,
+)
+from gcdmc.model.types import BooleanArray, FloatArray, IntegerArray
+from tests.datastore import make_client
+
+
+class Series(TypedEntity):
+    __kind__ = 'Series'
+    counts = IntegerArrayProperty(default=list)
+    readings = FloatArrayProperty(indexed=False, default=list)
+    flags = BooleanArrayProperty(default=list)
+
+
+def test_init_converts_values():
+    a: FloatArray = FloatArray([1.0, 2])
+    assert a == [1.0, 2.0]
+    assert a.itemsize == 8
+    assert memoryview(a).format == 'd'
+
+
+def test_init_copies_compatible_buffers():
+    a: IntegerArray = IntegerArray(array.array('q', [1, 2, 3]))
+    assert a == [1, 2, 3]
+    assert IntegerArray(array.array('i', [1, 2])) == [1, 2]
+
+
+def test_invalid_values_raise():
+    with pytest.raises(TypeError):
+        IntegerArray([1, 1.5])
+    with pytest.raises(TypeError):
+        FloatArray(['a'])
+    with pytest.raises(ValueError):
+        IntegerArray([2**64])
+    with pytest.raises(TypeError):
+        BooleanArray([True, 1])
+
+
+def test_extend_is_atomic():
+    a: IntegerArray = IntegerArray([1])
+    with pytest.raises(TypeError):
+        a.extend([2, 'x'])
+    assert a == [1]
+
+
+def test_operations_keep_type():
+    a: IntegerArray = IntegerArray([1, 2])
+    assert isinstance(a + [3], IntegerArray)
+    assert isinstance(copy.deepcopy(a), IntegerArray)
+    assert isinstance(pickle.loads(pickle.dumps(a)), IntegerArray)
+    a += [3]
+    assert a == [1, 2, 3]
+    assert type(a[0:2]) is IntegerArray and a[0:2] == [1, 2]
+    assert repr(FloatArray([1.0, 2.0])[::-1]) == 'FloatArray([2.0, 1.0])'
+
+
+def test_boolean_array_reads_booleans():
+    a: BooleanArray = BooleanArray([True, False])
+    assert a[0] is True
+    assert list(a) == [True, False]
+    assert isinstance(a[:1], BooleanArray)
+    a.append(True)
+    assert a.tolist() == [True, False, True]
+    with pytest.raises(TypeError):
+        a[0] = 1
+
+
+def test_property_converts_sequences():
+    series: Series = Series(key=Key('Series', 1, project='test'))
+    series.counts = (1, 2)
+    series.readings = [0.5]
+    assert isinstance(series.counts, IntegerArray)
+    assert isinstance(series.readings, FloatArray)
+    with pytest.raises(TypeError):
+        series.readings = 'abc'
+
+
+def test_arrays_are_converted_to_lists_at_commit():
+    client = make_client()
+    series: Series = Series.create(client,
+                                   counts=[1, 2],
+                                   readings=[0.5],
+                                   flags=[True])
+    client.put(series)
+    assert not series.key.is_partial
+    assert isinstance(series.readings, FloatArray)
+
+    fetched = client.get(series.key)
+    assert fetched['counts'] == [1, 2]
+    assert fetched['flags'] == [True]
+    assert isinstance(Series.wrap(fetched).readings, FloatArray)
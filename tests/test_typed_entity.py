@@ -0,0 +1,212 @@
+from __future__ import annotations
+from typing import List
+
+import pytest
+
+from google.cloud.datastore import Entity, Key
+
+from gcdmc.core import ReadMode, Registry, Subclient, Subentity
+from gcdmc.model import TypedEntity, UnassignedPropertyError
+from gcdmc.model.properties import (
+    IntegerProperty,
+    StringListProperty,
+    StringProperty,
+)
+from gcdmc.model.types import StringList
+from tests.datastore import make_client
+
+
+class User(TypedEntity):
+    __kind__ = 'User'
+    name = StringProperty(nullable=False)
+    age = IntegerProperty(default=None)
+    tags = StringListProperty(default=list)
+
+
+def _key() -> Key:
+    return Key('User', 1, project='test')
+
+
+def test_properties_are_descriptors():
+    assert isinstance(User.name, StringProperty)
+    assert User.name.name == 'name'
+    assert set(User(key=_key(), name='Ada').properties) == {
+        'name', 'age', 'tags'
+    }
+
+
+def test_get_property():
+    user: User = User(key=_key(), name='Ada')
+    assert user.name == 'Ada'
+    assert user.age is None
+    assert isinstance(user.tags, StringList)
+
+
+def test_set_property_validates_value():
+    user: User = User(key=_key(), name='Ada')
+    user.age = 36
+    assert user['age'] == 36
+    with pytest.raises(TypeError):
+        user.age = 'thirty six'
+    with pytest.raises(ValueError):
+        user.name = None
+    assert user.age == 36
+
+
+def test_delete_property():
+    user: User = User(key=_key(), name='Ada')
+    with pytest.raises(UnassignedPropertyError):
+        del user.name
+
+
+def test_wrap_reads_entity_values():
+    entity: Entity = Entity(key=_key())
+    entity.update(name='Ada', age=36, tags=['a'])
+    user: User = User.wrap(entity)
+    assert user.name == 'Ada'
+    assert user.age == 36
+    assert user.tags == ['a']
+
+
+def _invalid_entity() -> Entity:
+    entity: Entity = Entity(key=_key())
+    entity.update(name='Ada', age='thirty six')
+    return entity
+
+
+def test_wrap_strict_validates_values():
+    with pytest.raises(TypeError):
+        User.wrap(_invalid_entity(), read_mode=ReadMode.STRICT)
+
+
+def test_wrap_strict_ignores_stored_exclude_from_indexes():
+    entity: Entity = Entity(key=_key(), exclude_from_indexes=('tags', ))
+    entity.update(name='Ada')
+    assert User.wrap(entity).name == 'Ada'
+
+
+def test_wrap_trusted_attaches_entity_without_validating():
+    entity: Entity = _invalid_entity()
+    user: User = User.wrap(entity, read_mode=ReadMode.TRUSTED)
+    assert user._entity is entity
+    assert user.age == 'thirty six'
+    assert user.tags == []
+
+
+def test_wrap_lazy_validates_on_first_access():
+    entity: Entity = _invalid_entity()
+    entity['tags'] = ['a']
+    user: User = User.wrap(entity, read_mode='lazy')
+    assert user._entity is entity
+    assert type(entity['tags']) is list
+    assert isinstance(user.tags, StringList)
+    assert isinstance(entity['tags'], StringList)
+    with pytest.raises(TypeError):
+        user.age
+
+
+def test_wrap_lazy_validates_values_handed_out_by_entity_methods():
+    for read in (lambda u: u.get('age'), lambda u: dict(u.items()),
+                 lambda u: list(u.values()), lambda u: u.copy(),
+                 lambda u: u | {}):
+        user: User = User.wrap(_invalid_entity(), read_mode=ReadMode.LAZY)
+        with pytest.raises(TypeError, match="'age'"):
+            read(user)
+    entity: Entity = _invalid_entity()
+    entity['age'] = 36
+    user = User.wrap(entity, read_mode=ReadMode.LAZY)
+    assert user.get('age') == 36 and not user._unvalidated
+
+
+def test_wrap_lazy_assignment_skips_validation_of_stored_value():
+    user: User = User.wrap(_invalid_entity(), read_mode=ReadMode.LAZY)
+    user.age = 36
+    assert user.age == 36
+
+
+def test_wrap_lazy_validates_missing_properties_when_read():
+    entity: Entity = Entity(key=_key())
+    entity['extra'] = 1
+    user: User = User.wrap(entity, read_mode=ReadMode.LAZY)
+    assert (user.age, user.tags, user['extra']) == (None, [], 1)
+    assert entity['name'] is None
+    with pytest.raises(ValueError, match="'name'"):
+        user.name
+    assert User.wrap(Entity(key=_key()), read_mode='trusted').name is None
+
+
+def test_wrap_uses_class_read_mode():
+    class TrustedUser(User):
+        __read_mode__ = ReadMode.TRUSTED
+
+    assert TrustedUser.wrap(_invalid_entity()).age == 'thirty six'
+
+
+def test_registry_read_mode_precedence():
+    registry: Registry = Registry(read_mode=ReadMode.LAZY)
+    registry.register_subentity_type('User', User)
+    registry.register_subentity_type('Admin',
+                                     User,
+                                     read_mode=ReadMode.TRUSTED)
+    assert registry.get_read_mode('User') is ReadMode.LAZY
+    assert registry.get_read_mode('Admin') is ReadMode.TRUSTED
+    assert Registry().get_read_mode('User') is None
+
+
+def test_wrap_many_matches_wrap():
+    entities: List[Entity] = [_invalid_entity(), _invalid_entity()]
+    lazy: List[User] = User.wrap_many(entities, read_mode=ReadMode.LAZY)
+    assert [type(u) for u in lazy] == [User, User]
+    assert lazy[1]._entity is entities[1]
+    assert lazy[0].tags == []
+    with pytest.raises(TypeError):
+        lazy[0].age
+
+    with pytest.raises(TypeError):
+        User.wrap_many([_invalid_entity()], read_mode=ReadMode.STRICT)
+    with pytest.raises(TypeError):
+        User.wrap_many([Entity(key=Key('Other', 1, project='test'))])
+
+
+def test_registry_wraps_entities_grouped_by_kind():
+    class Admin(User):
+        __kind__ = 'Admin'
+
+    registry: Registry = Registry(read_mode=ReadMode.TRUSTED)
+    registry.register_subentity_type('User', User)
+    registry.register_subentity_type('Admin', Admin)
+    entities: List[Entity] = [
+        _invalid_entity(),
+        Entity(key=Key('Admin', 1, project='test')),
+        Entity(key=Key('Other', 1, project='test')),
+        _invalid_entity(),
+    ]
+    wrapped: List[Subentity] = registry.wrap_many(entities)
+    assert [type(w) for w in wrapped] == [User, Admin, Subentity, User]
+    assert wrapped[3]._entity is entities[3]
+    assert wrapped[0].age == 'thirty six'
+
+    registry = Registry(default=User)
+    assert registry.resolve('Other') == (User, None)
+    assert Registry().resolve('Other') == (Subentity, None)
+
+
+def test_properties_may_share_names_with_entity_attributes():
+    class Record(TypedEntity):
+        __kind__ = 'Record'
+        id = StringProperty(nullable=False)
+        values = IntegerProperty(default=0)
+
+    registry: Registry = Registry()
+    registry.register_subentity_type('Record', Record)
+    client: Subclient = make_client(registry=registry)
+    record: Record = Record(key=client.key('Record', 7), id='a', values=1)
+    assert (record.id, record.values, record.key.id) == ('a', 1, 7)
+    record.values = 2
+    with pytest.raises(TypeError):
+        record.id = 3
+    client.put(record)
+
+    stored: Record = client.get(client.key('Record', 7))
+    assert (stored.id, stored.values) == ('a', 2)
+    assert dict(stored.items()) == {'id': 'a', 'values': 2}
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import pickle
+
 import pytest
 
 from gcdmc.model.types import *
@@ -166,3 +168,14 @@ def test_copy_insert_invalid_value():
     copy: TypedList[int] = l.copy()
     with pytest.raises(ValueError):
         copy.insert(0, -1)
+
+
+def test_pickle():
+    l: StringList = StringList(['a', 'b'])
+    restored: StringList = pickle.loads(pickle.dumps(l))
+    assert type(restored) is StringList and restored == l
+    with pytest.raises(TypeError):
+        restored.append(1)
+
+    base: TypedList[int] = TypedList(int, iterable=[1, 2])
+    assert pickle.loads(pickle.dumps(base)) == [1, 2]
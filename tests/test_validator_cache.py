@@ -0,0 +1,112 @@
+from __future__ import annotations
+from typing import Any, List
+
+import pytest
+
+from gcdmc.model.properties import PhoneProperty, StringProperty
+from gcdmc.model.types import ValidatorCache, cached_validator
+from gcdmc.model.types.utils import is_parseable_phone
+
+
+def _counting_validator(calls: List[Any]):
+    def validator(v: Any) -> bool:
+        calls.append(v)
+        return v != 'bad'
+
+    return validator
+
+
+def test_results_are_cached():
+    calls: List[Any] = []
+    cache: ValidatorCache = ValidatorCache(_counting_validator(calls))
+    assert cache('a') and cache('a')
+    assert not cache('bad')
+    assert calls == ['a', 'bad']
+    assert (cache.hits, cache.misses, cache.size) == (1, 2, 2)
+    assert cache.hit_rate == pytest.approx(1 / 3)
+
+
+def test_least_recently_used_results_are_evicted():
+    calls: List[Any] = []
+    cache: ValidatorCache = ValidatorCache(_counting_validator(calls),
+                                           maxsize=2)
+    cache('a')
+    cache('b')
+    cache('a')
+    cache('c')
+    cache('a')
+    cache('b')
+    assert calls == ['a', 'b', 'c', 'b']
+
+
+def test_values_are_cached_by_type():
+    calls: List[Any] = []
+    cache: ValidatorCache = ValidatorCache(_counting_validator(calls))
+    cache(1)
+    cache(True)
+    assert calls == [1, True]
+
+
+def test_unhashable_values_are_not_cached():
+    calls: List[Any] = []
+    cache: ValidatorCache = ValidatorCache(_counting_validator(calls))
+    cache(['a'])
+    cache(['a'])
+    assert len(calls) == 2
+    assert cache.size == 0
+
+
+def test_type_errors_of_the_validator_are_raised_once():
+    calls: List[Any] = []
+
+    def validator(v: Any) -> bool:
+        calls.append(v)
+        raise TypeError('invalid')
+
+    cache: ValidatorCache = ValidatorCache(validator)
+    with pytest.raises(TypeError, match='invalid'):
+        cache('a')
+    assert calls == ['a']
+
+
+def test_resize_keeps_counters():
+    cache: ValidatorCache = ValidatorCache(_counting_validator([]))
+    cache('a')
+    cache('a')
+    cache.maxsize = 0
+    assert (cache.hits, cache.misses, cache.size) == (1, 1, 0)
+    cache.clear()
+    assert (cache.hits, cache.misses) == (0, 0)
+    with pytest.raises(ValueError):
+        cache.maxsize = -1
+
+
+def test_decorator():
+    @cached_validator(maxsize=8)
+    def is_short(v: str) -> bool:
+        return len(v) < 3
+
+    assert isinstance(is_short, ValidatorCache)
+    assert is_short.maxsize == 8
+    assert is_short.__name__ == 'is_short'
+    assert is_short('ab')
+
+
+def test_utils_validators_are_cached():
+    assert isinstance(is_parseable_phone, ValidatorCache)
+    prop: PhoneProperty = PhoneProperty()
+    hits: int = is_parseable_phone.hits
+    prop.validate('+14155550100')
+    prop.validate('+14155550100')
+    assert is_parseable_phone.hits > hits
+
+
+def test_property_validator_cache():
+    calls: List[Any] = []
+    prop: StringProperty = StringProperty(
+        validator=_counting_validator(calls), validator_cache_size=16)
+    prop.validate('a')
+    prop.validate('a')
+    assert calls == ['a']
+    assert prop.validator_cache.hits == 1
+    assert StringProperty().validator_cache is None